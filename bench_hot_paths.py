@@ -0,0 +1,220 @@
+"""
+Offline benchmarks for the signal and order-management hot paths.
+
+Uses synthetic klines and the in-process exchange simulator (exchange_simulator.py) with
+configurable latency, rate limits and partial fills, so nothing touches the network.
+Each benchmark reports throughput and per-call latency percentiles. --save_baseline
+stores the results; later runs compare their p50 against the baseline and exit non-zero
+if any benchmark regressed by more than --tolerance.
+
+    python bench_hot_paths.py --save_baseline
+    python bench_hot_paths.py --latency_ms 50 --jitter_ms 20 --fill_ratio 0.5
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from bluefin_parser import POSITION_KEYS_TO_SCALE, BASE18
+from exchange_simulator import SimulatedBluefinExchange
+from order_manager_bluefin import BluefinOrderManager
+from order_reconciler import bracket_orders
+from signals_tbl_eth_bluefin import check_position, setup_logging
+from tail_inference import tail_rows_for
+
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+
+def synthetic_klines(n=2000, start_price=3000.0, seed=0):
+    """5-minute random-walk klines with the columns pull_binance_data returns."""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    open_time = pd.date_range(end=pd.Timestamp.utcnow().floor('5min').tz_localize(None), periods=n, freq='5min')
+    return pd.DataFrame({
+        'open_time': open_time,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.lognormal(3, 1, n),
+        'close_time': open_time + pd.Timedelta(minutes=5) - pd.Timedelta(milliseconds=1),
+    })
+
+
+def measure(name, fn, iterations, warmup=3, setup=None):
+    """Times `iterations` calls of fn; `setup` runs before each call and is not timed."""
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    samples = np.empty(iterations)
+    errors = 0
+    for i in range(iterations):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            # Rate limits and rejections are part of what is being measured.
+            errors += 1
+            logging.debug(f'{name} failed: {e}')
+        samples[i] = time.perf_counter() - t0
+    total = samples.sum()
+    return {
+        'name': name,
+        'iterations': iterations,
+        'errors': errors,
+        'throughput_per_s': iterations / total,
+        'p50_us': float(np.percentile(samples, 50) * 1e6),
+        'p95_us': float(np.percentile(samples, 95) * 1e6),
+        'p99_us': float(np.percentile(samples, 99) * 1e6),
+    }
+
+
+def bench_pure(results, scale):
+    position = {key: str(int(random.uniform(1, 5000) * BASE18)) for key in POSITION_KEYS_TO_SCALE}
+    position.update({'symbol': 'ETH-PERP', 'side': 'BUY'})
+    parsed = {key: int(value) / BASE18 if key in POSITION_KEYS_TO_SCALE else value
+              for key, value in position.items()}
+
+    results.append(measure('check_position', lambda: check_position(parsed), 100000 // scale))
+    parse = BluefinOrderManager.parse_position_data
+    manager = type('ParserOnly', (), {'exact_decimals': False})()
+    results.append(measure('parse_position_data', lambda: parse(manager, position), 20000 // scale))
+
+
+def bench_process_predictions(results, scale, klines):
+    from replay import ReplayEngine
+    strategy = ReplayEngine({
+        'ticker': 'ETHUSD', 'quote_symbol_quantity': 0.01, 'trading_fee': 0.0015, 'prob_threshold': 0.5,
+        'smoothing_method': 'rolling', 'span': 8, 'stop_loss': 0.0075, 'take_profit': 0.0075,
+        'model_path': None, 'features_path': None,
+    }).build_strategy()
+    probs = np.random.default_rng(1).dirichlet([1, 1, 1], size=len(klines))
+    results.append(measure('process_predictions', lambda: strategy.process_predictions(probs, klines, act=False),
+                           max(5, 200 // scale)))
+    # With tail inference only the smoothing window reaches process_predictions.
+    tail = tail_rows_for(strategy.span, strategy.smoothing_method)
+    results.append(measure('process_predictions_tail',
+                           lambda: strategy.process_predictions(probs[-tail:], klines.iloc[-tail:], act=False),
+                           max(50, 2000 // scale)))
+
+
+def bench_generate_tbl_signal(results, scale, klines, model_path, features_path):
+    import data_processor
+    from replay import ReplayEngine
+    processor = data_processor.CryptoDataProcessor(ticker='ETHUSDT', existing_filename='ETHUSDT_5m',
+                                                   db_path='./models/ETHUSDT_prod_features.sqlite', offset=60)
+    strategy = ReplayEngine({
+        'ticker': 'ETHUSD', 'quote_symbol_quantity': 0.01, 'trading_fee': 0.0015, 'prob_threshold': 0.5,
+        'smoothing_method': 'rolling', 'span': 8, 'stop_loss': 0.0075, 'take_profit': 0.0075,
+        'model_path': model_path, 'features_path': features_path, 'data_processor': processor,
+    }).build_strategy()
+
+    def full_recompute():
+        strategy.feature_engine.reset()
+        strategy.generate_tbl_signal(klines, act=False)
+
+    results.append(measure('generate_tbl_signal', full_recompute, max(3, 20 // scale), warmup=1))
+
+
+def bench_order_manager(results, scale, exchange):
+    manager = BluefinOrderManager(private_key=None, trading_fee=0.0015, quantity=0.01, client=exchange)
+    iterations = max(5, 200 // scale) if exchange.latency else 2000 // scale
+
+    def cancel_resting():
+        manager.cancel_all_orders()
+
+    results.append(measure('fetch_current_positions',
+                           lambda: manager.fetch_current_positions(max_age=0), iterations))
+    results.append(measure('place_bracket_orders',
+                           lambda: manager.place_bracket_orders(2950.0, 3050.0, 'long', quantity=0.01),
+                           iterations, setup=cancel_resting))
+
+    desired = bracket_orders('long', 2950.0, 3050.0, 0.01)
+    manager.reconcile_orders(desired)
+    results.append(measure('reconcile_orders_steady', lambda: manager.reconcile_orders(desired), iterations))
+    results.append(measure('cancel_all_orders', manager.cancel_all_orders, iterations,
+                           setup=lambda: manager.place_take_profit_order(3050.0, 'long', quantity=0.01)))
+
+    # Each fill waits for the tracker to confirm, so this one runs far fewer iterations.
+    results.append(measure('open_position_at_market',
+                           lambda: manager.open_position_at_market(1, quantity=0.01), max(3, iterations // 20),
+                           warmup=1))
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for result in results:
+        base = baseline.get(result['name'])
+        if base is None:
+            continue
+        change = result['p50_us'] / base['p50_us'] - 1
+        result['p50_change'] = change
+        if change > tolerance:
+            regressions.append((result['name'], base['p50_us'], result['p50_us'], change))
+    return regressions
+
+
+def parse_bench_args():
+    parser = argparse.ArgumentParser(description='Benchmark the signal and order-management hot paths offline.')
+    parser.add_argument('--latency_ms', type=float, default=0.0, help='Fake exchange latency per call')
+    parser.add_argument('--jitter_ms', type=float, default=0.0, help='Uniform jitter added to each call')
+    parser.add_argument('--rate_limit', type=float, default=None, help='Simulated exchange requests per second')
+    parser.add_argument('--fill_ratio', type=float, default=1.0,
+                        help='Fraction of an order filled per match; below 1 orders fill partially')
+    parser.add_argument('--bars', type=int, default=2000, help='Number of synthetic klines')
+    parser.add_argument('--quick', action='store_true', help='Run 10x fewer iterations')
+    parser.add_argument('--model_path', type=str, default=None,
+                        help='Model artifact; enables the generate_tbl_signal benchmark')
+    parser.add_argument('--features_path', type=str, default=None)
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE)
+    parser.add_argument('--save_baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown vs. baseline')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_bench_args()
+    setup_logging(debug=False)
+    logging.getLogger().setLevel(logging.WARNING)
+    random.seed(0)
+    scale = 10 if args.quick else 1
+    klines = synthetic_klines(args.bars)
+
+    results = []
+    bench_pure(results, scale)
+    bench_process_predictions(results, scale, klines)
+    if args.model_path and args.features_path:
+        bench_generate_tbl_signal(results, scale, klines, args.model_path, args.features_path)
+    exchange = SimulatedBluefinExchange(price=3000.0, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                                        rate_limit=args.rate_limit, fill_ratio=args.fill_ratio, seed=0)
+    bench_order_manager(results, scale, exchange)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+
+    table = pd.DataFrame(results).set_index('name')
+    print(table.to_string(float_format=lambda v: f'{v:,.2f}'))
+    print(f'Exchange: {exchange.stats()}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'time': time.time(), 'latency_ms': args.latency_ms, 'bars': args.bars,
+                       'results': {r['name']: r for r in results}}, f, indent=2)
+        print(f'Saved baseline to {args.baseline}')
+    if regressions:
+        for name, before, after, change in regressions:
+            print(f'REGRESSION {name}: p50 {before:,.1f}us -> {after:,.1f}us ({change:+.0%})')
+        raise SystemExit(1)
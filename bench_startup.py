@@ -0,0 +1,94 @@
+"""
+Startup import benchmark.
+
+Imports each module in a fresh interpreter with `python -X importtime` and reports its
+cumulative import time, the slowest modules it pulled in, and the wall time of the CLI
+entry points' --help. Modules that fail to import (e.g. a dependency is not installed)
+are reported instead of aborting the run.
+
+    python bench_startup.py
+    python bench_startup.py --modules signals_tbl_eth_bluefin pandas --top 15 --repeat 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = [
+    'signals_tbl_eth_bluefin', 'portfolio_runner', 'order_manager_bluefin', 'replay', 'param_sweep',
+    'numpy', 'pandas', 'joblib', 'lightgbm', 'bluefin_v2_client',
+    'feature_selection_tbl_single_backtest', 'data_processor', 'binance_client', 'mining.utils',
+]
+DEFAULT_ENTRY_POINTS = ['signals_tbl_eth_bluefin.py', 'portfolio_runner.py', 'replay.py', 'param_sweep.py']
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_profile(module):
+    """
+    Imports `module` in a fresh interpreter.
+
+    :return: (cumulative seconds or None on failure, [(cumulative seconds, name)] of every
+             module imported, error text)
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=HERE, capture_output=True, text=True)
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((int(match.group(2)) / 1e6, match.group(4)))
+    if proc.returncode != 0:
+        error = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        return None, entries, error[-1] if error else f'exit code {proc.returncode}'
+    total = next((seconds for seconds, name in reversed(entries) if name == module), None)
+    return total, entries, None
+
+
+def help_wall_time(script):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, script, '--help'], cwd=HERE, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    return (elapsed if proc.returncode == 0 else None), (proc.stderr.strip().splitlines() or [''])[-1]
+
+
+def parse_startup_args():
+    parser = argparse.ArgumentParser(description='Measure per-module import time and CLI startup time.')
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES)
+    parser.add_argument('--entry_points', nargs='+', default=DEFAULT_ENTRY_POINTS)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the minimum is reported')
+    parser.add_argument('--top', type=int, default=5, help='Slowest transitive imports to list per module')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_startup_args()
+
+    print(f"{'module':<40} {'import ms':>10}")
+    for module in args.modules:
+        best, best_entries, error = None, [], None
+        for _ in range(args.repeat):
+            total, entries, error = import_profile(module)
+            if total is None:
+                break
+            if best is None or total < best:
+                best, best_entries = total, entries
+        if best is None:
+            print(f'{module:<40} {"failed":>10}  ({error})')
+            continue
+        print(f'{module:<40} {best * 1000:>10.1f}')
+        slowest = sorted((e for e in best_entries if e[1] != module), reverse=True)[:args.top]
+        for seconds, name in slowest:
+            print(f'    {name:<36} {seconds * 1000:>10.1f}')
+
+    print(f"\n{'entry point --help':<40} {'wall ms':>10}")
+    for script in args.entry_points:
+        times = [help_wall_time(script) for _ in range(args.repeat)]
+        ok = [t for t, _ in times if t is not None]
+        if ok:
+            print(f'{script:<40} {min(ok) * 1000:>10.1f}')
+        else:
+            print(f'{script:<40} {"failed":>10}  ({times[-1][1]})')
@@ -0,0 +1,109 @@
+"""
+Parsers for Bluefin position and order payloads.
+
+Bluefin returns numeric fields as integer strings scaled by 10**18. The fast path
+parses them with int() and a true division by the integer scale, which Python rounds
+correctly, so it matches float(Decimal(value) / Decimal(10 ** 18)) for every value
+with up to 28 significant digits while skipping the Decimal machinery. Values that are
+not ints or plain integer strings (decimal strings, floats, Decimals) go through
+Decimal, so a fractional value is never truncated. Pass exact=True to get Decimals.
+
+tests/test_bluefin_parser.py checks the equivalence on seeded random values. Run this
+module directly for a micro-benchmark against the previous per-field Decimal path.
+"""
+import logging
+from decimal import Decimal
+
+BASE18 = 10 ** 18
+_DECIMAL_BASE18 = Decimal(BASE18)
+
+POSITION_KEYS_TO_SCALE = frozenset([
+    "avgEntryPrice", "indexPrice", "leverage", "liquidationPrice", "margin",
+    "midMarketPrice", "netMargin", "oraclePrice", "positionSelectedLeverage",
+    "positionValue", "quantity", "unrealizedProfit", "unrealizedProfitPercent",
+    "fundingDue",
+])
+ORDER_KEYS_TO_SCALE = frozenset([
+    "price", "quantity", "filledQty", "leverage", "triggerPrice", "avgFillPrice", "fee",
+])
+
+
+def scale_base18(value, exact=False):
+    """Converts a 10**18-scaled value (int, float, Decimal or numeric str) to float or Decimal."""
+    if exact:
+        return Decimal(value) / _DECIMAL_BASE18
+    if isinstance(value, int):
+        return value / BASE18
+    if isinstance(value, str):
+        try:
+            return int(value) / BASE18
+        except ValueError:
+            pass
+    return float(Decimal(value) / _DECIMAL_BASE18)
+
+
+def _parse(payload, keys, exact):
+    parsed = dict(payload)
+    for key in keys.intersection(payload):
+        value = payload[key]
+        try:
+            parsed[key] = scale_base18(value, exact)
+        except Exception as e:
+            logging.error("Error parsing key %s with value %s: %s", key, value, e)
+    return parsed
+
+
+def parse_position(position: dict, exact=False) -> dict:
+    """Returns a copy of a Bluefin position with the scaled fields converted."""
+    return _parse(position, POSITION_KEYS_TO_SCALE, exact)
+
+
+def parse_order(order: dict, exact=False) -> dict:
+    """Returns a copy of a Bluefin order with the scaled fields converted."""
+    return _parse(order, ORDER_KEYS_TO_SCALE, exact)
+
+
+def parse_orders(orders, exact=False) -> list:
+    """Parses a get_orders response (list of orders) in bulk."""
+    keys = ORDER_KEYS_TO_SCALE
+    return [_parse(order, keys, exact) for order in orders or []]
+
+
+def _legacy_parse_position(position):
+    keys_to_scale = [
+        "avgEntryPrice", "indexPrice", "leverage", "liquidationPrice", "margin",
+        "midMarketPrice", "netMargin", "oraclePrice", "positionSelectedLeverage",
+        "positionValue", "quantity", "unrealizedProfit", "unrealizedProfitPercent",
+        "fundingDue",
+    ]
+    parsed = {}
+    for key, value in position.items():
+        if key in keys_to_scale:
+            parsed[key] = float(Decimal(value) / Decimal(10 ** 18))
+        else:
+            parsed[key] = value
+    return parsed
+
+
+def _random_scaled(rng):
+    digits = rng.randint(1, 28)
+    value = str(rng.randrange(10 ** (digits - 1), 10 ** digits))
+    return '-' + value if rng.random() < 0.2 else value
+
+
+if __name__ == '__main__':
+    import random
+    import timeit
+
+    rng = random.Random(0)
+    position = {key: _random_scaled(rng) for key in POSITION_KEYS_TO_SCALE}
+    position.update({"symbol": "ETH-PERP", "side": "BUY", "userAddress": "0x0"})
+
+    n = 20000
+    legacy = timeit.timeit(lambda: _legacy_parse_position(position), number=n)
+    fast = timeit.timeit(lambda: parse_position(position), number=n)
+    print(f'parse_position: legacy {legacy / n * 1e6:.2f}us, fast {fast / n * 1e6:.2f}us ({legacy / fast:.1f}x)')
+
+    orders = [{key: _random_scaled(rng) for key in ORDER_KEYS_TO_SCALE} | {"hash": str(i)} for i in range(500)]
+    bulk = timeit.timeit(lambda: parse_orders(orders), number=100)
+    print(f'parse_orders: {bulk / 100 * 1e3:.2f}ms per 500 orders')
@@ -0,0 +1,358 @@
+"""
+In-process stand-in for the BluefinClient surface BluefinOrderManager uses, for load and
+latency testing without real money:
+
+    exchange = SimulatedBluefinExchange(price=3000, latency=0.05, jitter=0.02, rate_limit=10)
+    manager = BluefinOrderManager(private_key=None, trading_fee=0.0015, quantity=0.01, client=exchange)
+    exchange.set_price(2990)  # matches resting orders against the new price
+
+Payloads mirror Bluefin's: numeric fields are 10**18-scaled integer strings and sides,
+order types and statuses are their string values.
+"""
+import asyncio
+import itertools
+import logging
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from bluefin_parser import BASE18
+
+OPEN_STATUSES = ('STANDBY', 'PENDING', 'OPEN', 'PARTIAL_FILLED')
+
+
+class RateLimitExceeded(Exception):
+    """Raised by the simulator when a call exceeds the configured request rate."""
+
+
+class Unauthorized(Exception):
+    """Raised by the simulator when an account call is made without a valid auth token."""
+
+
+def _value(value):
+    return str(getattr(value, 'value', value)).upper()
+
+
+def _scaled(value):
+    return str(int(round(float(value) * BASE18)))
+
+
+class SimulatedBluefinExchange:
+    """
+    Single-account matching engine for one or more markets.
+
+    - Market orders fill at the current price plus `slippage` (fraction) against the trader.
+    - LIMIT orders rest and fill at their price once the market reaches it. STOP_LIMIT
+      orders wait in STANDBY until the price crosses their trigger and then fill at the
+      market, so a stop is never skipped by a gap.
+    - Each match fills at most `fill_ratio` of an order's original quantity (at least
+      `min_fill` of it), so with fill_ratio < 1 orders go through PARTIAL_FILLED and the
+      remainder is filled by a background matcher every `match_interval` seconds.
+    - Every awaited call sleeps `latency * slowdown` plus uniform `jitter`, and counts
+      against a token bucket of `rate_limit` requests per second (burst `burst`); calls
+      over the limit raise RateLimitExceeded.
+    - Orders whose leverage does not match the account's are rejected with an error
+      payload, like the exchange does, and so are orders of a type listed in
+      `rejected_order_types` (e.g. {'LIMIT'}), to exercise a failed bracket leg.
+    - Account calls need the auth token installed on `apis` (by init(True) or by the
+      caller, like BluefinClient); onboard_user(None) signs a new one and counts it in
+      `onboarding_signatures`. revoke_tokens() expires every issued token.
+
+    Positions are one-way per symbol, with average entry price, realized PnL and fees
+    (`trading_fee` on every fill's notional) tracked for reporting.
+    """
+
+    def __init__(self, price=3000.0, leverage=20, latency=0.0, jitter=0.0, rate_limit=None, burst=None,
+                 fill_ratio=1.0, min_fill=0.0, match_interval=0.05, slippage=0.0, trading_fee=0.0,
+                 seed=None):
+        self.price = float(price)
+        self.default_leverage = leverage
+        self.latency = latency
+        self.jitter = jitter
+        self.slowdown = 1.0
+        self.rate_limit = rate_limit
+        self.burst = burst if burst is not None else (rate_limit or 0)
+        self.fill_ratio = fill_ratio
+        self.min_fill = min_fill
+        self.match_interval = match_interval
+        self.slippage = slippage
+        self.trading_fee = trading_fee
+
+        self.socket = None  # No order-update socket; the order tracker falls back to polling.
+        self.ws_client = None
+        self.apis = SimpleNamespace(auth_token=None)
+        self.dms_api = SimpleNamespace(auth_token=None)
+        self._tokens_issued = itertools.count(1)
+        self.valid_tokens = set()
+        self.onboarding_signatures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._hashes = itertools.count(1)
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._matcher = None
+        self._loop = None
+
+        self.leverage = {}
+        self.rejected_order_types = set()
+        self.orders = {}
+        self.positions = {}
+
+        self.calls = 0
+        self.calls_by_method = {}
+        self.rate_limited = 0
+        self.orders_posted = 0
+        self.orders_rejected = 0
+        self.orders_cancelled = 0
+        self.fills = 0
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+
+    # Simulation controls ------------------------------------------------------------
+
+    def set_price(self, price):
+        """Moves the market to `price` and matches resting orders against it."""
+        with self._lock:
+            self.price = float(price)
+            self._match()
+        # set_price may be called from outside the event loop, so start the matcher there.
+        if self.fill_ratio < 1 and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._ensure_matcher)
+
+    def step_price(self, volatility=0.001):
+        """Random-walk step of the market price; returns the new price."""
+        self.set_price(self.price * (1 + self._rng.gauss(0, volatility)))
+        return self.price
+
+    def revoke_tokens(self):
+        """Expires every issued auth token, like a token past its lifetime."""
+        self.valid_tokens.clear()
+
+    def set_slowdown(self, factor):
+        """Multiplies the configured latency, e.g. 10 to simulate a degraded exchange."""
+        self.slowdown = factor
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'calls_by_method': dict(self.calls_by_method),
+                'rate_limited': self.rate_limited,
+                'onboarding_signatures': self.onboarding_signatures,
+                'orders_posted': self.orders_posted,
+                'orders_rejected': self.orders_rejected,
+                'orders_cancelled': self.orders_cancelled,
+                'open_orders': sum(1 for o in self.orders.values() if o['orderStatus'] in OPEN_STATUSES),
+                'fills': self.fills,
+                'realized_pnl': self.realized_pnl,
+                'fees': self.fees,
+            }
+
+    # Transport ----------------------------------------------------------------------
+
+    async def _call(self, method, authenticated=True):
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            self.calls += 1
+            self.calls_by_method[method] = self.calls_by_method.get(method, 0) + 1
+            if authenticated and self.apis.auth_token not in self.valid_tokens:
+                raise Unauthorized(f'401 Unauthorized: {method}')
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_limit)
+                self._refilled_at = now
+                if self._tokens < 1:
+                    self.rate_limited += 1
+                    raise RateLimitExceeded(f'429 Too Many Requests: {method}')
+                self._tokens -= 1
+        delay = self.latency * self.slowdown + self._rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # BluefinClient surface ----------------------------------------------------------
+
+    async def onboard_user(self, token=None):
+        await self._call('onboard_user', authenticated=False)
+        if token:
+            return token
+        with self._lock:
+            self.onboarding_signatures += 1
+            token = f'simulated-auth-token-{next(self._tokens_issued)}'
+            self.valid_tokens.add(token)
+        return token
+
+    async def init(self, user_onboarding=True, api_token=''):
+        await self._call('init', authenticated=False)
+        if user_onboarding:
+            self.apis.auth_token = await self.onboard_user()
+            self.dms_api.auth_token = self.apis.auth_token
+        return True
+
+    async def get_user_leverage(self, symbol):
+        await self._call('get_user_leverage')
+        return self.leverage.get(_value(symbol), self.default_leverage)
+
+    async def adjust_leverage(self, symbol, leverage, parentAddress=''):
+        await self._call('adjust_leverage')
+        self.leverage[_value(symbol)] = leverage
+        return True
+
+    def create_signed_order(self, request):
+        get = request.get if isinstance(request, dict) else lambda key, default=None: getattr(request, key, default)
+        return {
+            'symbol': _value(get('symbol')),
+            'side': _value(get('side')),
+            'orderType': _value(get('orderType')),
+            'price': float(get('price') or 0),
+            'quantity': float(get('quantity')),
+            'triggerPrice': float(get('triggerPrice') or 0),
+            'leverage': get('leverage'),
+            'postOnly': bool(get('postOnly', False)),
+            'reduceOnly': bool(get('reduceOnly', False)),
+        }
+
+    async def post_signed_order(self, signed_order):
+        await self._call('post_signed_order')
+        with self._lock:
+            symbol = signed_order['symbol']
+            account_leverage = self.leverage.get(symbol, self.default_leverage)
+            if signed_order['leverage'] is not None and signed_order['leverage'] != account_leverage:
+                self.orders_rejected += 1
+                return {'error': f"Leverage mismatch: order {signed_order['leverage']}, account {account_leverage}"}
+            if signed_order['orderType'] in self.rejected_order_types:
+                self.orders_rejected += 1
+                return {'error': f"Simulated rejection of {signed_order['orderType']} order"}
+
+            order = dict(signed_order, hash=f'0x{next(self._hashes):064x}', filledQty=0.0, avgFillPrice=0.0,
+                         createdAt=int(time.time() * 1000))
+            order['orderStatus'] = 'STANDBY' if order['orderType'] == 'STOP_LIMIT' else 'PENDING'
+            self.orders[order['hash']] = order
+            self.orders_posted += 1
+            self._match()
+            self._ensure_matcher()
+            return self._format_order(order)
+
+    async def get_orders(self, params):
+        await self._call('get_orders')
+        symbol = _value(params.get('symbol'))
+        # Like the exchange: open orders by default, or the given statuses / order hashes.
+        statuses = {_value(status) for status in params['statuses']} if params.get('statuses') else OPEN_STATUSES
+        hashes = set(params['orderHashes']) if params.get('orderHashes') else None
+        with self._lock:
+            return [self._format_order(order) for order in self.orders.values()
+                    if order['symbol'] == symbol and order['orderStatus'] in statuses
+                    and (hashes is None or order['hash'] in hashes)]
+
+    def create_signed_cancel_orders(self, symbol, order_hash, parentAddress=''):
+        return {'symbol': _value(symbol), 'hashes': list(order_hash)}
+
+    async def post_cancel_order(self, cancellation_request):
+        await self._call('post_cancel_order')
+        accepted, failed = [], []
+        with self._lock:
+            for order_hash in cancellation_request['hashes']:
+                order = self.orders.get(order_hash)
+                if order is None or order['orderStatus'] not in OPEN_STATUSES:
+                    failed.append(order_hash)
+                    continue
+                order['orderStatus'] = 'CANCELLED'
+                accepted.append(order_hash)
+            self.orders_cancelled += len(accepted)
+        return {'acceptedForCancelling': accepted, 'failedCancellations': failed}
+
+    async def get_user_position(self, params):
+        await self._call('get_user_position')
+        symbol = _value(params.get('symbol'))
+        with self._lock:
+            position = self.positions.get(symbol)
+            if not position or position['quantity'] == 0:
+                return {}
+            quantity = abs(position['quantity'])
+            leverage = self.leverage.get(symbol, self.default_leverage)
+            direction = 1 if position['quantity'] > 0 else -1
+            return {
+                'symbol': symbol,
+                'side': 'BUY' if direction > 0 else 'SELL',
+                'quantity': _scaled(quantity),
+                'avgEntryPrice': _scaled(position['entry']),
+                'positionValue': _scaled(quantity * position['entry']),
+                'margin': _scaled(quantity * position['entry'] / leverage),
+                'leverage': _scaled(leverage),
+                'oraclePrice': _scaled(self.price),
+                'unrealizedProfit': _scaled((self.price - position['entry']) * position['quantity']),
+            }
+
+    # Matching engine ----------------------------------------------------------------
+
+    def _format_order(self, order):
+        formatted = {key: order[key] for key in ('hash', 'symbol', 'side', 'orderType', 'orderStatus',
+                                                 'postOnly', 'reduceOnly', 'createdAt')}
+        for key in ('price', 'quantity', 'filledQty', 'triggerPrice', 'avgFillPrice', 'leverage'):
+            formatted[key] = _scaled(order[key] or 0)
+        return formatted
+
+    def _fill_price(self, order):
+        """Price at which the order can fill now, or None if it cannot."""
+        buy = order['side'] == 'BUY'
+        if order['orderType'] == 'MARKET':
+            return self.price * (1 + self.slippage if buy else 1 - self.slippage)
+        if order['orderType'] == 'STOP_LIMIT':
+            if order['orderStatus'] == 'STANDBY':
+                trigger = order['triggerPrice'] or order['price']
+                if (buy and self.price < trigger) or (not buy and self.price > trigger):
+                    return None
+                order['orderStatus'] = 'OPEN'
+            return self.price
+        if (buy and self.price <= order['price']) or (not buy and self.price >= order['price']):
+            return order['price']
+        return None
+
+    def _match(self):
+        for order in list(self.orders.values()):
+            if order['orderStatus'] not in OPEN_STATUSES:
+                continue
+            price = self._fill_price(order)
+            if price is None:
+                continue
+            remaining = order['quantity'] - order['filledQty']
+            chunk = min(remaining, max(order['quantity'] * self.fill_ratio, self.min_fill))
+            self._fill(order, chunk, price)
+
+    def _fill(self, order, quantity, price):
+        filled = order['filledQty']
+        order['avgFillPrice'] = (order['avgFillPrice'] * filled + price * quantity) / (filled + quantity)
+        order['filledQty'] = filled + quantity
+        order['orderStatus'] = 'FILLED' if order['filledQty'] >= order['quantity'] - 1e-12 else 'PARTIAL_FILLED'
+        self.fills += 1
+        self.fees += price * quantity * self.trading_fee
+
+        position = self.positions.setdefault(order['symbol'], {'quantity': 0.0, 'entry': 0.0})
+        signed = quantity if order['side'] == 'BUY' else -quantity
+        current = position['quantity']
+        if current == 0 or (current > 0) == (signed > 0):
+            position['entry'] = (position['entry'] * abs(current) + price * quantity) / (abs(current) + quantity)
+        else:
+            closed = min(abs(current), quantity)
+            self.realized_pnl += (price - position['entry']) * closed * (1 if current > 0 else -1)
+            if quantity > abs(current):
+                position['entry'] = price
+        position['quantity'] = current + signed
+        if abs(position['quantity']) < 1e-12:
+            position['quantity'] = 0.0
+        logging.debug("Simulated fill %s %s %.6f @ %.4f (%s)", order['hash'][:10], order['side'],
+                      quantity, price, order['orderStatus'])
+
+    def _ensure_matcher(self):
+        """Starts the background matcher while partially filled orders can keep filling."""
+        if self.fill_ratio >= 1 or (self._matcher is not None and not self._matcher.done()):
+            return
+        self._matcher = asyncio.get_running_loop().create_task(self._match_loop())
+
+    async def _match_loop(self):
+        while True:
+            await asyncio.sleep(self.match_interval)
+            with self._lock:
+                self._match()
+                if not any(o['orderStatus'] == 'PARTIAL_FILLED' for o in self.orders.values()):
+                    return
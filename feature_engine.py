@@ -0,0 +1,192 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class IncrementalFeatureEngine:
+    """
+    Incremental wrapper around CryptoDataProcessor.generate_features.
+
+    The first call computes features over the full kline history. Afterwards only
+    bars newer than the last cached close_time are processed: features are computed
+    over the new bars plus a warm-up window and the new rows are appended to the cached
+    feature frame. Cost per cycle is therefore O(new bars + warm-up) instead of O(history).
+
+    How much warm-up gives parity with a full recompute depends on the indicator family:
+
+    - Fixed-window indicators (rolling mean/std/min/max, lags, rolling-window patterns)
+      are exact once the warm-up covers the longest window; `warmup_bars` is for these.
+    - Recursive/EWM indicators (EMA, MACD, Wilder-smoothed RSI/ATR/ADX) depend on the
+      whole history, but the error decays like (1 - alpha) ** warm-up. Give their column
+      prefixes a longer warm-up in `feature_warmup`, e.g. about 20 x span for 1e-8.
+    - Running totals (OBV, accumulation/distribution, cumulative volume or returns)
+      never converge from a finite window. List their prefixes in `cumulative_columns`:
+      new rows are shifted by the offset between the cached value and the recomputed
+      value at the last cached bar, which is exact for additive running sums.
+
+    With a `store` (feature_store.ColumnarFeatureStore) every computed row is appended
+    to it, and the first call after a restart starts from the stored rows instead of
+    recomputing the full history, as long as the store overlaps the klines passed in.
+    If the store ends before the klines begin, the recomputed rows are appended as a new
+    store segment, and later restarts only load rows from that segment.
+
+    With `parity_check_every` the incremental rows are compared with a full recompute
+    (check_parity) after the first incremental update and then every that many, and any
+    mismatch is logged, so a missing warm-up or running-total prefix shows up in the logs.
+    """
+
+    def __init__(self, data_processor, warmup_bars=500, max_rows=2000, key='close_time', store=None,
+                 feature_warmup=None, cumulative_columns=(), parity_check_every=None):
+        self.data_processor = data_processor
+        self.warmup_bars = warmup_bars
+        # Column prefix -> warm-up bars for families that need more than warmup_bars.
+        self.feature_warmup = dict(feature_warmup or {})
+        self.cumulative_columns = tuple(cumulative_columns)
+        self.parity_check_every = parity_check_every
+        self.max_rows = max_rows
+        self.key = key
+        self.store = store
+        # Set when the store ends before the klines: the next append starts a new segment.
+        self._store_gap = False
+
+        self.features = None
+        self.last_key = None
+        self.last_update_seconds = float('nan')
+        self.last_new_bars = 0
+        self.incremental_updates = 0
+        self.parity_checks = 0
+        self.last_parity = None
+
+    def reset(self):
+        self.features = None
+        self.last_key = None
+
+    def update(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Appends features for bars in `data` that are newer than the last processed bar
+        and returns the cached feature frame.
+
+        :param data: Closed klines, ordered by close_time.
+        """
+        if data is None or len(data) == 0:
+            return self.features
+
+        start = time.perf_counter()
+        if self.features is None and self.store is not None and len(self.store):
+            self._load_from_store(data)
+        incremental = self.features is not None
+        if not incremental:
+            new_bars = len(data)
+            features = self.data_processor.generate_features(data)
+        else:
+            new_bars = int((data[self.key] > self.last_key).sum())
+            if new_bars == 0:
+                self.last_new_bars = 0
+                return self.features
+            window = data.iloc[-(new_bars + self.warmup_for(self.features.columns)):]
+            computed = self.data_processor.generate_features(window)
+            new_rows = self._reanchor(computed, computed.iloc[-new_bars:])
+            features = self._append(new_rows)
+            self.incremental_updates += 1
+        if self.store is not None:
+            try:
+                self.store.append(features.iloc[-new_bars:], new_segment=self._store_gap)
+                self._store_gap = False
+            except ValueError as e:
+                logging.warning(f'Feature store disabled, append failed: {e}')
+                self.store = None
+
+        self.features = features.iloc[-self.max_rows:]
+        self.last_key = data[self.key].iloc[-1]
+        self.last_new_bars = new_bars
+        self.last_update_seconds = time.perf_counter() - start
+        logging.info(f'Computed features for {new_bars} new bar(s) in {self.last_update_seconds:.3f}s')
+        if incremental and self.parity_check_every and (
+                self.incremental_updates == 1 or self.incremental_updates % self.parity_check_every == 0):
+            self._scheduled_parity_check(data)
+        return self.features
+
+    def _scheduled_parity_check(self, data):
+        self.parity_checks += 1
+        try:
+            self.last_parity = self.check_parity(data)
+        except Exception as e:
+            logging.warning(f'Feature parity check failed: {e}')
+            return
+        if not self.last_parity:
+            logging.info(f'Incremental features match a full recompute after {self.incremental_updates} update(s)')
+
+    def _load_from_store(self, data):
+        last_stored = self.store.last_key
+        first_bar = data[self.key].iloc[0]
+        # Stored rows are only usable if the klines still cover them, so the warm-up window exists.
+        if last_stored < first_bar:
+            logging.warning(f'Feature store ends at {last_stored}, {first_bar - last_stored} before the klines '
+                            f'begin; recomputing and starting a new store segment')
+            self._store_gap = True
+            return
+        if last_stored > data[self.key].iloc[-1]:
+            logging.info(f'Feature store ends at {last_stored}, after the klines; recomputing')
+            return
+        # The store keeps the original index and dtypes, so these rows line up with new ones.
+        self.features = self.store.read(start=self.store.segment_start, tail=self.max_rows)
+        self.last_key = last_stored
+        logging.info(f'Loaded {len(self.features)} feature rows from {self.store.path} up to {last_stored}')
+
+    def warmup_for(self, columns) -> int:
+        """Warm-up bars needed for a frame with these columns: the largest matching feature_warmup."""
+        bars = self.warmup_bars
+        for prefix, prefix_bars in self.feature_warmup.items():
+            if any(str(col).startswith(prefix) for col in columns):
+                bars = max(bars, prefix_bars)
+        return bars
+
+    def _reanchor(self, computed, new_rows):
+        """Shifts cumulative columns of `new_rows` so they continue from the cached rows."""
+        columns = [col for col in new_rows.columns if str(col).startswith(self.cumulative_columns)] \
+            if self.cumulative_columns else []
+        if not columns or len(computed) <= len(new_rows):
+            return new_rows
+        # The row before the new ones is the last cached bar, computed again from the window.
+        anchor = computed[columns].iloc[-(len(new_rows) + 1)].astype(float)
+        offset = self.features[columns].iloc[-1].astype(float) - anchor
+        new_rows = new_rows.copy()
+        new_rows[columns] = new_rows[columns].astype(float) + offset
+        return new_rows
+
+    def _append(self, new_rows):
+        cat_columns = self.features.select_dtypes(include=['category']).columns
+        combined = pd.concat([self.features, new_rows])
+        # concat drops the category dtype when the categories differ; restore it.
+        for col in cat_columns:
+            if combined[col].dtype.name != 'category':
+                combined[col] = combined[col].astype('category')
+        return combined
+
+    def check_parity(self, data: pd.DataFrame, rows=50, atol=1e-8) -> dict:
+        """
+        Recomputes features over the full history and compares the last `rows` rows
+        against the incremental result.
+
+        :return: Mapping of numeric column -> max absolute difference for columns that
+                 differ by more than `atol`. An empty dict means the two paths agree.
+        """
+        full = self.data_processor.generate_features(data).iloc[-rows:]
+        incremental = self.features.iloc[-rows:]
+        mismatches = {}
+        for col in full.select_dtypes(include=['number']).columns:
+            if col not in incremental.columns:
+                mismatches[col] = np.inf
+                continue
+            expected = full[col].to_numpy(dtype=float)
+            actual = incremental[col].to_numpy(dtype=float)
+            diff = np.abs(expected - actual)
+            both_nan = np.isnan(expected) & np.isnan(actual)
+            max_diff = np.nanmax(np.where(both_nan, 0.0, diff)) if len(diff) else 0.0
+            if not max_diff <= atol:
+                mismatches[col] = float(max_diff)
+        if mismatches:
+            logging.warning(f'Incremental features differ from full recompute: {mismatches}')
+        return mismatches
@@ -0,0 +1,193 @@
+"""
+Precompiled inference feature plan.
+
+The live model input used to be rebuilt every cycle: select_dtypes to split numeric and
+categorical columns, drop the CDL pattern columns, process_feature_name_format, then
+refit encode_categorical_features on the live window. Refitting means the same category
+can get a different code from one cycle to the next, or from training.
+
+FeaturePlan freezes all of that once: the source columns in model order, the formatted
+output names and, per categorical column, the value -> code table. transform() is then
+one column select into a preallocated float64 buffer plus one code lookup per
+categorical column. The plan is saved next to the model (model_path + PLAN_SUFFIX)
+together with the model digest, so it is rebuilt when the model changes.
+
+The codes must be the ones the model was trained with. They come from the booster's
+pandas_categorical (the category lists LightGBM keeps for category-dtype training
+columns) or from a training frame passed in. A plan whose codes could only be fitted on
+the live window is used for the session but never saved, so it cannot be frozen.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+
+joblib = lazy_import('joblib')
+process_feature_name_format = lazy_import('feature_selection_tbl_single_backtest', 'process_feature_name_format')
+encode_categorical_features = lazy_import('feature_selection_tbl_single_backtest', 'encode_categorical_features')
+
+PLAN_SUFFIX = '.plan.joblib'
+
+
+def plan_path_for(model_path):
+    return model_path + PLAN_SUFFIX
+
+
+# Where a plan's categorical codes came from.
+SOURCE_MODEL = 'model'
+SOURCE_TRAINING = 'training'
+SOURCE_LIVE = 'live'
+
+
+def model_categories(model):
+    """
+    Category lists the model was trained with, one per category-dtype training column in
+    column order, or None when it was trained on already encoded columns.
+    """
+    booster = getattr(model, 'booster_', model)
+    categories = getattr(booster, 'pandas_categorical', None)
+    return [list(values) for values in categories] if categories else None
+
+
+def _code_table(source_values, codes, encoder=None):
+    """value -> code, from a fitted encoder's classes_ when available, else from the fitted pairs."""
+    classes = getattr(encoder, 'classes_', None)
+    if classes is not None:
+        return {value: float(code) for code, value in enumerate(classes)}
+    pairs = pd.DataFrame({'value': source_values.astype(object).to_numpy(), 'code': np.asarray(codes)})
+    pairs = pairs.dropna().drop_duplicates('value')
+    return {value: float(code) for value, code in zip(pairs['value'], pairs['code'])}
+
+
+class FeaturePlan:
+    """
+    :param numeric_columns: Source columns copied as float64, in model order.
+    :param categorical_columns: Source columns encoded with `code_tables`, in model order.
+    :param output_columns: Names the model was trained with, numeric first.
+    :param code_tables: Per categorical source column, value -> code. Unknown values
+                        become NaN, which LightGBM treats as missing.
+    :param source: Where the codes came from: SOURCE_MODEL, SOURCE_TRAINING or SOURCE_LIVE.
+                   Plans saved before this was recorded were fitted on a live window.
+    """
+
+    def __init__(self, numeric_columns, categorical_columns, output_columns, code_tables, model_digest=None,
+                 source=SOURCE_LIVE):
+        if len(output_columns) != len(numeric_columns) + len(categorical_columns):
+            raise ValueError('Output columns do not line up with the source columns')
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.output_columns = list(output_columns)
+        self.code_tables = code_tables
+        self.model_digest = model_digest
+        self.source = source
+        self._categories = {col: pd.Index(list(table)) for col, table in code_tables.items()}
+        self._codes = {col: np.array(list(table.values()), dtype=np.float64) for col, table in code_tables.items()}
+        self._buffer = np.empty((0, len(self.output_columns)))
+
+    @property
+    def fitted_on_live(self):
+        """True if categorical codes were fitted on a live window rather than taken from training."""
+        return self.source == SOURCE_LIVE and bool(self.categorical_columns)
+
+    @classmethod
+    def build(cls, frame, features, model_digest=None, model=None, training_frame=None):
+        """
+        Derives the plan from a feature frame exactly the way inference used to. The
+        categorical codes come from `model`'s training categories if it has them, else from
+        encoders fitted on `training_frame`; only without either are they fitted on `frame`.
+        """
+        x = (frame if training_frame is None else training_frame)[features]
+        numeric = x.select_dtypes(include=['number']).columns.tolist()
+        categorical = [c for c in x.select_dtypes(include=['category']).columns.tolist() if 'CDL' not in c]
+        formatted, formatted_numeric, formatted_cat = process_feature_name_format(x[numeric + categorical],
+                                                                                  numeric, categorical)
+        encoded, label_encoders = encode_categorical_features(formatted, formatted_cat)
+        # transform() writes numeric columns first, then categorical ones, under these names.
+        if list(encoded.columns) != list(formatted_numeric) + list(formatted_cat):
+            raise ValueError(f'Encoded columns are not numeric then categorical: {list(encoded.columns)}')
+
+        categories = model_categories(model) if model is not None and categorical else None
+        if categories is not None and len(categories) != len(categorical):
+            logging.warning(f'Model has {len(categories)} training category lists for {len(categorical)} '
+                            f'categorical features; ignoring them')
+            categories = None
+
+        code_tables = {}
+        if categories is not None:
+            source = SOURCE_MODEL
+            for col, values in zip(categorical, categories):
+                code_tables[col] = {value: float(code) for code, value in enumerate(values)}
+        else:
+            source = SOURCE_TRAINING if training_frame is not None else SOURCE_LIVE
+            for col, name in zip(categorical, formatted_cat):
+                encoder = label_encoders.get(name) if isinstance(label_encoders, dict) else None
+                code_tables[col] = _code_table(x[col], encoded[name], encoder)
+        return cls(numeric, categorical, list(encoded.columns), code_tables, model_digest, source)
+
+    def transform(self, frame) -> pd.DataFrame:
+        """
+        Returns the model input for every row of `frame`. The result is a view of a
+        buffer reused across calls, so consume it before the next transform().
+        """
+        n = len(frame)
+        if self._buffer.shape[0] < n:
+            self._buffer = np.empty((n, len(self.output_columns)))
+        out = self._buffer[:n]
+
+        n_numeric = len(self.numeric_columns)
+        if n_numeric:
+            out[:, :n_numeric] = frame[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        for j, col in enumerate(self.categorical_columns, start=n_numeric):
+            idx = self._categories[col].get_indexer(frame[col].astype(object))
+            out[:, j] = np.where(idx >= 0, self._codes[col][idx], np.nan)
+        return pd.DataFrame(out, columns=self.output_columns, index=frame.index, copy=False)
+
+    def save(self, path):
+        if self.fitted_on_live:
+            raise ValueError('Categorical codes were fitted on a live window; refusing to freeze them')
+        tmp = path + '.tmp'
+        joblib.dump({'numeric_columns': self.numeric_columns, 'categorical_columns': self.categorical_columns,
+                     'output_columns': self.output_columns, 'code_tables': self.code_tables,
+                     'model_digest': self.model_digest, 'source': self.source}, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(**joblib.load(path))
+
+
+def load_or_build_plan(model_path, model_digest, frame, features, model=None, training_frame=None):
+    """
+    Returns the plan saved next to the model if it was built for this model digest;
+    otherwise builds one (see FeaturePlan.build) and saves it, unless its codes could
+    only be fitted on the live `frame`.
+    """
+    path = plan_path_for(model_path)
+    if os.path.exists(path):
+        try:
+            plan = FeaturePlan.load(path)
+            if plan.model_digest != model_digest or not set(plan.numeric_columns + plan.categorical_columns) <= set(features):
+                logging.info(f'Feature plan at {path} is for another model; rebuilding')
+            elif plan.fitted_on_live:
+                logging.warning(f'Feature plan at {path} has codes fitted on a live window; rebuilding')
+            else:
+                logging.info(f'Loaded feature plan from {path}')
+                return plan
+        except Exception as e:
+            logging.warning(f'Failed to load feature plan from {path}, rebuilding: {e}')
+
+    plan = FeaturePlan.build(frame, features, model_digest, model=model, training_frame=training_frame)
+    if plan.fitted_on_live:
+        logging.error(f'No training categories for {model_path}: categorical codes were fitted on the live '
+                      f'window and may not match training. Not saving the plan; pass a training frame '
+                      f'or a model trained on category columns')
+        return plan
+    try:
+        plan.save(path)
+        logging.info(f'Saved feature plan with {len(plan.output_columns)} columns to {path}')
+    except OSError as e:
+        logging.warning(f'Failed to save feature plan to {path}: {e}')
+    return plan
@@ -0,0 +1,283 @@
+"""
+Append-only columnar feature store keyed by bar close time.
+
+Each column lives in its own raw little-endian file under the store directory and is read
+through np.memmap, so loading months of features maps the files instead of recomputing
+them or querying SQLite row by row. meta.json holds the schema and the committed row
+count. Every append fsyncs the column files and then replaces meta.json atomically, so
+a crash or power loss mid-append leaves only uncommitted bytes that the next append
+truncates.
+
+    store = ColumnarFeatureStore('./models/ETHUSDT_features')
+    store.append(features)              # only rows newer than store.last_key are written
+    closes = store.column('close')      # zero-copy read-only view
+    recent = store.read(tail=2000)      # DataFrame (copies into pandas blocks)
+
+Run this module directly for an append/read benchmark on synthetic features.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.bin'
+
+
+class ColumnarFeatureStore:
+    """
+    Numeric and bool columns are stored as-is, datetimes as int64 nanoseconds and
+    categorical/object/string columns as int32 codes with their categories kept in
+    meta.json. The original pandas dtype and the frame's index (when numeric or datetime)
+    are stored too, so read() returns what was appended. The schema is fixed by the first
+    append; use a new path when the feature set changes.
+
+    Appending with new_segment=True records that the rows do not continue the previous
+    ones (e.g. after a gap in the klines); segment_start is where the last segment begins.
+
+    :param fsync: fsync the column files before committing meta.json. Turning it off
+                  keeps appends crash-safe for process crashes only.
+    """
+
+    def __init__(self, path, key='close_time', fsync=True):
+        self.path = path
+        self.key = key
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._maps = {}
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+            if self.meta['key'] != key:
+                raise ValueError(f"Store at {path} is keyed by {self.meta['key']}, not {key}")
+        else:
+            self.meta = {'key': key, 'rows': 0, 'columns': [], 'index': None, 'segments': []}
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def columns(self):
+        return [col['name'] for col in self.meta['columns']]
+
+    @property
+    def last_key(self):
+        """Close time of the last stored bar, or None when the store is empty."""
+        if not len(self):
+            return None
+        return pd.Timestamp(int(self.column(self.key)[-1]))
+
+    @property
+    def segment_start(self):
+        """Close time of the first bar of the last segment, or None if there is only one."""
+        segments = self.meta.get('segments')
+        return pd.Timestamp(segments[-1]) if segments else None
+
+    # Schema -------------------------------------------------------------------------
+
+    @staticmethod
+    def _describe(name, series):
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            return {'name': name, 'kind': 'category', 'dtype': '<i4', 'categories': dtype.categories.tolist()}
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            if getattr(dtype, 'tz', None) is not None:
+                raise ValueError(f'Column {name} is timezone-aware; store naive UTC datetimes')
+            return {'name': name, 'kind': 'datetime', 'dtype': '<i8', 'pandas_dtype': str(dtype)}
+        if pd.api.types.is_bool_dtype(dtype):
+            return {'name': name, 'kind': 'numeric', 'dtype': '|b1'}
+        if pd.api.types.is_numeric_dtype(dtype):
+            return {'name': name, 'kind': 'numeric', 'dtype': np.dtype(dtype).newbyteorder('<').str}
+        # Object/string columns are dictionary-encoded and decoded back to their own dtype.
+        return {'name': name, 'kind': 'category', 'dtype': '<i4', 'categories': [], 'pandas_dtype': str(dtype)}
+
+    @classmethod
+    def _describe_index(cls, index):
+        if not (pd.api.types.is_numeric_dtype(index.dtype) or pd.api.types.is_datetime64_any_dtype(index.dtype)):
+            logging.warning(f'Feature store cannot keep a {index.dtype} index; reads return a RangeIndex')
+            return None
+        spec = cls._describe('__index__', pd.Series(index))
+        spec['index_name'] = index.name
+        return spec
+
+    def _file(self, i):
+        return os.path.join(self.path, f'{i:05d}.bin')
+
+    def _encode(self, spec, series):
+        kind = spec['kind']
+        if kind == 'datetime':
+            return series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if kind == 'category':
+            values = series.astype(object)
+            known = spec['categories']
+            seen = set(known)
+            new = [v for v in pd.unique(values.dropna()) if v not in seen]
+            known.extend(v.item() if isinstance(v, np.generic) else v for v in new)
+            return pd.Categorical(values, categories=known).codes.astype(np.int32)
+        return series.to_numpy(dtype=np.dtype(spec['dtype']))
+
+    def _decode(self, spec, values):
+        target = spec.get('pandas_dtype')
+        if spec['kind'] == 'datetime':
+            values = values.view('datetime64[ns]')
+            return values.astype(target) if target and target != 'datetime64[ns]' else values
+        if spec['kind'] == 'category':
+            categorical = pd.Categorical.from_codes(values, categories=spec['categories'])
+            if target is None:
+                return categorical
+            return pd.array(np.asarray(categorical, dtype=object), dtype=target)
+        return values
+
+    # Writes -------------------------------------------------------------------------
+
+    def append(self, frame: pd.DataFrame, new_segment=False) -> int:
+        """
+        Appends the rows of `frame` whose key is newer than last_key and returns how many
+        were written. Frames must have the store's columns; the first append sets them.
+
+        :param new_segment: The rows do not continue the stored ones (see segment_start).
+        """
+        with self._lock:
+            if frame is None or len(frame) == 0:
+                return 0
+            if not self.meta['columns']:
+                if self.key not in frame.columns:
+                    raise ValueError(f'Features have no {self.key} column')
+                self.meta['columns'] = [self._describe(name, frame[name]) for name in frame.columns]
+                self.meta['index'] = self._describe_index(frame.index)
+            elif set(frame.columns) != set(self.columns):
+                raise ValueError(f'Feature columns changed; expected the schema stored at {self.path}')
+
+            keys = frame[self.key].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            if self.meta['rows']:
+                new = keys > self._column_array(self.key)[-1]
+                frame, keys = frame[new], keys[new]
+            if len(frame) == 0:
+                return 0
+            if np.any(np.diff(keys) <= 0):
+                raise ValueError(f'Rows must be strictly increasing in {self.key}')
+
+            rows = self.meta['rows']
+            targets = [(spec, self._file(i), frame[spec['name']]) for i, spec in enumerate(self.meta['columns'])]
+            if self.meta.get('index') is not None:
+                targets.append((self.meta['index'], os.path.join(self.path, INDEX_FILE),
+                                pd.Series(frame.index, index=frame.index)))
+            for spec, path, series in targets:
+                values = np.ascontiguousarray(self._encode(spec, series))
+                with open(path, 'ab') as f:
+                    # Drop bytes from an append that crashed before meta.json was committed.
+                    f.truncate(rows * np.dtype(spec['dtype']).itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(values.tobytes())
+                    if self.fsync:
+                        # The data must be on disk before meta.json says it is committed.
+                        f.flush()
+                        os.fsync(f.fileno())
+            if new_segment and rows:
+                self.meta.setdefault('segments', []).append(int(keys[0]))
+            self.meta['rows'] = rows + len(frame)
+            self._commit()
+            self._maps = {}
+            return len(frame)
+
+    def _commit(self):
+        meta_path = os.path.join(self.path, META_FILE)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(self.meta, f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(meta_path + '.tmp', meta_path)
+        if self.fsync and hasattr(os, 'O_DIRECTORY'):
+            # Persist the rename itself.
+            fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    # Reads --------------------------------------------------------------------------
+
+    def _column_array(self, name):
+        i = self.columns.index(name)
+        return self._mapped(i, self.meta['columns'][i], self._file(i))
+
+    def _mapped(self, cache_key, spec, path):
+        rows = self.meta['rows']
+        cached = self._maps.get(cache_key)
+        if cached is not None and len(cached) == rows:
+            return cached
+        if rows == 0:
+            values = np.empty(0, dtype=spec['dtype'])
+        else:
+            values = np.memmap(path, dtype=spec['dtype'], mode='r', shape=(rows,))
+        self._maps[cache_key] = values
+        return values
+
+    def column(self, name, start=None, stop=None):
+        """Zero-copy, read-only view of one column's raw values (int64 ns for datetimes, codes for categories)."""
+        return self._column_array(name)[start:stop]
+
+    def locate(self, start=None, end=None):
+        """Row slice covering start <= key <= end."""
+        keys = self._column_array(self.key)
+        lo = 0 if start is None else int(np.searchsorted(keys, pd.Timestamp(start).value, side='left'))
+        hi = len(keys) if end is None else int(np.searchsorted(keys, pd.Timestamp(end).value, side='right'))
+        return slice(lo, hi)
+
+    def read(self, start=None, end=None, columns=None, tail=None) -> pd.DataFrame:
+        """
+        Returns the stored rows with start <= key <= end (or the last `tail` rows) as a
+        DataFrame with the original dtypes and index.
+        """
+        rows = self.locate(start, end)
+        if tail is not None:
+            rows = slice(max(rows.start, rows.stop - tail), rows.stop)
+        names = self.columns if columns is None else list(columns)
+        specs = {spec['name']: spec for spec in self.meta['columns']}
+        index = None
+        index_spec = self.meta.get('index')
+        if index_spec is not None:
+            values = self._mapped('index', index_spec, os.path.join(self.path, INDEX_FILE))[rows]
+            index = pd.Index(self._decode(index_spec, np.array(values)), name=index_spec.get('index_name'))
+        return pd.DataFrame({name: self._decode(specs[name], self._column_array(name)[rows]) for name in names},
+                            index=index)
+
+
+def _benchmark(path, rows=200_000, columns=300):
+    rng = np.random.default_rng(0)
+    close_time = pd.date_range('2024-01-01', periods=rows, freq='5min') + pd.Timedelta(minutes=5, milliseconds=-1)
+    frame = pd.DataFrame(rng.normal(size=(rows, columns)), columns=[f'f{i}' for i in range(columns)])
+    frame['close_time'] = close_time
+    frame['regime'] = pd.Categorical(rng.integers(0, 4, rows))
+
+    store = ColumnarFeatureStore(path)
+    start = time.perf_counter()
+    store.append(frame)
+    logging.info(f'Appended {rows}x{columns + 2} in {time.perf_counter() - start:.2f}s')
+
+    start = time.perf_counter()
+    reopened = ColumnarFeatureStore(path)
+    reopened.column('f0').sum()
+    logging.info(f'Reopened and scanned one column in {(time.perf_counter() - start) * 1000:.1f}ms')
+
+    start = time.perf_counter()
+    df = reopened.read()
+    logging.info(f'Read {df.shape} as a DataFrame in {(time.perf_counter() - start) * 1000:.1f}ms')
+
+    start = time.perf_counter()
+    reopened.append(frame.iloc[-1:].assign(close_time=close_time[-1] + pd.Timedelta(minutes=5)))
+    logging.info(f'Appended one bar in {(time.perf_counter() - start) * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    import tempfile
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(message)s')
+    with tempfile.TemporaryDirectory() as tmp:
+        _benchmark(os.path.join(tmp, 'features'))
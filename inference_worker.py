@@ -0,0 +1,271 @@
+"""
+Inference worker process.
+
+Feature generation and LightGBM prediction are CPU-bound. Run on a thread of the
+strategy process they still hold the GIL for most of the cycle, so the 10-second
+position monitor (trailing stops, position checks) stalls while a signal is computed.
+
+InferenceWorker moves that work into one long-lived child process that keeps a warm
+SignalStrategy pipeline (incremental feature engine, model registry, feature plan,
+tail/online smoothing state) across cycles. Each cycle the strategy process refreshes
+its KlineBuffer, copies the closed bars (already one float64 matrix) into a shared
+memory segment and sends only the segment name and shape. The worker returns the last
+signal row and its stage timings, which are recorded in the parent's latency metrics.
+
+    worker = InferenceWorker(strategy_kwargs, data_processor_kwargs).start()
+    frame = await worker.compute(strategy.kline_buffer, cycle=cycle)   # from the event loop
+    frame = worker.run(strategy.kline_buffer)                          # blocking
+
+Only one request is in flight at a time; a request made while another is still running
+raises WorkerBusy instead of waiting, so the event loop never blocks on it. If the worker
+dies or a request times out the worker process is stopped and the pool is rebuilt on the
+next request; the feature engine then warms up again from the feature store, if one is
+configured.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from kline_buffer import frame_from_bars
+from latency import metrics
+
+# SignalStrategy arguments the worker needs to rebuild the feature and model pipeline.
+INFERENCE_KWARGS = (
+    'ticker', 'quote_symbol_quantity', 'trading_fee', 'prob_threshold', 'smoothing_method', 'span',
+    'stop_loss', 'take_profit', 'model_path', 'features_path', 'tail_inference', 'tree_evaluator',
+    'feature_store', 'feature_plan', 'online_smoothing',
+)
+# Columns of the signal frame sent back to the strategy process.
+SIGNAL_COLUMNS = ('prob_class_0_mean', 'prob_class_1_mean', 'prob_class_2_mean', 'ypred')
+
+# Failures after which the worker process cannot be trusted to be idle and is restarted.
+RESTART_ERRORS = (BrokenProcessPool, concurrent.futures.TimeoutError, asyncio.TimeoutError, asyncio.CancelledError)
+
+# Worker-process state, set up once by _init_worker.
+_strategy = None
+_segments = {}
+
+
+def _attach(name):
+    """Attaches to a segment created by the strategy process, dropping the previous one."""
+    segment = _segments.get(name)
+    if segment is None:
+        for old in _segments.values():
+            old.close()
+        _segments.clear()
+        # The worker shares the strategy process's resource tracker, so the segment is only
+        # unlinked by its owner (or by the tracker if the strategy process dies).
+        segment = shared_memory.SharedMemory(name=name)
+        _segments[name] = segment
+    return segment
+
+
+def _init_worker(strategy_kwargs, data_processor_kwargs, log_level):
+    global _strategy
+    logging.basicConfig(level=log_level, format='%(asctime)s: [inference] %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+    # Imported here so the strategy process never pays for them through this module.
+    from price_feed import StaticPriceFeed
+    from replay import RecordingNotifier, SimulatedOrderManager
+    from signals_tbl_eth_bluefin import SignalStrategy, data_processor
+
+    kwargs = dict(strategy_kwargs)
+    # The worker only computes signals; orders, prices and notifications stay in the strategy process.
+    _strategy = SignalStrategy(
+        client_data=None,
+        data_processor=data_processor.CryptoDataProcessor(**data_processor_kwargs),
+        order_manager=SimulatedOrderManager(kwargs['trading_fee'], kwargs['quote_symbol_quantity']),
+        price_feed=StaticPriceFeed(kwargs['ticker']),
+        notifier=RecordingNotifier(),
+        forced_signal=None,
+        **kwargs,
+    )
+
+
+def _warm():
+    """Loads the model so the first signal does not pay for it; returns the model version."""
+    _strategy.model_registry.get()
+    return _strategy.model_registry.version
+
+
+def _compute(name, shape, columns, datetime_columns):
+    segment = _attach(name)
+    # Copy out of the segment: the strategy process overwrites it on the next cycle.
+    bars = np.ndarray(shape, dtype=np.float64, buffer=segment.buf).copy()
+    data = frame_from_bars(bars, columns, datetime_columns)
+
+    cycle = metrics.new_cycle('inference')
+    frame = metrics.run_in_cycle(cycle, _strategy.generate_tbl_signal, data, act=False)
+    key = _strategy.feature_engine.key
+    keep = [col for col in (key,) + SIGNAL_COLUMNS if col in frame.columns]
+    return frame[keep].iloc[-1:], cycle['spans']
+
+
+class WorkerBusy(RuntimeError):
+    """The previous request is still running; skip this cycle."""
+
+
+def _terminate(executor):
+    """Shuts `executor` down without waiting, stopping a worker that is still mid-request."""
+    terminate = getattr(executor, 'terminate_workers', None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    # shutdown() alone lets the running request finish, which is what a timeout is about.
+    for process in list((getattr(executor, '_processes', None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceWorker:
+    """
+    Computes SignalStrategy signals in a dedicated child process.
+
+    :param strategy_kwargs: SignalStrategy arguments; only INFERENCE_KWARGS are sent to the worker.
+    :param data_processor_kwargs: Arguments for data_processor.CryptoDataProcessor in the worker.
+    :param start_method: multiprocessing start method. 'spawn' avoids forking the
+                         strategy process's threads and open sockets.
+    :param timeout: Default seconds to wait for a signal before restarting the worker.
+    """
+
+    def __init__(self, strategy_kwargs, data_processor_kwargs, start_method='spawn', timeout=None):
+        self.strategy_kwargs = {k: v for k, v in strategy_kwargs.items() if k in INFERENCE_KWARGS}
+        self.data_processor_kwargs = dict(data_processor_kwargs)
+        self.context = multiprocessing.get_context(start_method)
+        self.timeout = timeout
+        self._executor = None
+        self._segment = None
+        # One request in flight: the segment is reused, so it must not be overwritten mid-cycle.
+        self._busy = threading.Lock()
+
+        self.requests = 0
+        self.busy = 0
+        self.failures = 0
+        self.restarts = 0
+        self.last_seconds = float('nan')
+
+    def start(self, warm=True):
+        """Starts the worker process; with `warm`, blocks until the model is loaded."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=self.context, initializer=_init_worker,
+                initargs=(self.strategy_kwargs, self.data_processor_kwargs, logging.getLogger().level))
+        if warm:
+            start = time.perf_counter()
+            version = self._executor.submit(_warm).result()
+            logging.info(f"Inference worker for {self.strategy_kwargs.get('ticker')} ready with model "
+                         f"version {version} in {time.perf_counter() - start:.2f}s")
+        return self
+
+    def _write(self, bars):
+        if self._segment is None or self._segment.size < bars.nbytes:
+            self._release_segment()
+            # Headroom so the segment is not reallocated as the buffer fills up.
+            self._segment = shared_memory.SharedMemory(create=True, size=max(2 * bars.nbytes, 1 << 16))
+        np.ndarray(bars.shape, dtype=np.float64, buffer=self._segment.buf)[:] = bars
+        return self._segment.name
+
+    def _release_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+    def submit(self, buffer):
+        """
+        Sends the closed bars of `buffer` (a KlineBuffer) to the worker and returns a
+        concurrent.futures.Future of (signal frame, worker stage timings).
+        Raises WorkerBusy if the previous request has not finished.
+        """
+        # Never wait here: this runs on the event loop thread.
+        if not self._busy.acquire(blocking=False):
+            self.busy += 1
+            raise WorkerBusy(f"Inference worker for {self.strategy_kwargs.get('ticker')} is still "
+                             f"computing the previous signal")
+        try:
+            self.start(warm=False)
+            bars = buffer.closed_view()
+            name = self._write(bars)
+            future = self._executor.submit(_compute, name, bars.shape, list(buffer.columns),
+                                           tuple(buffer.datetime_columns))
+        except BaseException:
+            self._busy.release()
+            raise
+        self.requests += 1
+        future.add_done_callback(lambda _: self._busy.release())
+        return future
+
+    def _finish(self, result, start, cycle):
+        frame, spans = result
+        self.last_seconds = time.perf_counter() - start
+        # Worker stages keep their names, so budgets and dashboards work as before.
+        for stage, seconds in spans.items():
+            if cycle is None:
+                metrics.record(stage, seconds)
+            else:
+                metrics.run_in_cycle(cycle, metrics.record, stage, seconds)
+        return frame
+
+    def _failed(self, e):
+        if isinstance(e, WorkerBusy):
+            return
+        self.failures += 1
+        if isinstance(e, RESTART_ERRORS) and self._executor is not None:
+            if isinstance(e, BrokenProcessPool):
+                reason = 'died'
+            elif isinstance(e, asyncio.CancelledError):
+                reason = 'was cancelled'
+            else:
+                reason = 'timed out'
+            logging.error(f"Inference worker for {self.strategy_kwargs.get('ticker')} {reason}, restarting: {e!r}")
+            # The in-flight future fails once its process is gone, which releases _busy.
+            _terminate(self._executor)
+            self._executor = None
+            self.restarts += 1
+
+    async def compute(self, buffer, cycle=None, timeout=None):
+        """
+        Awaits the signal frame for the closed bars of `buffer` without blocking the event
+        loop. After `timeout` seconds (default self.timeout) the worker is restarted.
+        """
+        start = time.perf_counter()
+        try:
+            future = self.submit(buffer)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except (Exception, asyncio.CancelledError) as e:
+            self._failed(e)
+            raise
+        return self._finish(result, start, cycle)
+
+    def run(self, buffer, timeout=None):
+        """Blocking counterpart of compute()."""
+        start = time.perf_counter()
+        try:
+            result = self.submit(buffer).result(timeout or self.timeout)
+        except Exception as e:
+            self._failed(e)
+            raise
+        return self._finish(result, start, None)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._release_segment()
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'busy': self.busy,
+            'failures': self.failures,
+            'restarts': self.restarts,
+            'last_seconds': self.last_seconds,
+        }
@@ -0,0 +1,190 @@
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+
+BINANCE_KLINE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+    'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume',
+    'taker_buy_quote_asset_volume', 'ignore',
+]
+
+
+class BinanceKlineFetcher:
+    """
+    Fetches only the klines newer than a given close time from the Binance REST API.
+    """
+
+    def __init__(self, base_url='https://api.binance.com', interval='5m', timeout=5):
+        self.base_url = base_url
+        self.interval = interval
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch(self, symbol, start_time_ms, limit=1000) -> pd.DataFrame:
+        resp = self.session.get(
+            f'{self.base_url}/api/v3/klines',
+            params={'symbol': symbol, 'interval': self.interval, 'startTime': int(start_time_ms), 'limit': limit},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        df = pd.DataFrame(resp.json(), columns=BINANCE_KLINE_COLUMNS)
+        # Binance returns timestamps in UTC ms; keep them naive UTC like pull_binance_data.
+        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+        return df.drop(columns=['ignore'])
+
+
+def frame_from_bars(bars: np.ndarray, columns, datetime_columns=()) -> pd.DataFrame:
+    """Decodes a float64 bar matrix (see KlineBuffer) into a DataFrame, restoring datetime columns."""
+    frame = {}
+    for i, col in enumerate(columns):
+        if col in datetime_columns:
+            frame[col] = pd.to_datetime(bars[:, i].astype(np.int64), unit='ms')
+        else:
+            frame[col] = bars[:, i]
+    return pd.DataFrame(frame)
+
+
+class KlineBuffer:
+    """
+    Bounded, NumPy-backed kline buffer keyed by close_time.
+
+    The buffer is seeded once with the full history from the data client. Each refresh
+    then fetches only the bars after the last closed bar, replaces the in-progress bar
+    and appends anything new. Rows live in one contiguous float64 array of twice the
+    capacity; when it fills up the newest `capacity` rows are shifted to the front, so
+    appends are amortized O(1) and the last N rows are always a zero-copy slice.
+
+    Datetime columns are stored as float milliseconds since the epoch (exact below 2**53).
+    """
+
+    def __init__(self, data_client, ticker, capacity=2000, fetcher=None, key='close_time'):
+        self.data_client = data_client
+        self.ticker = ticker
+        self.capacity = capacity
+        self.fetcher = fetcher if fetcher is not None else BinanceKlineFetcher()
+        self.key = key
+
+        self.columns = None
+        self.datetime_columns = ()
+        self._data = None
+        self._size = 0
+        self._start = 0
+
+        self.full_pulls = 0
+        self.incremental_pulls = 0
+        self.last_fetch_rows = 0
+
+    def __len__(self):
+        return self._size
+
+    def _encode(self, df: pd.DataFrame) -> np.ndarray:
+        values = np.empty((len(df), len(self.columns)), dtype=np.float64)
+        for i, col in enumerate(self.columns):
+            if col in self.datetime_columns:
+                values[:, i] = df[col].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+            elif col in df.columns:
+                values[:, i] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+            else:
+                values[:, i] = np.nan
+        return values
+
+    def _seed(self):
+        df = self.data_client.pull_binance_data(self.ticker)
+        self.full_pulls += 1
+        self.datetime_columns = tuple(df.select_dtypes(include=['datetime']).columns)
+        numeric = tuple(df.select_dtypes(include=['number']).columns)
+        self.columns = [col for col in df.columns if col in self.datetime_columns or col in numeric]
+        dropped = [col for col in df.columns if col not in self.columns]
+        if dropped:
+            logging.debug(f'KlineBuffer ignoring non-numeric columns: {dropped}')
+        self._key_idx = self.columns.index(self.key)
+
+        self._data = np.empty((2 * self.capacity, len(self.columns)), dtype=np.float64)
+        self._start = 0
+        self._size = 0
+        self._append(self._encode(df.iloc[-self.capacity:]))
+        self.last_fetch_rows = len(df)
+
+    def _append(self, rows: np.ndarray):
+        if len(rows) == 0:
+            return
+        # Replace any held bars with the same or a later close_time (the in-progress bar).
+        keys = self._data[self._start:self._start + self._size, self._key_idx]
+        keep = int(np.searchsorted(keys, rows[0, self._key_idx], side='left'))
+        self._size = keep
+
+        rows = rows[-self.capacity:]
+        end = self._start + self._size
+        if end + len(rows) > len(self._data):
+            # Compact: move the newest rows to the front of the backing array.
+            tail = max(0, self.capacity - len(rows))
+            self._data[:tail] = self._data[end - tail:end]
+            self._start, self._size, end = 0, tail, tail
+        self._data[end:end + len(rows)] = rows
+        self._size += len(rows)
+        if self._size > self.capacity:
+            self._start += self._size - self.capacity
+            self._size = self.capacity
+
+    def refresh(self):
+        """
+        Fetches bars newer than the last closed bar held, falling back to a full pull
+        when the buffer is empty or the incremental fetch fails.
+        """
+        if self._data is None or self._size == 0:
+            self._seed()
+            return
+
+        closed = self._closed_count()
+        last_closed_ms = self._data[self._start + closed - 1, self._key_idx] if closed else None
+        if last_closed_ms is None:
+            self._seed()
+            return
+
+        try:
+            df = self.fetcher.fetch(self.ticker, start_time_ms=last_closed_ms + 1)
+        except Exception as e:
+            logging.warning(f'Incremental kline fetch failed, pulling full history: {e}')
+            self._seed()
+            return
+
+        self.incremental_pulls += 1
+        self.last_fetch_rows = len(df)
+        self._append(self._encode(df))
+
+    def _now_ms(self):
+        return np.int64(time.time() * 1000)
+
+    def _closed_count(self):
+        keys = self._data[self._start:self._start + self._size, self._key_idx]
+        return int(np.searchsorted(keys, self._now_ms(), side='right'))
+
+    def closed_view(self, n=None) -> np.ndarray:
+        """
+        Returns a zero-copy (read-only) view of the last `n` closed bars, one column per
+        entry in `self.columns`.
+        """
+        closed = self._closed_count()
+        start = 0 if n is None else max(0, closed - n)
+        view = self._data[self._start + start:self._start + closed]
+        view.flags.writeable = False
+        return view
+
+    def closed_frame(self, n=None) -> pd.DataFrame:
+        """
+        Returns the last `n` closed bars as a DataFrame with the same columns as
+        pull_binance_data (datetime columns restored, naive UTC).
+        """
+        return frame_from_bars(self.closed_view(n), self.columns, self.datetime_columns)
+
+    def last_price(self) -> float:
+        """Close of the most recent bar held, including the in-progress one."""
+        return float(self._data[self._start + self._size - 1, self.columns.index('close')])
+
+    def last_close_time(self) -> datetime:
+        return pd.to_datetime(int(self._data[self._start + self._size - 1, self._key_idx]), unit='ms')
@@ -0,0 +1,167 @@
+import collections
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds after which a stage logs a warning.
+DEFAULT_BUDGETS = {
+    'pull_binance_data': 1.0,
+    'generate_features': 2.0,
+    'model_load': 0.5,
+    'get_predictions_for_lgb': 0.5,
+    'apply_smoothing': 0.2,
+    'fetch_current_positions': 1.0,
+    'post_signed_order': 1.0,
+    'place_bracket_orders': 1.5,
+    'reconcile_orders': 2.0,
+    'wait_for_order_fill': 5.0,
+    'discord_post': 2.0,
+    'monitor_lag': 1.0,
+}
+
+
+def _percentile(sorted_samples, q):
+    if not sorted_samples:
+        return float('nan')
+    idx = min(len(sorted_samples) - 1, max(0, int(round(q * (len(sorted_samples) - 1)))))
+    return sorted_samples[idx]
+
+
+class LatencyRecorder:
+    """
+    Per-stage latency spans with in-process histograms.
+
+    `with metrics.span('stage'):` times a stage. Each stage keeps its last `window`
+    samples for p50/p95/p99, and a span over its budget logs a warning. Spans recorded
+    while a cycle is active (see in_cycle / run_in_cycle) are also collected into that
+    cycle and logged as one summary line when the cycle finishes. The active cycle is a
+    context variable, so it follows coroutines submitted with run_coroutine_threadsafe
+    or created as tasks; the order manager's exchange calls on the event loop thread are
+    therefore counted in the cycle of the strategy thread that made them.
+
+    Snapshots can be written to a JSON file (export / start_exporter) or served over
+    HTTP (serve).
+    """
+
+    def __init__(self, budgets=None, window=2048):
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.window = window
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self._counts = collections.Counter()
+        self._over_budget = collections.Counter()
+        self._lock = threading.Lock()
+        self._cycle = contextvars.ContextVar('latency_cycle', default=None)
+        self._exporter = None
+        self._server = None
+
+    def record(self, stage, seconds):
+        cycle = self._cycle.get()
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+            if cycle is not None:
+                cycle['spans'][stage] = cycle['spans'].get(stage, 0.0) + seconds
+
+        budget = self.budgets.get(stage)
+        if budget is not None and seconds > budget:
+            with self._lock:
+                self._over_budget[stage] += 1
+            logging.warning(f'{stage} took {seconds * 1000:.0f}ms (budget {budget * 1000:.0f}ms)')
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def new_cycle(self, name):
+        return {'name': name, 'start': time.perf_counter(), 'spans': {}}
+
+    @contextmanager
+    def in_cycle(self, cycle):
+        """Makes `cycle` collect the spans recorded in this context (thread or task)."""
+        token = self._cycle.set(cycle)
+        try:
+            yield cycle
+        finally:
+            self._cycle.reset(token)
+
+    def run_in_cycle(self, cycle, fn, *args, **kwargs):
+        """Calls fn with `cycle` collecting its spans."""
+        with self.in_cycle(cycle):
+            return fn(*args, **kwargs)
+
+    def finish_cycle(self, cycle, log=True):
+        total = time.perf_counter() - cycle['start']
+        self.record(f"{cycle['name']}_cycle", total)
+        if log:
+            stages = ', '.join(f'{stage}={seconds * 1000:.0f}ms' for stage, seconds in cycle['spans'].items())
+            logging.info(f"{cycle['name']} cycle {total * 1000:.0f}ms: {stages}")
+        return total
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+            over_budget = dict(self._over_budget)
+        return {
+            stage: {
+                'count': counts[stage],
+                'p50_ms': _percentile(values, 0.50) * 1000,
+                'p95_ms': _percentile(values, 0.95) * 1000,
+                'p99_ms': _percentile(values, 0.99) * 1000,
+                'max_ms': values[-1] * 1000 if values else float('nan'),
+                'over_budget': over_budget.get(stage, 0),
+            }
+            for stage, values in samples.items()
+        }
+
+    def export(self, path):
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'time': time.time(), 'stages': self.snapshot()}, f, indent=2)
+        # Atomic replace so readers never see a partial file.
+        os.replace(path + '.tmp', path)
+
+    def start_exporter(self, path, interval=60):
+        """Writes a snapshot to `path` every `interval` seconds from a daemon thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.export(path)
+                except Exception as e:
+                    logging.warning(f'Failed to export latency metrics: {e}')
+
+        self._exporter = threading.Thread(target=run, name='latency-exporter', daemon=True)
+        self._exporter.start()
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serves the current snapshot as JSON on http://host:port/ from a daemon thread."""
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(recorder.snapshot()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='latency-http', daemon=True).start()
+        return self._server
+
+
+# Process-wide recorder shared by the strategy, order manager and notifier.
+metrics = LatencyRecorder()
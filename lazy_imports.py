@@ -0,0 +1,63 @@
+"""
+Import boundary for heavy modules.
+
+    binance_client = lazy_import('binance_client')
+    apply_smoothing = lazy_import('feature_selection_tbl_single_backtest', 'apply_smoothing')
+
+The proxy imports the module (and resolves the attribute) on first attribute access or
+call, so CLI argument parsing, --help and restarts do not pay for pandas/LightGBM/the
+signing stack until something actually uses them. First-use import times are recorded in
+import_times; bench_startup.py measures the import cost of each module from a cold
+interpreter.
+"""
+import importlib
+import logging
+import sys
+import threading
+import time
+
+# module name -> seconds its first lazy import took (0 if it was already imported).
+import_times = {}
+_lock = threading.RLock()
+
+
+class LazyImport:
+    def __init__(self, module, attr=None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            with _lock:
+                if self._target is None:
+                    start = time.perf_counter()
+                    already = self._module in sys.modules
+                    target = importlib.import_module(self._module)
+                    if self._module not in import_times:
+                        import_times[self._module] = 0.0 if already else time.perf_counter() - start
+                        if not already:
+                            logging.debug(f'Imported {self._module} in {import_times[self._module] * 1000:.0f}ms')
+                    if self._attr is not None:
+                        target = getattr(target, self._attr)
+                    self._target = target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = self._module if self._attr is None else f'{self._module}.{self._attr}'
+        return f"<lazy {name}{'' if self._target is None else ' (loaded)'}>"
+
+
+def lazy_import(module, attr=None) -> LazyImport:
+    """Returns a proxy for `module` (or `module.attr`) that imports it on first use."""
+    return LazyImport(module, attr)
+
+
+def is_loaded(proxy) -> bool:
+    return proxy._target is not None
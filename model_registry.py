@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from lazy_imports import lazy_import
+
+joblib = lazy_import('joblib')
+
+
+def _file_signature(path):
+    """Returns a cheap (mtime_ns, size) signature used to detect changes on disk."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_digest(path, chunk_size=1 << 20):
+    """Returns the sha256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Keeps the LightGBM model and its feature list in memory and hot-reloads them
+    when either file changes on disk.
+
+    Changes are detected with a stat() of both files (mtime + size). When the stat
+    changes the files are hashed, so a file that was only touched is not reloaded.
+    A new model is loaded off to the side and swapped in with a single assignment,
+    so callers always see a consistent (model, features) pair. If loading fails
+    (e.g. the file is still being written) the previous model stays active, and the
+    failed files are not hashed or loaded again until their stat or content changes.
+    """
+
+    def __init__(self, model_path, features_path, check_interval=0.0):
+        self.model_path = model_path
+        self.features_path = features_path
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._artifacts = None  # (model, features)
+        self._signatures = None
+        self._digests = None
+        # Signatures and digests of files that failed to load, so they are not retried every get().
+        self._failed_signatures = None
+        self._failed_digests = None
+        self._last_check = 0.0
+
+        self.version = 0
+        self.reload_count = 0
+        self.reload_failures = 0
+        self.last_load_seconds = float('nan')
+        self.last_inference_seconds = float('nan')
+
+        self._load()
+
+    def _load(self):
+        signatures = (_file_signature(self.model_path), _file_signature(self.features_path))
+        digests = (_file_digest(self.model_path), _file_digest(self.features_path))
+
+        start = time.perf_counter()
+        model = joblib.load(self.model_path)
+        features = joblib.load(self.features_path)
+        elapsed = time.perf_counter() - start
+
+        # Swap in the new pair in one assignment so readers never see a mix.
+        self._artifacts = (model, features)
+        self._signatures = signatures
+        self._digests = digests
+        self._failed_signatures = None
+        self._failed_digests = None
+        self.version += 1
+        self.last_load_seconds = elapsed
+        logging.info("Loaded model %s (version %s) in %.3fs.", self.model_path, self.version, elapsed)
+
+    def refresh(self, force=False):
+        """
+        Reloads the model and features if either file changed on disk.
+
+        :param force: Reload even if the files look unchanged.
+        :return: True if a new model was swapped in, otherwise False.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+
+        with self._lock:
+            self._last_check = now
+            signatures = digests = None
+            try:
+                signatures = (_file_signature(self.model_path), _file_signature(self.features_path))
+                if not force and signatures in (self._signatures, self._failed_signatures):
+                    return False
+
+                digests = (_file_digest(self.model_path), _file_digest(self.features_path))
+                if not force and digests == self._digests:
+                    # Touched but identical; remember the new stat and keep the model.
+                    self._signatures = signatures
+                    return False
+                if not force and digests == self._failed_digests:
+                    # Touched but still the content that failed to load.
+                    self._failed_signatures = signatures
+                    return False
+
+                self._load()
+            except Exception as e:
+                self._failed_signatures = signatures
+                self._failed_digests = digests
+                self.reload_failures += 1
+                logging.error("Failed to reload model from %s, keeping version %s: %s",
+                              self.model_path, self.version, e)
+                return False
+
+            self.reload_count += 1
+            return True
+
+    def get(self):
+        """
+        Returns the current (model, features) pair, reloading first if the files changed.
+        """
+        self.refresh()
+        return self._artifacts
+
+    @property
+    def model_digest(self):
+        """sha256 of the loaded model file, e.g. to tie derived artifacts to this model."""
+        return self._digests[0] if self._digests else None
+
+    def predict(self, predict_fn, x, model=None):
+        """
+        Runs predict_fn(model, x) and records how long inference took.
+
+        Pass the model returned by get() so features and model come from the same version.
+        """
+        if model is None:
+            model, _ = self._artifacts
+        start = time.perf_counter()
+        result = predict_fn(model, x)
+        self.last_inference_seconds = time.perf_counter() - start
+        return result
+
+    def stats(self) -> dict:
+        return {
+            'version': self.version,
+            'reload_count': self.reload_count,
+            'reload_failures': self.reload_failures,
+            'last_load_seconds': self.last_load_seconds,
+            'last_inference_seconds': self.last_inference_seconds,
+        }
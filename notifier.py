@@ -0,0 +1,180 @@
+import collections
+import logging
+import threading
+import time
+
+import requests
+
+from latency import metrics
+
+DISCORD_MAX_CONTENT = 2000
+
+
+class DiscordNotifier:
+    """
+    Background Discord notifier.
+
+    send() only appends to a bounded in-memory queue and never blocks the caller. A
+    daemon thread drains the queue every `flush_interval` seconds:
+      - Consecutive identical messages to the same webhook are coalesced into one
+        line with a repeat count; messages are never reordered.
+      - Messages are batched per webhook into as few posts as Discord's 2000
+        character limit allows.
+      - HTTP 429 responses are retried after the `retry_after` the webhook reports,
+        5xx responses after `retry_delay` doubling per attempt, up to `max_retries`.
+
+    When the queue is full the oldest message is dropped and counted in `dropped`.
+    """
+
+    def __init__(self, max_queue=1000, flush_interval=1.0, timeout=5, max_retries=3, retry_delay=1.0):
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.session = requests.Session()
+
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.sent = 0
+        self.posts = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.server_errors = 0
+
+    def send(self, webhook, content):
+        """Queues a message for `webhook`. Never blocks on the network."""
+        if not webhook or not content:
+            return
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append((webhook, str(content)))
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='discord-notifier', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, flush=True):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout * (self.max_retries + 1))
+        if flush:
+            self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.warning(f'Discord notifier flush failed: {e}')
+
+    def _drain(self):
+        with self._lock:
+            pending = list(self._queue)
+            self._queue.clear()
+
+        # webhook -> [[content, count]] in queue order; only consecutive repeats are merged.
+        grouped = collections.OrderedDict()
+        for webhook, content in pending:
+            runs = grouped.setdefault(webhook, [])
+            if runs and runs[-1][0] == content:
+                runs[-1][1] += 1
+            else:
+                runs.append([content, 1])
+        return grouped
+
+    @staticmethod
+    def _batches(runs):
+        """Yields (content, number of queued messages it carries) per post."""
+        batch, carried = '', 0
+        for content, count in runs:
+            line = content if count == 1 else f'{content} (x{count})'
+            line = line[:DISCORD_MAX_CONTENT]
+            if batch and len(batch) + 1 + len(line) > DISCORD_MAX_CONTENT:
+                yield batch, carried
+                batch, carried = '', 0
+            batch = f'{batch}\n{line}' if batch else line
+            carried += count
+        if batch:
+            yield batch, carried
+
+    def flush(self):
+        """Posts everything currently queued. Called by the background thread."""
+        for webhook, runs in self._drain().items():
+            for batch, carried in self._batches(runs):
+                if self._post(webhook, batch):
+                    self.sent += carried
+
+    def _post(self, webhook, content):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.span('discord_post'):
+                    resp = self.session.post(webhook, json={'content': content}, timeout=self.timeout)
+            except Exception as e:
+                logging.warning(f'Discord post failed: {e}')
+                self.failed += 1
+                return False
+            self.posts += 1
+            if resp.status_code == 429:
+                self.rate_limited += 1
+                time.sleep(self._retry_after(resp))
+                continue
+            if resp.status_code >= 500 and attempt < self.max_retries:
+                self.server_errors += 1
+                time.sleep(self.retry_delay * 2 ** attempt)
+                continue
+            if resp.status_code >= 400:
+                logging.warning(f'Discord post returned {resp.status_code}: {resp.text[:200]}')
+                self.failed += 1
+                return False
+            return True
+        self.failed += 1
+        return False
+
+    @staticmethod
+    def _retry_after(resp):
+        try:
+            return float(resp.json().get('retry_after', 1.0))
+        except Exception:
+            return float(resp.headers.get('Retry-After', 1.0))
+
+    def stats(self) -> dict:
+        return {
+            'queued': len(self._queue),
+            'sent': self.sent,
+            'posts': self.posts,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'rate_limited': self.rate_limited,
+            'server_errors': self.server_errors,
+        }
+
+
+_SHARED_NOTIFIER = None
+_SHARED_NOTIFIER_LOCK = threading.Lock()
+
+
+def shared_notifier() -> DiscordNotifier:
+    """Returns the process-wide running DiscordNotifier."""
+    global _SHARED_NOTIFIER
+    with _SHARED_NOTIFIER_LOCK:
+        if _SHARED_NOTIFIER is None:
+            _SHARED_NOTIFIER = DiscordNotifier().start()
+        return _SHARED_NOTIFIER
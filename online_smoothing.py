@@ -0,0 +1,135 @@
+"""
+Online smoothing of the model's class probabilities.
+
+process_predictions used to run apply_smoothing over the whole probability history every
+cycle (copying the feature frame) just to read the last row. OnlineSmoother keeps the
+rolling-window sum or the EWM numerator/denominator per class across cycles instead, so
+each new bar is an O(1) update and no frame is copied.
+
+The rolling mean matches pandas `rolling(span, min_periods).mean()` and the EWM matches
+`ewm(span=span, adjust=adjust).mean()`; check_parity compares the two on a probability
+history. Run this module directly to time an update.
+"""
+import logging
+
+import numpy as np
+
+SMOOTHING_METHODS = ('rolling', 'ewm')
+
+
+class OnlineSmoother:
+    """
+    Feed probability rows with update(keys, probs); rows whose key is not newer than the
+    last one seen are skipped, so overlapping windows from consecutive cycles can be
+    passed as-is.
+
+    :param min_periods: Rolling rows required before the mean is defined (default span).
+    :param adjust: EWM weighting as in pandas (True divides by the decayed weight sum).
+    """
+
+    def __init__(self, span, method='rolling', n_classes=3, min_periods=None, adjust=True, resync_every=4096):
+        if method not in SMOOTHING_METHODS:
+            raise ValueError(f'Unknown smoothing method {method}; expected one of {SMOOTHING_METHODS}')
+        self.span = int(span)
+        self.method = method
+        self.n_classes = n_classes
+        self.min_periods = self.span if min_periods is None else min_periods
+        self.adjust = adjust
+        self.alpha = 2.0 / (self.span + 1)
+        # The running rolling sum is recomputed from the window this often to stop float drift.
+        self.resync_every = resync_every
+        self.reset()
+
+    def reset(self):
+        self.last_key = None
+        self.updates = 0
+        self.value = np.full(self.n_classes, np.nan)
+        self._window = np.zeros((self.span, self.n_classes))
+        self._sum = np.zeros(self.n_classes)
+        self._count = 0
+        self._pos = 0
+        self._num = np.zeros(self.n_classes)
+        self._den = 0.0
+
+    def _push(self, row):
+        if self.method == 'rolling':
+            if self._count == self.span:
+                self._sum -= self._window[self._pos]
+            else:
+                self._count += 1
+            self._window[self._pos] = row
+            self._sum += row
+            self._pos = (self._pos + 1) % self.span
+            if self.updates % self.resync_every == 0:
+                self._sum = self._window[:self._count].sum(axis=0)
+            if self._count >= self.min_periods:
+                return self._sum / self._count
+            return np.full(self.n_classes, np.nan)
+
+        decay = 1.0 - self.alpha
+        if self.adjust:
+            self._num = decay * self._num + row
+            self._den = decay * self._den + 1.0
+            return self._num / self._den
+        self._num = row.copy() if self._den == 0 else decay * self._num + self.alpha * row
+        self._den = 1.0
+        return self._num.copy()
+
+    def update(self, keys, probs) -> np.ndarray:
+        """
+        Applies the rows of `probs` (n, n_classes) whose key is newer than the last one
+        and returns their smoothed values (m, n_classes). The latest smoothed row is
+        kept in `value`.
+        """
+        probs = np.asarray(probs, dtype=np.float64)
+        start = 0
+        if self.last_key is not None:
+            while start < len(keys) and keys[start] <= self.last_key:
+                start += 1
+        out = np.empty((len(probs) - start, self.n_classes))
+        for i in range(start, len(probs)):
+            self.updates += 1
+            out[i - start] = self._push(probs[i])
+        if len(out):
+            self.value = out[-1]
+            self.last_key = keys[-1]
+        return out
+
+
+def check_parity(probs, span, method, smoothing_fn=None, atol=1e-9):
+    """
+    Smooths `probs` bar by bar with OnlineSmoother and with smoothing_fn (default
+    apply_smoothing) over the full history, and returns the max absolute difference
+    over the rows where both are defined. NaN positions must match exactly.
+    """
+    import pandas as pd
+    if smoothing_fn is None:
+        from feature_selection_tbl_single_backtest import apply_smoothing as smoothing_fn
+
+    probs = np.asarray(probs, dtype=np.float64)
+    expected = smoothing_fn(pd.DataFrame(index=range(len(probs))), probs.copy(), span, method)
+    expected = expected[[f'prob_class_{i}_mean' for i in range(probs.shape[1])]].to_numpy(dtype=np.float64)
+
+    smoother = OnlineSmoother(span, method, n_classes=probs.shape[1])
+    actual = np.vstack([smoother.update([i], probs[i:i + 1]) for i in range(len(probs))])
+
+    if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        logging.warning(f'{method} smoothing: NaN rows differ from apply_smoothing (check min_periods)')
+        return np.inf
+    both = ~np.isnan(expected)
+    diff = float(np.max(np.abs(expected[both] - actual[both]))) if both.any() else 0.0
+    if diff > atol:
+        logging.warning(f'{method} smoothing differs from apply_smoothing by {diff:.2e}')
+    return diff
+
+
+if __name__ == '__main__':
+    import time
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(message)s')
+    probs = np.random.default_rng(0).dirichlet([1, 1, 1], size=5000)
+    smoother = OnlineSmoother(8, 'ewm')
+    smoother.update(list(range(len(probs))), probs)
+    start = time.perf_counter()
+    for i in range(len(probs), len(probs) + 10000):
+        smoother.update([i], probs[i % len(probs)][None])
+    logging.info(f'Online update: {(time.perf_counter() - start) / 10000 * 1e6:.1f}us per bar')
@@ -4,7 +4,6 @@ import sys
 here = os.path.dirname(__file__)
 sys.path.append(os.path.join(here, '../'))
 import logging, time
-from decimal import Decimal
 from bluefin_v2_client import (
     BluefinClient,
     Networks,
@@ -17,17 +16,60 @@ from bluefin_v2_client import (
 )
 from pprint import pprint
 import asyncio
+from order_tracker import OrderTracker
+from order_reconciler import diff_orders, safe_to_cancel
+from bluefin_parser import parse_position, parse_orders
+from latency import metrics
+from state_store import AuthTokenCache
+
+
+def _order_failed(resp):
+    """True if an order placement raised, returned nothing or returned an error payload."""
+    return isinstance(resp, BaseException) or not resp or (isinstance(resp, dict) and bool(resp.get('error')))
 
 
 class BluefinOrderManager:
-    def __init__(self, private_key, trading_fee, quantity, symbol=MARKET_SYMBOLS.ETH):
+    def __init__(self, private_key, trading_fee, quantity, symbol=MARKET_SYMBOLS.ETH, shared_with=None,
+                 client=None, auth_cache=None):
+        """
+        :param shared_with: An initialized BluefinOrderManager whose client, event loop and
+                            leverage cache are reused instead of onboarding again.
+        :param client: An object implementing the BluefinClient methods used here (e.g. an
+                       in-process fake) to use instead of connecting to self.network.
+        :param auth_cache: An AuthTokenCache (or its path); a fresh cached token skips onboarding.
+        """
         self.trading_fee = trading_fee
         self.quantity = quantity
         self.private_key = private_key
         self.network = Networks["SUI_PROD"]  # e.g., "SUI_PROD" or "SUI_STAGING"
         self.symbol = symbol
         self.leverage = 20
-        self.client = None
+        self.exact_decimals = False
+        self.client = client
+        self.order_tracker = None
+        self.auth_cache = AuthTokenCache(auth_cache) if isinstance(auth_cache, str) else auth_cache
+
+        # Per-symbol leverage, filled at init and invalidated on adjust or leverage rejection.
+        self._leverage_cache = {}
+        self.leverage_cache_hits = 0
+        self.leverage_cache_misses = 0
+
+        # Parsed position snapshot; invalidated by our own market fills or after position_ttl seconds.
+        self.position_ttl = 2.0
+        self._position_snapshot = None
+        self._position_fetched_at = float('-inf')
+        self.position_version = 0
+        self.position_fetches = 0
+        self.position_cache_hits = 0
+
+        if shared_with is not None:
+            self.network = shared_with.network
+            self.client = shared_with.client
+            self.auth_token = shared_with.auth_token
+            self.loop = shared_with.loop
+            self._leverage_cache = shared_with._leverage_cache
+            self._run(self._async_attach())
+            return
 
         # Create a persistent event loop and set it as the current loop.
         self.loop = asyncio.new_event_loop()
@@ -36,25 +78,149 @@ class BluefinOrderManager:
         # Synchronously run the asynchronous client initialization.
         self._initialize_client_sync()
 
+    def for_symbol(self, symbol, quantity, trading_fee=None):
+        """
+        Returns an order manager for another market that shares this manager's
+        authenticated client and event loop.
+        """
+        return BluefinOrderManager(self.private_key,
+                                   trading_fee=self.trading_fee if trading_fee is None else trading_fee,
+                                   quantity=quantity,
+                                   symbol=symbol,
+                                   shared_with=self)
+
+    def _run(self, coro):
+        """
+        Runs a coroutine on the manager's event loop and returns its result.
+
+        When the loop is already running (the async strategy runtime), the sync wrappers
+        are called from worker threads and the coroutine is submitted to the loop instead.
+        """
+        if not self.loop.is_running():
+            return self.loop.run_until_complete(coro)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            coro.close()
+            raise RuntimeError("Sync order manager call made from inside the event loop; await the _async_ method instead.")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
     def _initialize_client_sync(self):
         """Runs the asynchronous onboarding and initialization for the Bluefin client."""
-        self.loop.run_until_complete(self._async_init())
+        self._run(self._async_init())
 
     async def _async_init(self):
-        self.client = BluefinClient(
-            True,  # Agree to terms and conditions
-            self.network,  # Use the provided network
-            private_key=self.private_key
-        )
-        self.auth_token = await self.client.onboard_user(None)
+        if self.client is None:
+            self.client = BluefinClient(
+                True,  # Agree to terms and conditions
+                self.network,  # Use the provided network
+                private_key=self.private_key
+            )
+        if self.auth_cache is not None:
+            token = self.auth_cache.get(self.private_key, self.network)
+            if token is not None:
+                try:
+                    await self.client.init(False)
+                    self._install_auth_token(token)
+                    # The leverage read in attach is authenticated, so it also validates the token.
+                    await self._async_attach()
+                    logging.info("Bluefin client initialized with a cached auth token.")
+                    return
+                except Exception as e:
+                    logging.warning("Cached auth token rejected, onboarding again: %s", e)
+                    self.auth_cache.invalidate(self.private_key, self.network)
+
+        # init(True) signs the onboarding message once and installs the token it gets back.
         await self.client.init(True)
+        self.auth_token = self.client.apis.auth_token
+        if self.auth_cache is not None:
+            self.auth_cache.put(self.private_key, self.network, self.auth_token)
+        await self._async_attach()
         logging.info("Bluefin client successfully initialized.")
 
+    def _install_auth_token(self, token):
+        """Installs an auth token on the client's APIs and sockets, as BluefinClient.init does after onboarding."""
+        self.auth_token = token
+        self.client.apis.auth_token = token
+        self.client.dms_api.auth_token = token
+        # In-process clients (e.g. exchange_simulator) have no sockets.
+        for socket in (self.client.socket, self.client.ws_client):
+            if socket is not None:
+                socket.set_token(token)
+
+    async def _async_attach(self):
+        """Sets up the per-symbol state on top of an initialized client."""
+        self.order_tracker = OrderTracker(self.client, self.symbol)
+        await self._async_get_leverage(self.symbol)
+
+    async def _async_get_leverage(self, symbol=None):
+        """
+        Returns the user leverage for the symbol, only calling the exchange on a cache miss.
+        """
+        if symbol is None:
+            symbol = self.symbol
+        if symbol in self._leverage_cache:
+            self.leverage_cache_hits += 1
+            return self._leverage_cache[symbol]
+
+        self.leverage_cache_misses += 1
+        user_leverage = await self.client.get_user_leverage(symbol)
+        self._leverage_cache[symbol] = user_leverage
+        logging.info("User Default Leverage: %s", user_leverage)
+        return user_leverage
+
+    def invalidate_leverage(self, symbol=None):
+        """Drops the cached leverage for the symbol (or every symbol if None)."""
+        if symbol is None:
+            self._leverage_cache.clear()
+        else:
+            self._leverage_cache.pop(symbol, None)
+
+    def adjust_leverage(self, leverage, symbol=None):
+        """
+        Synchronous wrapper to adjust the user leverage for the symbol.
+        """
+        return self._run(self._async_adjust_leverage(leverage, symbol))
+
+    async def _async_adjust_leverage(self, leverage, symbol=None):
+        if symbol is None:
+            symbol = self.symbol
+        self.invalidate_leverage(symbol)
+        resp = await self.client.adjust_leverage(symbol, leverage)
+        return resp
+
+    async def _async_post_order(self, signed_order):
+        """
+        Posts a signed order, invalidating the cached leverage if the exchange rejects
+        it for a leverage mismatch so the next order re-reads it.
+        """
+        try:
+            with metrics.span('post_signed_order'):
+                resp = await self.client.post_signed_order(signed_order)
+        except Exception as e:
+            if 'leverage' in str(e).lower():
+                logging.warning("Order rejected for leverage, invalidating cache: %s", e)
+                self.invalidate_leverage(self.symbol)
+            raise
+        if isinstance(resp, dict) and resp.get('error') and 'leverage' in str(resp['error']).lower():
+            logging.warning("Order rejected for leverage, invalidating cache: %s", resp['error'])
+            self.invalidate_leverage(self.symbol)
+        return resp
+
+    def leverage_cache_stats(self) -> dict:
+        return {
+            'hits': self.leverage_cache_hits,
+            'misses': self.leverage_cache_misses,
+            'cached': dict(self._leverage_cache),
+        }
+
     def place_stop_loss_order(self, stop_loss_price, real_time_position, quantity):
         """
         Synchronous wrapper to place a stop loss order using Bluefin's asynchronous API.
         """
-        return self.loop.run_until_complete(
+        return self._run(
             self._async_place_stop_loss_order(stop_loss_price, real_time_position, quantity)
         )
 
@@ -69,9 +235,8 @@ class BluefinOrderManager:
         # Determine the order side: if the position is long, a stop loss is a SELL order; otherwise BUY.
         side = ORDER_SIDE.SELL if real_time_position == 'long' else ORDER_SIDE.BUY
 
-        # Retrieve current leverage (default is 3 on Bluefin)
-        user_leverage = await self.client.get_user_leverage(self.symbol)
-        logging.info("User Default Leverage: %s", user_leverage)
+        # Retrieve current leverage (default is 3 on Bluefin), cached after the first call.
+        user_leverage = await self._async_get_leverage()
 
         # Create an order signature request (price is 0 for market orders).
         signature_request = OrderSignatureRequest(
@@ -87,7 +252,7 @@ class BluefinOrderManager:
 
         # Sign and post the order.
         signed_order = self.client.create_signed_order(signature_request)
-        resp = await self.client.post_signed_order(signed_order)
+        resp = await self._async_post_order(signed_order)
         return resp
 
     def place_take_profit_order(self, take_profit_price, real_time_position, quantity=None):
@@ -96,7 +261,7 @@ class BluefinOrderManager:
         """
         if quantity is None:
             quantity = self.quantity
-        return self.loop.run_until_complete(
+        return self._run(
             self._async_place_take_profit_order(take_profit_price, real_time_position, quantity)
         )
 
@@ -112,8 +277,7 @@ class BluefinOrderManager:
         side = ORDER_SIDE.SELL if real_time_position == 'long' else ORDER_SIDE.BUY
 
         # Retrieve current leverage.
-        user_leverage = await self.client.get_user_leverage(self.symbol)
-        logging.info("User Default Leverage: %s", user_leverage)
+        user_leverage = await self._async_get_leverage()
 
         # Create the order signature request.
         signature_request = OrderSignatureRequest(
@@ -128,9 +292,44 @@ class BluefinOrderManager:
 
         # Sign and post the order.
         signed_order = self.client.create_signed_order(signature_request)
-        resp = await self.client.post_signed_order(signed_order)
+        resp = await self._async_post_order(signed_order)
         return resp
 
+    def place_bracket_orders(self, stop_loss_price, take_profit_price, real_time_position, quantity=None):
+        """
+        Synchronous wrapper to place the stop loss and take profit legs concurrently.
+        """
+        if quantity is None:
+            quantity = self.quantity
+        with metrics.span('place_bracket_orders'):
+            return self._run(
+                self._async_place_bracket_orders(stop_loss_price, take_profit_price, real_time_position, quantity)
+            )
+
+    async def _async_place_bracket_orders(self, stop_loss_price, take_profit_price, real_time_position, quantity):
+        """
+        Asynchronously places both bracket legs:
+          - Warms the leverage cache once so the legs don't race for it.
+          - Signs and posts the stop loss and take profit orders concurrently.
+
+        :return: dict with the 'stop_loss' and 'take_profit' responses (or the exception
+                 raised by that leg) and 'failed', the list of legs that did not succeed.
+        """
+        await self._async_get_leverage()
+        results = await asyncio.gather(
+            self._async_place_stop_loss_order(stop_loss_price, real_time_position, quantity),
+            self._async_place_take_profit_order(take_profit_price, real_time_position, quantity),
+            return_exceptions=True,
+        )
+
+        bracket = {'stop_loss': results[0], 'take_profit': results[1], 'failed': []}
+        for leg in ('stop_loss', 'take_profit'):
+            resp = bracket[leg]
+            if _order_failed(resp):
+                logging.error("Bracket %s leg failed: %s", leg, resp)
+                bracket['failed'].append(leg)
+        return bracket
+
     def open_position_at_market(self, signal, quantity=None):
         """
         Synchronous wrapper to open a market position and wait for fill.
@@ -139,11 +338,12 @@ class BluefinOrderManager:
             quantity = self.quantity
 
         # Submit the market order.
-        initial_response = self.loop.run_until_complete(
+        initial_response = self._run(
             self._async_open_position_at_market(signal, quantity)
         )
         if not initial_response:
             return None
+        self.invalidate_positions()
 
         order_hash = initial_response.get("hash")
         if not order_hash:
@@ -151,7 +351,9 @@ class BluefinOrderManager:
             return initial_response
 
         # Poll for the order to be filled.
-        filled_order = self.loop.run_until_complete(self.wait_for_order_fill(order_hash))
+        with metrics.span('wait_for_order_fill'):
+            filled_order = self._run(self.wait_for_order_fill(order_hash))
+        self.invalidate_positions()
         if filled_order:
             logging.info("Order filled: %s", filled_order)
             return filled_order
@@ -178,7 +380,7 @@ class BluefinOrderManager:
             logging.info('Invalid quantity, cannot open position.')
             return None
 
-        user_leverage = await self.client.get_user_leverage(self.symbol)
+        user_leverage = await self._async_get_leverage()
 
         signature_request = OrderSignatureRequest(
             symbol=self.symbol,
@@ -191,7 +393,7 @@ class BluefinOrderManager:
         )
 
         signed_order = self.client.create_signed_order(signature_request)
-        resp = await self.client.post_signed_order(signed_order)
+        resp = await self._async_post_order(signed_order)
         return resp
 
     def close_position_at_market(self, real_time_position, quantity=None):
@@ -201,18 +403,21 @@ class BluefinOrderManager:
         if quantity is None:
             quantity = self.quantity
 
-        initial_response = self.loop.run_until_complete(
+        initial_response = self._run(
             self._async_close_position_at_market(real_time_position, quantity)
         )
         if not initial_response:
             return None
+        self.invalidate_positions()
 
         order_hash = initial_response.get("hash")
         if not order_hash:
             logging.error("Order hash missing in response.")
             return initial_response
 
-        filled_order = self.loop.run_until_complete(self.wait_for_order_fill(order_hash))
+        with metrics.span('wait_for_order_fill'):
+            filled_order = self._run(self.wait_for_order_fill(order_hash))
+        self.invalidate_positions()
         if filled_order:
             logging.info("Order filled: %s", filled_order)
             return filled_order
@@ -230,7 +435,7 @@ class BluefinOrderManager:
             logging.info('Invalid quantity, cannot close position.')
             return None
 
-        user_leverage = await self.client.get_user_leverage(self.symbol)
+        user_leverage = await self._async_get_leverage()
 
         signature_request = OrderSignatureRequest(
             symbol=self.symbol,
@@ -243,14 +448,14 @@ class BluefinOrderManager:
         )
 
         signed_order = self.client.create_signed_order(signature_request)
-        resp = await self.client.post_signed_order(signed_order)
+        resp = await self._async_post_order(signed_order)
         return resp
 
     def cancel_all_orders(self):
         """
         Synchronous wrapper to cancel all orders for the symbol.
         """
-        return self.loop.run_until_complete(self._async_cancel_all_orders())
+        return self._run(self._async_cancel_all_orders())
 
     async def _async_cancel_all_orders(self):
         orders = await self.client.get_orders({"symbol": self.symbol})
@@ -260,6 +465,9 @@ class BluefinOrderManager:
             logging.info("No orders to cancel for symbol %s.", self.symbol)
             return None
 
+        return await self._async_cancel_orders(order_hashes)
+
+    async def _async_cancel_orders(self, order_hashes):
         cancellation_request = self.client.create_signed_cancel_orders(
             self.symbol,
             order_hash=order_hashes
@@ -268,22 +476,106 @@ class BluefinOrderManager:
         logging.info("Cancellation response: %s", resp)
         return resp
 
-    def fetch_current_positions(self):
+    def reconcile_orders(self, desired):
+        """
+        Synchronous wrapper to make the resting orders match `desired`.
+        """
+        with metrics.span('reconcile_orders'):
+            return self._run(self._async_reconcile_orders(desired))
+
+    async def _async_reconcile_orders(self, desired):
+        """
+        Diffs the desired resting orders (see order_reconciler.DesiredOrder) against the
+        live ones and only touches what differs:
+          - Places the missing orders first, concurrently, so a stop is always resting.
+          - Cancels the live orders that are no longer wanted in one request, except a
+            stale leg whose replacement of the same kind failed to place; it stays resting.
+
+        :return: dict with the 'placed' responses, 'cancelled' hashes, 'kept' count,
+                 'failed' (kinds whose placement failed, like place_bracket_orders) and
+                 'kept_stale' (hashes left resting because their replacement failed).
+        """
+        orders = await self.client.get_orders({"symbol": self.symbol})
+        to_cancel, to_place = diff_orders(desired, orders)
+
+        placed = []
+        if to_place:
+            await self._async_get_leverage()
+            placed = await asyncio.gather(*[self._async_place_desired_order(order) for order in to_place],
+                                          return_exceptions=True)
+        failed = []
+        for order, resp in zip(to_place, placed):
+            if _order_failed(resp):
+                logging.error("Reconcile %s leg failed: %s", order.kind, resp)
+                failed.append(order.kind)
+
+        stale_hashes = set(to_cancel)
+        stale = [order for order in orders if order['hash'] in stale_hashes]
+        cancel = safe_to_cancel(stale, set(failed))
+        kept_stale = [order_hash for order_hash in to_cancel if order_hash not in cancel]
+        if cancel:
+            await self._async_cancel_orders(cancel)
+
+        logging.info("Reconciled orders: placed %s, cancelled %s, kept %s, failed %s.",
+                     len(to_place) - len(failed), len(cancel), len(desired) - len(to_place), failed)
+        return {'placed': placed, 'cancelled': cancel, 'kept': len(desired) - len(to_place),
+                'failed': failed, 'kept_stale': kept_stale}
+
+    async def _async_place_desired_order(self, order):
+        # Bracket legs close the position, so a SELL leg protects a long and vice versa.
+        real_time_position = 'long' if order.side == 'SELL' else 'short'
+        if order.kind == 'stop_loss':
+            return await self._async_place_stop_loss_order(order.price, real_time_position, order.quantity)
+        return await self._async_place_take_profit_order(order.price, real_time_position, order.quantity)
+
+    def fetch_current_positions(self, max_age=None):
         """
         Synchronous wrapper to fetch current positions.
+
+        Returns the cached snapshot if it is younger than `max_age` seconds (default
+        position_ttl) and no market order of ours has filled since; otherwise refetches.
+        The snapshot's version is available as position_version.
         """
-        position = self.loop.run_until_complete(self._async_fetch_current_position())
+        if max_age is None:
+            max_age = self.position_ttl
+        if self._position_snapshot is not None and time.monotonic() - self._position_fetched_at <= max_age:
+            self.position_cache_hits += 1
+            return self._position_snapshot
+
+        with metrics.span('fetch_current_positions'):
+            position = self._run(self._async_fetch_current_position())
         position = self.parse_position_data(position)
+        self._position_snapshot = position
+        self._position_fetched_at = time.monotonic()
+        self.position_version += 1
+        self.position_fetches += 1
         return position
 
-    def get_order_sync(self):
-        orders = self.loop.run_until_complete(self._async_get_orders())
+    def invalidate_positions(self):
+        """Forces the next fetch_current_positions to go to the exchange."""
+        self._position_snapshot = None
+
+    def position_cache_stats(self) -> dict:
+        return {
+            'version': self.position_version,
+            'fetches': self.position_fetches,
+            'hits': self.position_cache_hits,
+        }
+
+    def get_order_sync(self, parsed=False):
+        """
+        Synchronous wrapper to fetch open orders. With parsed=True the 10**18-scaled fields
+        are converted (see bluefin_parser.parse_orders); by default they are returned as is.
+        """
+        orders = self._run(self._async_get_orders())
+        if parsed:
+            orders = parse_orders(orders, exact=self.exact_decimals)
         return orders
 
     async def _async_get_orders(self):
         orders = await self.client.get_orders(
             {
-                "symbol": MARKET_SYMBOLS.ETH,
+                "symbol": self.symbol,
             },
         )
         return orders
@@ -292,67 +584,27 @@ class BluefinOrderManager:
         position = await self.client.get_user_position({"symbol": self.symbol})
         return position
 
-    async def wait_for_order_fill(self, order_hash, timeout=30, poll_interval=2):
+    async def wait_for_order_fill(self, order_hash, timeout=30):
         """
-        Polls the order status until it is filled or a timeout is reached.
+        Waits until the order is filled or a timeout is reached.
 
-        If the order with the specified order_hash is not found, it waits one additional
-        poll interval to double-check. If it is still not found, the function assumes that
-        the order is filled.
+        Fills are resolved by the order tracker as soon as they are known (socket update or
+        sub-second polling). An order that disappears from the open orders is resolved by
+        looking up its final status by hash.
 
         :param order_hash: The unique identifier of the order to track.
         :param timeout: Maximum time (in seconds) to wait.
-        :param poll_interval: Time (in seconds) between checks.
         :return: The final order response if filled; otherwise, None.
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            orders = await self.client.get_orders({"symbol": self.symbol})
-            matching_order = next((order for order in orders if order.get("hash") == order_hash), None)
-
-            if matching_order is None:
-                logging.info("Order %s not found, double-checking...", order_hash)
-                await asyncio.sleep(poll_interval)
-                orders = await self.client.get_orders({"symbol": self.symbol})
-                matching_order = next((order for order in orders if order.get("hash") == order_hash), None)
-                if matching_order is None:
-                    logging.info("Order %s not found after double-check; assuming it is filled.", order_hash)
-                    # Optionally, you can return a constructed order response indicating FILLED status.
-                    return {"orderStatus": "FILLED", "hash": order_hash}
-            else:
-                status = matching_order.get("orderStatus", "")
-                logging.info("Polling order status: %s", status)
-                if status == "FILLED":
-                    return matching_order
-
-            await asyncio.sleep(poll_interval)
-
-        logging.warning("Order %s not filled within %s seconds.", order_hash, timeout)
-        return None
+        return await self.order_tracker.wait(order_hash, timeout=timeout)
 
     def parse_position_data(self, position: dict) -> dict:
         """
         Parses the position data returned by the Bluefin API, converting numeric
-        values (scaled by 10**18, provided as strings) into floats.
-        """
-        keys_to_scale = [
-            "avgEntryPrice", "indexPrice", "leverage", "liquidationPrice", "margin",
-            "midMarketPrice", "netMargin", "oraclePrice", "positionSelectedLeverage",
-            "positionValue", "quantity", "unrealizedProfit", "unrealizedProfitPercent",
-            "fundingDue",
-        ]
-
-        parsed = {}
-        for key, value in position.items():
-            if key in keys_to_scale:
-                try:
-                    parsed[key] = float(Decimal(value) / Decimal(10 ** 18))
-                except Exception as e:
-                    logging.error("Error parsing key %s with value %s: %s", key, value, e)
-                    parsed[key] = value
-            else:
-                parsed[key] = value
-        return parsed
+        values (scaled by 10**18, provided as strings) into floats, or Decimals
+        when exact_decimals is set.
+        """
+        return parse_position(position, exact=self.exact_decimals)
 
 async def place_orders(client: BluefinClient):
     # Sign and place a limit order at 4x leverage. Order is signed using the account seed phrase set on the client
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+from bluefin_parser import scale_base18
+
+# kind is 'stop_loss' or 'take_profit'; side/order_type use the exchange's string values.
+DesiredOrder = namedtuple('DesiredOrder', ['kind', 'side', 'order_type', 'price', 'quantity'])
+
+ORDER_TYPE_FOR_KIND = {'stop_loss': 'STOP_LIMIT', 'take_profit': 'LIMIT'}
+KIND_FOR_ORDER_TYPE = {order_type: kind for kind, order_type in ORDER_TYPE_FOR_KIND.items()}
+
+
+def _enum_value(value):
+    return str(getattr(value, 'value', value)).upper()
+
+
+def order_kind(order):
+    """'stop_loss' or 'take_profit' for a live bracket leg, else None."""
+    return KIND_FOR_ORDER_TYPE.get(_enum_value(order.get('orderType')))
+
+
+def safe_to_cancel(stale_orders, failed_kinds):
+    """
+    Hashes of the stale live orders that may be cancelled: a leg whose replacement of the
+    same kind failed to place is kept, so the position is never left without it.
+    """
+    return [order['hash'] for order in stale_orders if order_kind(order) not in failed_kinds]
+
+
+def bracket_orders(real_time_position, stop_loss_price, take_profit_price, quantity):
+    """Returns the resting orders that should protect a 'long' or 'short' position."""
+    side = 'SELL' if real_time_position == 'long' else 'BUY'
+    return [
+        DesiredOrder('stop_loss', side, ORDER_TYPE_FOR_KIND['stop_loss'], stop_loss_price, quantity),
+        DesiredOrder('take_profit', side, ORDER_TYPE_FOR_KIND['take_profit'], take_profit_price, quantity),
+    ]
+
+
+def diff_orders(desired, live, price_tolerance=0.05, quantity_tolerance=1e-9):
+    """
+    Diffs the desired resting orders against the live ones.
+
+    Each live order matches at most one desired order with the same side and type and a
+    price/quantity within tolerance. Live orders are as get_orders returns them, with
+    10**18-scaled prices and quantities (strings or numbers).
+
+    :return: (hashes of live orders to cancel, desired orders to place)
+    """
+    unmatched = list(live)
+    to_place = []
+    for want in desired:
+        match = None
+        for order in unmatched:
+            if _enum_value(order.get('side')) != want.side:
+                continue
+            if _enum_value(order.get('orderType')) != want.order_type:
+                continue
+            if abs(scale_base18(order.get('price', 0)) - want.price) > price_tolerance:
+                continue
+            if abs(scale_base18(order.get('quantity', 0)) - want.quantity) > quantity_tolerance:
+                continue
+            match = order
+            break
+        if match is None:
+            to_place.append(want)
+        else:
+            unmatched.remove(match)
+    to_cancel = [order['hash'] for order in unmatched]
+    return to_cancel, to_place
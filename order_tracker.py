@@ -0,0 +1,232 @@
+import asyncio
+import functools
+import logging
+import time
+
+FILLED_STATUSES = {"FILLED"}
+CLOSED_STATUSES = {"CANCELLED", "EXPIRED", "REJECTED"}
+
+
+@functools.lru_cache(maxsize=None)
+def _final_statuses():
+    """Filled and closed statuses for get_orders, as SDK enums when the SDK is installed."""
+    names = sorted(FILLED_STATUSES | CLOSED_STATUSES)
+    try:
+        from bluefin_v2_client import ORDER_STATUS
+    except ImportError:
+        return tuple(names)
+    return tuple(getattr(ORDER_STATUS, name) for name in names if hasattr(ORDER_STATUS, name))
+
+
+class OrderTracker:
+    """
+    Tracks open orders by hash and resolves an awaitable future per order as soon as
+    its fill is known.
+
+    Fills are picked up from the exchange's order-update socket when subscribe() succeeded,
+    and from a single shared get_orders poll otherwise. While any order is waiting the poll
+    runs every `min_interval` (every `max_interval` as a safety net next to the socket);
+    it stops once nothing is pending.
+
+    An order missing from get_orders has usually filled, so its final status is looked up
+    by hash on the first poll it is missing from and FILLED/CANCELLED resolve it at once.
+    If the lookup does not list it yet it stays pending. Only if the lookup itself fails is
+    it assumed to have filled, and then only once it has been missing for
+    `missing_confirmations` polls and at least `missing_after` seconds (by default
+    max_interval), since a fresh order may simply not be listed yet.
+
+    Works against any client exposing `async get_orders({"symbol": ...})` (plus
+    "orderHashes"/"statuses" for the status lookup), so it can be driven by an in-process fake.
+    """
+
+    def __init__(self, client, symbol, min_interval=0.1, max_interval=2.0,
+                 missing_confirmations=2, missing_after=None):
+        self.client = client
+        self.symbol = symbol
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.missing_confirmations = missing_confirmations
+        self.missing_after = max_interval if missing_after is None else missing_after
+
+        self._futures = {}
+        self._missing = {}
+        self._poll_task = None
+        self.subscribed = False
+        self.polls = 0
+        self.status_lookups = 0
+        self.assumed_fills = 0
+
+    def pending(self):
+        return [h for h, fut in self._futures.items() if not fut.done()]
+
+    def track(self, order_hash) -> asyncio.Future:
+        """
+        Returns a future that resolves with the filled order, or None if the order was
+        cancelled/expired. Must be called from the event loop that drives the client.
+        """
+        fut = self._futures.get(order_hash)
+        if fut is None or fut.done():
+            fut = asyncio.get_running_loop().create_future()
+            self._futures[order_hash] = fut
+            self._missing[order_hash] = None
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll())
+        return fut
+
+    async def wait(self, order_hash, timeout=30):
+        """
+        Waits for the order to fill.
+
+        :return: The filled order, or None if it was cancelled or did not fill in time.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.track(order_hash)), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Order %s not filled within %s seconds.", order_hash, timeout)
+            self._discard(order_hash)
+            return None
+
+    def _discard(self, order_hash):
+        fut = self._futures.pop(order_hash, None)
+        self._missing.pop(order_hash, None)
+        if fut is not None and not fut.done():
+            fut.cancel()
+
+    def _resolve(self, order_hash, result):
+        fut = self._futures.pop(order_hash, None)
+        self._missing.pop(order_hash, None)
+        if fut is not None and not fut.done():
+            fut.set_result(result)
+
+    def on_order_update(self, order):
+        """
+        Applies a single order update (from the socket or a poll). Returns True if it
+        resolved a tracked order.
+        """
+        if isinstance(order, dict) and 'order' in order:
+            order = order['order']
+        order_hash = order.get("hash")
+        if order_hash not in self._futures:
+            return False
+
+        status = order.get("orderStatus", "")
+        self._missing[order_hash] = None
+        if status in FILLED_STATUSES:
+            self._resolve(order_hash, order)
+            return True
+        if status in CLOSED_STATUSES:
+            logging.warning("Order %s closed without filling: %s", order_hash, status)
+            self._resolve(order_hash, None)
+            return True
+        return False
+
+    def apply_open_orders(self, orders, now=None):
+        """
+        Applies a get_orders snapshot of open orders. Returns True if any tracked order was
+        resolved. Tracked orders missing from it are counted towards missing_orders().
+        """
+        now = time.monotonic() if now is None else now
+        by_hash = {order.get("hash"): order for order in orders or []}
+        progressed = False
+        for order_hash in self.pending():
+            order = by_hash.get(order_hash)
+            if order is not None:
+                progressed |= self.on_order_update(order)
+                continue
+
+            missing = self._missing.get(order_hash)
+            # (first poll it was missing from, consecutive polls missing)
+            self._missing[order_hash] = (now, 1) if missing is None else (missing[0], missing[1] + 1)
+        return progressed
+
+    def missing_orders(self):
+        """Tracked orders missing from the last open-orders snapshot, to look up by hash."""
+        return [order_hash for order_hash in self.pending() if self._missing.get(order_hash) is not None]
+
+    def assumable_fills(self, order_hashes, now=None):
+        """
+        The given orders missing long enough to assume they filled when their status
+        cannot be looked up.
+        """
+        now = time.monotonic() if now is None else now
+        return [order_hash for order_hash in order_hashes
+                if self._missing.get(order_hash) is not None
+                and self._missing[order_hash][1] >= self.missing_confirmations
+                and now - self._missing[order_hash][0] >= self.missing_after]
+
+    async def confirm_missing(self, order_hashes):
+        """
+        Looks up the final status of orders that left the open orders. Returns True if any
+        was resolved. Orders the lookup does not return yet stay pending.
+        """
+        self.status_lookups += 1
+        try:
+            orders = await self.client.get_orders({"symbol": self.symbol, "orderHashes": list(order_hashes),
+                                                   "statuses": list(_final_statuses())})
+        except Exception as e:
+            assumed = self.assumable_fills(order_hashes)
+            logging.warning("Order status lookup failed for %s; assuming %s filled: %s", order_hashes, assumed, e)
+            for order_hash in assumed:
+                self.assumed_fills += 1
+                self._resolve(order_hash, {"orderStatus": "FILLED", "hash": order_hash})
+            return bool(assumed)
+
+        progressed = False
+        for order in orders or []:
+            progressed |= self.on_order_update(order)
+        for order_hash in order_hashes:
+            if order_hash in self._futures:
+                logging.info("Order %s is not open but has no final status yet; still waiting.", order_hash)
+        return progressed
+
+    async def _poll(self):
+        while self.pending():
+            # No backoff: a pending order is a market order whose fill someone is waiting on.
+            await asyncio.sleep(self.max_interval if self.subscribed else self.min_interval)
+            self.polls += 1
+            try:
+                orders = await self.client.get_orders({"symbol": self.symbol})
+            except Exception as e:
+                logging.warning("Order poll failed: %s", e)
+                continue
+            self.apply_open_orders(orders)
+            missing = self.missing_orders()
+            if missing:
+                await self.confirm_missing(missing)
+
+    async def subscribe(self, peers=()):
+        """
+        Subscribes to the user order-update socket. On success polling drops to
+        `max_interval` as a safety net; on failure, and again once the socket
+        disconnects, the trackers poll every `min_interval`.
+
+        :param peers: Trackers for other symbols on the same client; updates are fanned
+                      out to them so the socket is only opened once per client.
+        """
+        trackers = [self, *peers]
+
+        # The SDK awaits its socket callbacks.
+        async def dispatch(update):
+            for tracker in trackers:
+                if tracker.on_order_update(update):
+                    return
+
+        async def disconnected():
+            logging.warning("Order update socket disconnected, polling instead.")
+            for tracker in trackers:
+                tracker.subscribed = False
+
+        try:
+            from bluefin_v2_client import SOCKET_EVENTS
+            await self.client.socket.open()
+            # The SDK reports a failed subscription by returning False.
+            if not await self.client.socket.subscribe_user_update_by_token():
+                raise ConnectionError("user update subscription was rejected")
+            await self.client.socket.listen(SOCKET_EVENTS.ORDER_UPDATE.value, dispatch)
+            await self.client.socket.listen('disconnect', disconnected)
+        except Exception as e:
+            logging.warning("Order update subscription unavailable, polling instead: %s", e)
+            return False
+        for tracker in trackers:
+            tracker.subscribed = True
+        return True
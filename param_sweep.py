@@ -0,0 +1,251 @@
+import argparse
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+
+apply_smoothing = lazy_import('feature_selection_tbl_single_backtest', 'apply_smoothing')
+
+# Per-worker copies of the cached inputs, set once by _init_worker instead of per task.
+_PROBS = None
+_OHLC = None
+_SETTINGS = None
+
+
+def cache_probabilities(strategy, klines, cache_path):
+    """
+    Returns the model's class probabilities for `klines`, computing them with the
+    strategy's own feature and model pipeline only if `cache_path` does not exist yet.
+    The probabilities are aligned with the last len(probs) rows of `klines`.
+    """
+    if os.path.exists(cache_path):
+        logging.info(f'Loading cached probabilities from {cache_path}')
+        return np.load(cache_path)
+
+    strategy.feature_engine.max_rows = len(klines)
+    ypred_prob, _ = strategy.predict_probabilities(klines)
+    probs = np.asarray(ypred_prob, dtype=np.float64)
+    np.save(cache_path, probs)
+    logging.info(f'Cached {probs.shape} probabilities to {cache_path}')
+    return probs
+
+
+def signals_for_thresholds(smoothed, thresholds):
+    """
+    Vectorized process_predictions rule for several thresholds at once.
+
+    :param smoothed: (n, 3) smoothed probabilities for classes (-1, 0, 1).
+    :return: (len(thresholds), n) int8 signals in {-1, 0, 1}.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)[:, None]
+    argmax = np.argmax(smoothed, axis=1) - 1
+    confident = (smoothed[:, 0] >= thresholds) | (smoothed[:, 2] >= thresholds)
+    return np.where(confident, argmax, 0).astype(np.int8)
+
+
+def simulate(signals, ohlc, stop_losses, take_profits, trading_fee, neutral_tolerance=3):
+    """
+    Simulates the live trading rules for one signal series across every SL/TP pair at
+    once (one NumPy lane per pair):
+      - Flat and a non-zero signal: enter at the close and set SL/TP from the entry.
+      - In a position: SL/TP ratchet with the close like update_existing_order_price,
+        resting SL/TP fill on the next bars' range (stop first), an opposite signal
+        flips at the close, and `neutral_tolerance` consecutive neutral signals close
+        the position once it is at or above break-even.
+    Every fill pays `trading_fee` on its notional (per unit of quantity).
+
+    :return: dict of (len(stop_losses),) arrays: net_pnl, fees, trades, max_drawdown.
+    """
+    opens, highs, lows, closes = ohlc
+    sl_pct = np.asarray(stop_losses, dtype=np.float64)
+    tp_pct = np.asarray(take_profits, dtype=np.float64)
+    k = len(sl_pct)
+
+    pos = np.zeros(k)
+    entry = np.zeros(k)
+    sl = np.zeros(k)
+    tp = np.zeros(k)
+    neutral = np.zeros(k, dtype=np.int64)
+    pnl = np.zeros(k)
+    fees = np.zeros(k)
+    trades = np.zeros(k, dtype=np.int64)
+    peak = np.zeros(k)
+    drawdown = np.zeros(k)
+
+    for i in range(len(closes)):
+        o, h, l, c, s = opens[i], highs[i], lows[i], closes[i], signals[i]
+
+        # Resting orders placed at the previous close.
+        long_, short_ = pos > 0, pos < 0
+        stop_hit = (long_ & (l <= sl)) | (short_ & (h >= sl))
+        stop_px = np.where(long_, np.minimum(sl, o), np.maximum(sl, o))
+        tp_hit = ~stop_hit & ((long_ & (h >= tp)) | (short_ & (l <= tp)))
+        tp_px = np.where(long_, np.maximum(tp, o), np.minimum(tp, o))
+        exit_px = np.where(stop_hit, stop_px, tp_px)
+        exited = stop_hit | tp_hit
+        pnl += np.where(exited, (exit_px - entry) * pos, 0.0)
+        fees += np.where(exited, exit_px * trading_fee, 0.0)
+        pos = np.where(exited, 0.0, pos)
+
+        # Decision at the close.
+        flip = (pos != 0) & (s != 0) & (pos != s)
+        neutral = np.where((pos != 0) & (s == 0), neutral + 1, 0)
+        breakeven = ((pos > 0) & (c >= entry)) | ((pos < 0) & (c <= entry))
+        neutral_exit = (neutral >= neutral_tolerance) & breakeven
+        closing = flip | neutral_exit
+        pnl += np.where(closing, (c - entry) * pos, 0.0)
+        fees += np.where(closing, c * trading_fee, 0.0)
+        pos = np.where(closing, 0.0, pos)
+        neutral = np.where(closing, 0, neutral)
+
+        opening = (pos == 0) & (s != 0)
+        if opening.any():
+            pos = np.where(opening, float(s), pos)
+            entry = np.where(opening, c, entry)
+            sl = np.where(opening, c * (1 - sl_pct * s), sl)
+            tp = np.where(opening, c * (1 + tp_pct * s), tp)
+            fees += np.where(opening, c * trading_fee, 0.0)
+            trades += opening
+
+        # Trailing ratchet for positions that were already open.
+        held = (pos != 0) & ~opening
+        sl = np.where(held & (pos > 0), np.maximum(sl, c * (1 - sl_pct)),
+                      np.where(held & (pos < 0), np.minimum(sl, c * (1 + sl_pct)), sl))
+        tp = np.where(held & (pos > 0), np.maximum(tp, c * (1 + tp_pct)),
+                      np.where(held & (pos < 0), np.minimum(tp, c * (1 - tp_pct)), tp))
+
+        equity = pnl - fees + (c - entry) * pos
+        peak = np.maximum(peak, equity)
+        drawdown = np.maximum(drawdown, peak - equity)
+
+    net = pnl - fees + (closes[-1] - entry) * pos if len(closes) else pnl - fees
+    return {'net_pnl': net, 'fees': fees, 'trades': trades, 'max_drawdown': drawdown}
+
+
+def _init_worker(probs, ohlc, settings):
+    global _PROBS, _OHLC, _SETTINGS
+    _PROBS, _OHLC, _SETTINGS = probs, ohlc, settings
+
+
+def _smooth(probs, span, smoothing_method):
+    smoothed = apply_smoothing(pd.DataFrame(index=range(len(probs))), probs.copy(), span, smoothing_method)
+    return smoothed[[f'prob_class_{i}_mean' for i in range(3)]].to_numpy(dtype=np.float64)
+
+
+def _evaluate(task):
+    """Worker: smooths once for (span, method) and simulates every threshold x SL/TP pair."""
+    span, smoothing_method = task
+    settings = _SETTINGS
+    smoothed = _smooth(_PROBS, span, smoothing_method)
+    all_signals = signals_for_thresholds(smoothed, settings['thresholds'])
+    sl_grid, tp_grid = settings['sl_grid'], settings['tp_grid']
+
+    rows = []
+    for threshold, signals in zip(settings['thresholds'], all_signals):
+        result = simulate(signals, _OHLC, sl_grid, tp_grid, settings['trading_fee'],
+                          settings['neutral_tolerance'])
+        for j in range(len(sl_grid)):
+            rows.append({
+                'span': span,
+                'smoothing_method': smoothing_method,
+                'prob_threshold': threshold,
+                'stop_loss': sl_grid[j],
+                'take_profit': tp_grid[j],
+                'net_pnl': result['net_pnl'][j],
+                'fees': result['fees'][j],
+                'trades': int(result['trades'][j]),
+                'max_drawdown': result['max_drawdown'][j],
+            })
+    return rows
+
+
+def run_sweep(probs, klines, thresholds, spans, smoothing_methods, stop_losses, take_profits,
+              trading_fee=0.0015, neutral_tolerance=3, workers=None) -> pd.DataFrame:
+    """
+    Evaluates the full parameter grid over cached probabilities and returns the results
+    ranked by net PnL (per unit of quantity). Each (span, smoothing_method) pair is one
+    process-pool task.
+    """
+    bars = klines.iloc[-len(probs):]
+    ohlc = tuple(bars[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close'))
+    sl_tp = list(itertools.product(stop_losses, take_profits))
+    settings = {
+        'thresholds': list(thresholds),
+        'sl_grid': np.array([pair[0] for pair in sl_tp]),
+        'tp_grid': np.array([pair[1] for pair in sl_tp]),
+        'trading_fee': trading_fee,
+        'neutral_tolerance': neutral_tolerance,
+    }
+    tasks = list(itertools.product(spans, smoothing_methods))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(np.asarray(probs), ohlc, settings)) as pool:
+        rows = [row for chunk in pool.map(_evaluate, tasks) for row in chunk]
+    logging.info(f'Evaluated {len(rows)} configurations over {len(bars)} bars in {time.perf_counter() - start:.1f}s')
+
+    results = pd.DataFrame(rows)
+    results['pnl_to_drawdown'] = results['net_pnl'] / results['max_drawdown'].replace(0, np.nan)
+    return results.sort_values('net_pnl', ascending=False).reset_index(drop=True)
+
+
+def _floats(value):
+    return [float(x) for x in value.split(',')]
+
+
+def parse_sweep_args():
+    parser = argparse.ArgumentParser(description='Sweep signal and SL/TP parameters over cached model probabilities.')
+    parser.add_argument('--klines', type=str, required=True, help='Recorded klines (csv, parquet or pickle)')
+    parser.add_argument('--probs_cache', type=str, required=True,
+                        help='Path of the .npy probability cache; computed with the model if missing')
+    parser.add_argument('--ticker', type=str, default='ETHUSD')
+    parser.add_argument('--model_path', type=str, default='./models/ETHUSDT_kaggle_features_transformed.joblib')
+    parser.add_argument('--features_path', type=str, default='./models/kaggle_features_transformed.joblib')
+    parser.add_argument('--thresholds', type=_floats, default=[0.4, 0.45, 0.5, 0.55, 0.6])
+    parser.add_argument('--spans', type=lambda v: [int(x) for x in v.split(',')], default=[4, 8, 12, 16])
+    parser.add_argument('--smoothing_methods', type=lambda v: v.split(','), default=['rolling', 'ewm'])
+    parser.add_argument('--stop_losses', type=_floats, default=[0.005, 0.0075, 0.01])
+    parser.add_argument('--take_profits', type=_floats, default=[0.005, 0.0075, 0.01, 0.015])
+    parser.add_argument('--trading_fee', type=float, default=0.0015)
+    parser.add_argument('--feature_store', type=str, default=None,
+                        help='Columnar feature store to reuse stored features from when computing probabilities')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', type=str, default='sweep_results.csv')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from replay import ReplayEngine, load_frame
+    from signals_tbl_eth_bluefin import BINANCE_TICKER_TO_BINANCE_TICKER, setup_logging
+
+    args = parse_sweep_args()
+    setup_logging(debug=False)
+    klines = load_frame(args.klines)
+
+    strategy = None
+    if not os.path.exists(args.probs_cache):
+        import data_processor
+        binance_ticker = BINANCE_TICKER_TO_BINANCE_TICKER[args.ticker]
+        processor = data_processor.CryptoDataProcessor(ticker=binance_ticker, existing_filename=f'{binance_ticker}_5m',
+                                                       db_path=f'./models/{binance_ticker}_prod_features.sqlite',
+                                                       offset=60)
+        # The replay engine builds a strategy wired to a simulated exchange; only its model pipeline is used.
+        strategy = ReplayEngine({
+            'ticker': args.ticker, 'quote_symbol_quantity': 1.0, 'trading_fee': args.trading_fee,
+            'prob_threshold': 0.5, 'smoothing_method': 'rolling', 'span': 8,
+            'stop_loss': 0.0075, 'take_profit': 0.0075, 'model_path': args.model_path,
+            'features_path': args.features_path, 'data_processor': processor,
+            'feature_store': args.feature_store,
+        }).build_strategy()
+    probs = cache_probabilities(strategy, klines, args.probs_cache)
+
+    results = run_sweep(probs, klines, args.thresholds, args.spans, args.smoothing_methods,
+                        args.stop_losses, args.take_profits, trading_fee=args.trading_fee, workers=args.workers)
+    results.to_csv(args.output, index=False)
+    print(results.head(20).to_string())
@@ -0,0 +1,161 @@
+import argparse
+import json
+import logging
+
+from lazy_imports import lazy_import
+from signals_tbl_eth_bluefin import (
+    SignalStrategy,
+    BINANCE_TICKER_TO_BINANCE_TICKER,
+    TICKER_TO_BLUEFIN_TICKER,
+    BluefinOrderManager,
+    InferenceWorker,
+    bluefin_symbol,
+    setup_logging,
+)
+from strategy_runtime import AsyncStrategyRuntime
+
+binance_client = lazy_import('binance_client')
+data_processor = lazy_import('data_processor')
+BinanceKlineFetcher = lazy_import('kline_buffer', 'BinanceKlineFetcher')
+
+# Per-symbol settings that may be omitted from the config.
+SYMBOL_DEFAULTS = {
+    'quantity': 0.01,
+    'trading_fee': 0.0015,
+    'prob_threshold': 0.5,
+    'smoothing_method': 'rolling',
+    'span': 8,
+    'take_profit': 0.0075,
+    'stop_loss': 0.0075,
+}
+
+
+def load_portfolio_config(path):
+    """
+    Loads the portfolio config. Example:
+
+        {
+            "minutes": 5,
+            "auth_cache": "./state/bluefin_auth.json",
+            "symbols": [
+                {"ticker": "ETHUSD",
+                 "model_path": "./models/ETHUSDT_kaggle_features_transformed.joblib",
+                 "features_path": "./models/kaggle_features_transformed.joblib",
+                 "db_path": "./models/ETHUSDT_prod_features.sqlite",
+                 "feature_store": "./models/ETHUSDT_features",
+                 "state_file": "./state/ETHUSD_strategy.json",
+                 "inference_worker": true,
+                 "feature_warmup": {"EMA": 1000, "MACD": 1000, "RSI": 1000},
+                 "cumulative_columns": ["OBV", "AD_line"]},
+                {"ticker": "BTCUSD", "quantity": 0.001, ...}
+            ]
+        }
+    """
+    with open(path) as f:
+        config = json.load(f)
+    symbols = []
+    for entry in config['symbols']:
+        if entry['ticker'] not in TICKER_TO_BLUEFIN_TICKER:
+            raise ValueError(f"Unsupported ticker {entry['ticker']}; expected one of {list(TICKER_TO_BLUEFIN_TICKER)}")
+        symbols.append({**SYMBOL_DEFAULTS, **entry})
+    config['symbols'] = symbols
+    return config
+
+
+def build_portfolio(config, private_key):
+    """
+    Builds one SignalStrategy per configured symbol on a single onboarded Bluefin
+    client, a single Binance data client and a single kline HTTP session.
+    """
+    minutes = config.get('minutes', 5)
+    time_frame = f'{minutes}m'
+    symbols = config['symbols']
+
+    first = symbols[0]
+    root_manager = BluefinOrderManager(private_key=private_key,
+                                       symbol=bluefin_symbol(first['ticker']),
+                                       trading_fee=first['trading_fee'],
+                                       quantity=first['quantity'],
+                                       auth_cache=config.get('auth_cache'))
+    data_client = binance_client.BinanceClient(time_interval=minutes,
+                                               symbol=BINANCE_TICKER_TO_BINANCE_TICKER[first['ticker']])
+    kline_fetcher = BinanceKlineFetcher(interval=time_frame)
+
+    strategies = []
+    for entry in symbols:
+        ticker = entry['ticker']
+        binance_ticker = BINANCE_TICKER_TO_BINANCE_TICKER[ticker]
+        if entry is first:
+            order_manager = root_manager
+        else:
+            order_manager = root_manager.for_symbol(bluefin_symbol(ticker),
+                                                    quantity=entry['quantity'],
+                                                    trading_fee=entry['trading_fee'])
+        processor_kwargs = dict(
+            ticker=binance_ticker,
+            existing_filename=f'{binance_ticker}_{time_frame}',
+            db_path=entry.get('db_path', f'./models/{binance_ticker}_prod_features.sqlite'),
+            offset=60)
+        strategy_kwargs = dict(
+            ticker=ticker,
+            prob_threshold=entry['prob_threshold'],
+            smoothing_method=entry['smoothing_method'],
+            span=entry['span'],
+            take_profit=entry['take_profit'],
+            stop_loss=entry['stop_loss'],
+            quote_symbol_quantity=entry['quantity'],
+            trading_fee=entry['trading_fee'],
+            model_path=entry['model_path'],
+            features_path=entry['features_path'],
+            tail_inference=entry.get('tail_inference', False),
+            tree_evaluator=entry.get('tree_evaluator', False),
+            feature_store=entry.get('feature_store'),
+            feature_plan=entry.get('feature_plan', True),
+            online_smoothing=entry.get('online_smoothing', False),
+            # None keeps the strategy's FEATURE_WARMUP / CUMULATIVE_FEATURES.
+            feature_warmup=entry.get('feature_warmup'),
+            cumulative_columns=entry.get('cumulative_columns'),
+            # Compare incremental features with a full recompute about once a day.
+            feature_parity_check_every=entry.get('feature_parity_check_every', 24 * 60 // minutes),
+        )
+        if entry.get('inference_worker', False):
+            # One warm worker process per symbol; the feature processor lives there.
+            worker = InferenceWorker(strategy_kwargs, processor_kwargs).start()
+            feature_processor = None
+        else:
+            worker = None
+            feature_processor = data_processor.CryptoDataProcessor(**processor_kwargs)
+        strategies.append(SignalStrategy(
+            client_data=data_client,
+            data_processor=feature_processor,
+            api_key=private_key,
+            order_manager=order_manager,
+            kline_fetcher=kline_fetcher,
+            state_path=entry.get('state_file'),
+            inference_worker=worker,
+            **strategy_kwargs,
+        ))
+    return root_manager, strategies
+
+
+def parse_portfolio_args():
+    parser = argparse.ArgumentParser(description='Run the signal strategy for several symbols in one process.')
+    parser.add_argument('--privateKey', type=str, required=True,
+                        help='Private key for the API (e.g., the seed phrase)')
+    parser.add_argument('--config', type=str, required=True,
+                        help='Path to the portfolio JSON config')
+    parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_portfolio_args()
+    setup_logging(debug=args.debug)
+
+    config = load_portfolio_config(args.config)
+    root_manager, strategies = build_portfolio(config, args.privateKey)
+    logging.info(f'Running portfolio: {[strategy.ticker for strategy in strategies]}')
+
+    minutes = config.get('minutes', 5)
+    runtime = AsyncStrategyRuntime(strategies, signal_period=60 * minutes)
+    root_manager.loop.run_until_complete(runtime.run())
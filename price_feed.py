@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+
+import requests
+
+
+class StalePriceError(Exception):
+    pass
+
+
+class LastPriceFeed:
+    """
+    Holds the latest traded price for one symbol with the time it was observed.
+
+    get_price() is a lock-free attribute read. If the cached price is older than
+    `max_age` seconds the feed refreshes synchronously before returning; if that
+    fails too a StalePriceError is raised rather than trading on an old price.
+    """
+
+    def __init__(self, symbol, max_age=15.0):
+        self.symbol = symbol
+        self.max_age = max_age
+        # (price, monotonic timestamp) swapped as one tuple so reads are consistent.
+        self._last = (float('nan'), float('-inf'))
+        self.updates = 0
+        self.stale_reads = 0
+
+    def set_price(self, price, ts=None):
+        self._last = (float(price), time.monotonic() if ts is None else ts)
+        self.updates += 1
+
+    def age(self) -> float:
+        return time.monotonic() - self._last[1]
+
+    def fetch(self) -> float:
+        """Fetches the price from the source. Implemented by subclasses."""
+        raise NotImplementedError
+
+    def refresh(self):
+        self.set_price(self.fetch())
+
+    def get_price(self) -> float:
+        price, ts = self._last
+        if time.monotonic() - ts <= self.max_age:
+            return price
+
+        self.stale_reads += 1
+        try:
+            self.refresh()
+        except Exception as e:
+            raise StalePriceError(f'Price for {self.symbol} is {self.age():.1f}s old and refresh failed: {e}')
+        return self._last[0]
+
+
+class StaticPriceFeed(LastPriceFeed):
+    """Local stand-in for tests and replays: the price only changes via set_price()."""
+
+    def __init__(self, symbol, price=float('nan'), max_age=float('inf')):
+        super().__init__(symbol, max_age=max_age)
+        if price == price:
+            self.set_price(price)
+
+    def fetch(self) -> float:
+        return self._last[0]
+
+
+class BinancePriceFeed(LastPriceFeed):
+    """
+    Polls the Binance ticker price endpoint (a few dozen bytes per call) from a
+    background thread so the monitor loop only ever reads the cached value.
+    """
+
+    def __init__(self, symbol, max_age=15.0, poll_interval=1.0,
+                 base_url='https://api.binance.com', timeout=3):
+        super().__init__(symbol, max_age=max_age)
+        self.poll_interval = poll_interval
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def fetch(self) -> float:
+        resp = self.session.get(f'{self.base_url}/api/v3/ticker/price',
+                                params={'symbol': self.symbol}, timeout=self.timeout)
+        resp.raise_for_status()
+        return float(resp.json()['price'])
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'price-feed-{self.symbol}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + self.poll_interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f'Price feed for {self.symbol} failed to refresh: {e}')
+            self._stop.wait(self.poll_interval)
+
+
+_SHARED_FEEDS = {}
+_SHARED_FEEDS_LOCK = threading.Lock()
+
+
+def shared_price_feed(symbol, **kwargs) -> LastPriceFeed:
+    """
+    Returns the process-wide running BinancePriceFeed for `symbol` and these settings
+    (e.g. max_age), starting it on first use.
+    """
+    key = (symbol, tuple(sorted(kwargs.items())))
+    with _SHARED_FEEDS_LOCK:
+        feed = _SHARED_FEEDS.get(key)
+        if feed is None:
+            feed = BinancePriceFeed(symbol, **kwargs).start()
+            _SHARED_FEEDS[key] = feed
+        return feed
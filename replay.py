@@ -0,0 +1,334 @@
+import argparse
+import contextlib
+import io
+import itertools
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from bluefin_parser import BASE18
+from order_reconciler import diff_orders
+from price_feed import StaticPriceFeed
+from signals_tbl_eth_bluefin import SignalStrategy, BINANCE_TICKER_TO_BINANCE_TICKER, setup_logging
+
+
+class RecordingNotifier:
+    """Notifier stand-in that keeps messages in memory instead of posting them."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, webhook, content):
+        self.messages.append(content)
+
+
+class SimulatedOrderManager:
+    """
+    Simulated BluefinOrderManager for replays.
+
+    Implements the order manager surface SignalStrategy uses. Market orders fill at the
+    current price plus `slippage` (fraction) against the trader, and every fill pays
+    `trading_fee` on its notional. Resting orders are checked against each bar's
+    high/low in on_bar(): a stop fills at its price (or the open if the bar gapped
+    through it), a take-profit limit fills at its price, and the stop is checked first
+    when both trigger in the same bar. Bracket legs only ever reduce the position;
+    they are dropped once the position is flat.
+    """
+
+    def __init__(self, trading_fee, quantity, slippage=0.0):
+        self.trading_fee = trading_fee
+        self.quantity = quantity
+        self.slippage = slippage
+        self.order_tracker = None
+
+        self.price = np.nan
+        self.side = None  # 'BUY' (long) or 'SELL' (short)
+        self.position_qty = 0.0
+        self.entry_price = 0.0
+        self.resting = []
+        self._hashes = itertools.count()
+
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.fills = []
+        self.orders_placed = 0
+        self.orders_cancelled = 0
+
+    # Market state -------------------------------------------------------------------
+
+    def set_price(self, price):
+        self.price = float(price)
+
+    def on_bar(self, bar):
+        """Fills resting orders that the bar's range touched."""
+        for kind in ('stop_loss', 'take_profit'):
+            for order in [o for o in self.resting if o['kind'] == kind]:
+                if self.position_qty == 0:
+                    break
+                fill_price = self._trigger_price(order, bar)
+                if fill_price is not None:
+                    self.resting.remove(order)
+                    self._fill(order['side'], order['quantity'], fill_price, kind)
+        if self.position_qty == 0:
+            self.orders_cancelled += len(self.resting)
+            self.resting = []
+
+    @staticmethod
+    def _trigger_price(order, bar):
+        price = order['price']
+        if order['kind'] == 'stop_loss':
+            if order['side'] == 'SELL' and bar['low'] <= price:
+                return min(price, bar['open'])
+            if order['side'] == 'BUY' and bar['high'] >= price:
+                return max(price, bar['open'])
+        else:
+            if order['side'] == 'SELL' and bar['high'] >= price:
+                return max(price, bar['open'])
+            if order['side'] == 'BUY' and bar['low'] <= price:
+                return min(price, bar['open'])
+        return None
+
+    def _fill(self, side, quantity, price, reason):
+        quantity = float(quantity)
+        if self.side is not None and side != self.side:
+            # Reduce (and possibly flip) the position.
+            closing = min(quantity, self.position_qty)
+            direction = 1 if self.side == 'BUY' else -1
+            self.realized_pnl += (price - self.entry_price) * closing * direction
+            self.position_qty -= closing
+            remaining = quantity - closing
+            if self.position_qty <= 1e-12:
+                self.position_qty, self.side, self.entry_price = 0.0, None, 0.0
+            if remaining > 1e-12:
+                self.side, self.position_qty, self.entry_price = side, remaining, price
+        else:
+            total = self.position_qty + quantity
+            self.entry_price = (self.entry_price * self.position_qty + price * quantity) / total
+            self.position_qty, self.side = total, side
+
+        fee = abs(price * quantity) * self.trading_fee
+        self.fees += fee
+        self.fills.append({'side': side, 'quantity': quantity, 'price': price, 'fee': fee, 'reason': reason})
+
+    def _market(self, side, quantity, reason):
+        slip = self.slippage if side == 'BUY' else -self.slippage
+        self._fill(side, quantity, self.price * (1 + slip), reason)
+        self.orders_placed += 1
+        return {"orderStatus": "FILLED", "hash": str(next(self._hashes))}
+
+    # BluefinOrderManager surface ----------------------------------------------------
+
+    def fetch_current_positions(self, max_age=None):
+        if self.position_qty == 0:
+            return {}
+        return {
+            'side': self.side,
+            'quantity': self.position_qty,
+            'avgEntryPrice': self.entry_price,
+            'positionValue': self.position_qty * self.entry_price,
+        }
+
+    def position_cache_stats(self) -> dict:
+        return {}
+
+    def open_position_at_market(self, signal, quantity=None):
+        if signal not in (1, -1):
+            return None
+        return self._market('BUY' if signal == 1 else 'SELL', quantity or self.quantity, 'open')
+
+    def close_position_at_market(self, real_time_position, quantity=None):
+        side = 'SELL' if real_time_position == 'long' else 'BUY'
+        return self._market(side, quantity or self.quantity, 'close')
+
+    def _rest(self, kind, price, real_time_position, quantity):
+        side = 'SELL' if real_time_position == 'long' else 'BUY'
+        order = {'hash': str(next(self._hashes)), 'kind': kind, 'side': side,
+                 'orderType': 'STOP_LIMIT' if kind == 'stop_loss' else 'LIMIT',
+                 'price': float(price), 'quantity': float(quantity)}
+        self.resting.append(order)
+        self.orders_placed += 1
+        return order
+
+    def place_stop_loss_order(self, stop_loss_price, real_time_position, quantity):
+        return self._rest('stop_loss', stop_loss_price, real_time_position, quantity)
+
+    def place_take_profit_order(self, take_profit_price, real_time_position, quantity=None):
+        return self._rest('take_profit', take_profit_price, real_time_position, quantity or self.quantity)
+
+    def place_bracket_orders(self, stop_loss_price, take_profit_price, real_time_position, quantity=None):
+        quantity = quantity or self.quantity
+        return {
+            'stop_loss': self.place_stop_loss_order(stop_loss_price, real_time_position, quantity),
+            'take_profit': self.place_take_profit_order(take_profit_price, real_time_position, quantity),
+            'failed': [],
+        }
+
+    def cancel_all_orders(self):
+        if not self.resting:
+            return None
+        self.orders_cancelled += len(self.resting)
+        self.resting = []
+        return {'cancelled': True}
+
+    def reconcile_orders(self, desired):
+        # diff_orders takes exchange payloads, whose prices/quantities are 10**18-scaled.
+        live = [dict(o, price=o['price'] * BASE18, quantity=o['quantity'] * BASE18) for o in self.resting]
+        to_cancel, to_place = diff_orders(desired, live)
+        placed = []
+        for order in to_place:
+            real_time_position = 'long' if order.side == 'SELL' else 'short'
+            placed.append(self._rest(order.kind, order.price, real_time_position, order.quantity))
+        self.resting = [o for o in self.resting if o['hash'] not in to_cancel]
+        self.orders_cancelled += len(to_cancel)
+        return {'placed': placed, 'cancelled': to_cancel, 'kept': len(desired) - len(to_place),
+                'failed': [], 'kept_stale': []}
+
+    def get_order_sync(self, parsed=False):
+        return list(self.resting)
+
+    def unrealized_pnl(self):
+        if self.position_qty == 0:
+            return 0.0
+        direction = 1 if self.side == 'BUY' else -1
+        return (self.price - self.entry_price) * self.position_qty * direction
+
+
+class ReplayEngine:
+    """
+    Replays recorded klines through SignalStrategy's decision code
+    (generate_position_value, update_existing_order_price, flip_position) against a
+    SimulatedOrderManager.
+
+    Signals are computed once for the whole history (or passed in precomputed as a
+    frame with a 'ypred' column aligned to the last rows of the klines); each bar then
+    fills resting orders against its range and runs one decision tick at its close.
+    """
+
+    def __init__(self, strategy_kwargs, slippage=0.0, quiet=True):
+        self.strategy_kwargs = strategy_kwargs
+        self.slippage = slippage
+        self.quiet = quiet
+
+    def build_strategy(self):
+        kwargs = dict(self.strategy_kwargs)
+        self.order_manager = SimulatedOrderManager(kwargs['trading_fee'], kwargs['quote_symbol_quantity'],
+                                                   slippage=self.slippage)
+        self.price_feed = StaticPriceFeed(kwargs.get('ticker', 'ETHUSD'))
+        self.notifier = RecordingNotifier()
+        kwargs.setdefault('client_data', None)
+        kwargs.update(order_manager=self.order_manager, price_feed=self.price_feed,
+                      notifier=self.notifier, forced_signal=None)
+        return SignalStrategy(**kwargs)
+
+    def compute_signals(self, strategy, klines):
+        strategy.feature_engine.max_rows = len(klines)
+        return strategy.generate_tbl_signal(klines, act=False)
+
+    def run(self, klines: pd.DataFrame, signals: pd.DataFrame = None) -> dict:
+        strategy = self.build_strategy()
+        start = time.perf_counter()
+        if signals is None:
+            signals = self.compute_signals(strategy, klines)
+        signal_seconds = time.perf_counter() - start
+
+        bars = klines.iloc[-len(signals):]
+        opens, highs = bars['open'].to_numpy(float), bars['high'].to_numpy(float)
+        lows, closes = bars['low'].to_numpy(float), bars['close'].to_numpy(float)
+        close_times = pd.to_datetime(bars['close_time']).dt.floor('min').dt.to_pydatetime()
+        om = self.order_manager
+        equity = np.empty(len(bars))
+
+        start = time.perf_counter()
+        previous_level = logging.getLogger().level
+        quiet = contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+        if self.quiet:
+            logging.getLogger().setLevel(logging.WARNING)
+        try:
+            with quiet:
+                for i in range(len(bars)):
+                    om.on_bar({'open': opens[i], 'high': highs[i], 'low': lows[i]})
+                    om.set_price(closes[i])
+                    self.price_feed.set_price(closes[i])
+                    strategy.generate_position_value(signals.iloc[i:i + 1], signal_column='ypred',
+                                                     current_time=close_times[i])
+                    equity[i] = om.realized_pnl - om.fees + om.unrealized_pnl()
+        finally:
+            logging.getLogger().setLevel(previous_level)
+        replay_seconds = time.perf_counter() - start
+
+        return {
+            'bars': len(bars),
+            'realized_pnl': om.realized_pnl,
+            'fees': om.fees,
+            'net_pnl': equity[-1] if len(equity) else 0.0,
+            'max_drawdown': float(np.max(np.maximum.accumulate(equity) - equity)) if len(equity) else 0.0,
+            'fills': len(om.fills),
+            'orders_placed': om.orders_placed,
+            'orders_cancelled': om.orders_cancelled,
+            'notifications': len(self.notifier.messages),
+            'signal_seconds': signal_seconds,
+            'replay_seconds': replay_seconds,
+            'equity': pd.Series(equity, index=bars['close_time'].to_numpy()),
+        }
+
+
+def load_frame(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.pkl') or path.endswith('.pickle'):
+        return pd.read_pickle(path)
+    return pd.read_csv(path, parse_dates=['open_time', 'close_time'])
+
+
+def parse_replay_args():
+    parser = argparse.ArgumentParser(description='Replay recorded klines through the signal strategy.')
+    parser.add_argument('--klines', type=str, required=True, help='Recorded klines (csv, parquet or pickle)')
+    parser.add_argument('--signals', type=str, default=None,
+                        help="Precomputed signal frame with a 'ypred' column; skips feature generation")
+    parser.add_argument('--ticker', type=str, default='ETHUSD')
+    parser.add_argument('--model_path', type=str, default='./models/ETHUSDT_kaggle_features_transformed.joblib')
+    parser.add_argument('--features_path', type=str, default='./models/kaggle_features_transformed.joblib')
+    parser.add_argument('--quoteSymbolQuantity', type=float, default=0.01)
+    parser.add_argument('--trading_fee', type=float, default=0.0015)
+    parser.add_argument('--slippage', type=float, default=0.0)
+    parser.add_argument('--prob_threshold', type=float, default=0.5)
+    parser.add_argument('--smoothing_method', type=str, default='rolling')
+    parser.add_argument('--span', type=int, default=8)
+    parser.add_argument('--take_profit', type=float, default=0.0075)
+    parser.add_argument('--stop_loss', type=float, default=0.0075)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_replay_args()
+    setup_logging(debug=False)
+
+    klines = load_frame(args.klines)
+    signals = load_frame(args.signals) if args.signals else None
+    processor = None
+    if signals is None:
+        import data_processor
+        binance_ticker = BINANCE_TICKER_TO_BINANCE_TICKER[args.ticker]
+        processor = data_processor.CryptoDataProcessor(ticker=binance_ticker, existing_filename=f'{binance_ticker}_5m',
+                                                       db_path=f'./models/{binance_ticker}_prod_features.sqlite',
+                                                       offset=60)
+
+    engine = ReplayEngine({
+        'ticker': args.ticker,
+        'quote_symbol_quantity': args.quoteSymbolQuantity,
+        'trading_fee': args.trading_fee,
+        'prob_threshold': args.prob_threshold,
+        'smoothing_method': args.smoothing_method,
+        'span': args.span,
+        'stop_loss': args.stop_loss,
+        'take_profit': args.take_profit,
+        'model_path': args.model_path if signals is None else None,
+        'features_path': args.features_path,
+        'data_processor': processor,
+    }, slippage=args.slippage)
+    result = engine.run(klines, signals)
+    result.pop('equity')
+    for key, value in result.items():
+        print(f'{key}: {value}')
@@ -4,18 +4,39 @@ import sys
 here = os.path.dirname(__file__)
 sys.path.append(os.path.join(here, '../'))
 from datetime import datetime
-import binance_client
-import mining.utils as utils
-from mining.utils_config import DataConfig
 import pprint, logging
-import data_processor, argparse
+import argparse
 import time
-from feature_selection_tbl_single_backtest import *
-from order_manager_bluefin import BluefinOrderManager
-from datetime import datetime, timedelta
-from bluefin_v2_client import MARKET_SYMBOLS
+import numpy as np
+from lazy_imports import lazy_import
+from model_registry import ModelRegistry
+from order_reconciler import bracket_orders
+from strategy_runtime import AsyncStrategyRuntime
+from latency import metrics
+from tail_inference import TailPredictor, tail_rows_for
+from online_smoothing import OnlineSmoother
+from state_store import StrategyStateStore, same_position
 pp = pprint.PrettyPrinter(indent=4)
 
+# Heavy dependencies load on first use, so argument parsing and restarts stay fast (see bench_startup.py).
+binance_client = lazy_import('binance_client')
+data_processor = lazy_import('data_processor')
+DataConfig = lazy_import('mining.utils_config', 'DataConfig')
+MARKET_SYMBOLS = lazy_import('bluefin_v2_client', 'MARKET_SYMBOLS')
+BluefinOrderManager = lazy_import('order_manager_bluefin', 'BluefinOrderManager')
+InferenceWorker = lazy_import('inference_worker', 'InferenceWorker')
+apply_smoothing = lazy_import('feature_selection_tbl_single_backtest', 'apply_smoothing')
+get_predictions_for_lgb = lazy_import('feature_selection_tbl_single_backtest', 'get_predictions_for_lgb')
+process_feature_name_format = lazy_import('feature_selection_tbl_single_backtest', 'process_feature_name_format')
+encode_categorical_features = lazy_import('feature_selection_tbl_single_backtest', 'encode_categorical_features')
+# Strategy helpers that pull in pandas or requests.
+IncrementalFeatureEngine = lazy_import('feature_engine', 'IncrementalFeatureEngine')
+ColumnarFeatureStore = lazy_import('feature_store', 'ColumnarFeatureStore')
+load_or_build_plan = lazy_import('feature_plan', 'load_or_build_plan')
+KlineBuffer = lazy_import('kline_buffer', 'KlineBuffer')
+shared_price_feed = lazy_import('price_feed', 'shared_price_feed')
+shared_notifier = lazy_import('notifier', 'shared_notifier')
+
 BASE_URL = 'http://127.0.0.1:9000'
 LEVERAGE_INCREMENT = 0.3
 DRAWDOWN_THRESHOLD = -0.005
@@ -33,10 +54,34 @@ BINANCE_TICKER_TO_BINANCE_TICKER = {
     'ETHUSD': 'ETHUSDT',
     'BTCUSD': 'BTCUSDT'
 }
+# Names of the MARKET_SYMBOLS members; bluefin_symbol() resolves them without importing the SDK up front.
 TICKER_TO_BLUEFIN_TICKER = {
-    'ETHUSD': MARKET_SYMBOLS.ETH,
-    'BTCUSD': MARKET_SYMBOLS.BTC
+    'ETHUSD': 'ETH',
+    'BTCUSD': 'BTC'
+}
+# Incremental feature warm-up per column prefix for recursive/EWM indicators (see IncrementalFeatureEngine).
+# About 20 x span bars brings the EWM error below 1e-8 for spans up to 50.
+FEATURE_WARMUP = {
+    'EMA': 1000, 'DEMA': 1000, 'TEMA': 1000, 'KAMA': 1000, 'TRIX': 1000,
+    'MACD': 1000, 'PPO': 1000, 'APO': 1000, 'ADOSC': 1000,
+    'RSI': 1000, 'ATR': 1000, 'NATR': 1000, 'ADX': 1000, 'PLUS_DI': 1000, 'MINUS_DI': 1000,
 }
+# Running totals re-anchored on the cached value instead of recomputed from a window. Prefixes
+# match with startswith, so list accumulation/distribution by its exact column name (a bare 'AD'
+# would also match ADX and ADOSC).
+CUMULATIVE_FEATURES = ('OBV',)
+# Compare incremental features with a full recompute after the first update and then once a day of 5m bars.
+FEATURE_PARITY_CHECK_EVERY = 288
+# Strategy attributes persisted across restarts (see SignalStrategy.save_state).
+STRATEGY_STATE_FIELDS = (
+    'current_position', 'entry_time', 'stop_loss_price', 'take_profit_price',
+    'neutral_signal_count', 'reverse_signal_count', 'sent_neutral_signal_flag', 'sent_reverse_signal_flag',
+)
+
+
+def bluefin_symbol(ticker):
+    """Returns the Bluefin MARKET_SYMBOLS member for a ticker such as 'ETHUSD'."""
+    return getattr(MARKET_SYMBOLS, TICKER_TO_BLUEFIN_TICKER[ticker])
 
 
 def setup_logging(debug=False):
@@ -111,16 +156,56 @@ class SignalStrategy:
                  model_path,
                  features_path,
                  api_key='xxxx',
-                 data_processor=None):
+                 data_processor=None,
+                 price_feed=None,
+                 max_price_age=15.0,
+                 notifier=None,
+                 order_manager=None,
+                 kline_fetcher=None,
+                 forced_signal=None,
+                 tail_inference=False,
+                 tree_evaluator=False,
+                 feature_store=None,
+                 state_path=None,
+                 auth_cache=None,
+                 feature_plan=True,
+                 online_smoothing=False,
+                 inference_worker=None,
+                 feature_warmup=None,
+                 cumulative_columns=None,
+                 feature_parity_check_every=FEATURE_PARITY_CHECK_EVERY):
         self.ticker = ticker
         self.data_client = client_data
-        self.order_manager = BluefinOrderManager(private_key=api_key,
-                                                 symbol=TICKER_TO_BLUEFIN_TICKER[ticker],
-                                                 trading_fee=trading_fee,
-                                                 quantity=quote_symbol_quantity)
+        # Pass an order manager (e.g. from BluefinOrderManager.for_symbol) to share one client.
+        if order_manager is None:
+            order_manager = BluefinOrderManager(private_key=api_key,
+                                                symbol=bluefin_symbol(ticker),
+                                                trading_fee=trading_fee,
+                                                quantity=quote_symbol_quantity,
+                                                auth_cache=auth_cache)
+        self.order_manager = order_manager
         self.api_key = api_key
+        # Discord messages are queued and posted from a background thread.
+        self.notifier = notifier if notifier is not None else shared_notifier()
         self.data_processor = data_processor
+        # With an InferenceWorker, features and predictions are computed in its process instead.
+        self.inference_worker = inference_worker
+        # Pass a ColumnarFeatureStore (or its path) to persist features and restart without recomputing them.
+        if isinstance(feature_store, str) and inference_worker is None:
+            feature_store = ColumnarFeatureStore(feature_store)
+        # EWM-type families get a longer warm-up and running totals are re-anchored, so
+        # incremental features keep matching a full recompute.
+        self.feature_engine = IncrementalFeatureEngine(
+            data_processor, store=feature_store,
+            feature_warmup=FEATURE_WARMUP if feature_warmup is None else feature_warmup,
+            cumulative_columns=CUMULATIVE_FEATURES if cumulative_columns is None else cumulative_columns,
+            parity_check_every=feature_parity_check_every,
+        ) if data_processor is not None and inference_worker is None else None
         self.binance_data_ticker = BINANCE_TICKER_TO_BINANCE_TICKER[ticker]
+        self.kline_buffer = KlineBuffer(client_data, self.binance_data_ticker, fetcher=kline_fetcher)
+        # Last traded price for the position monitor; pass a StaticPriceFeed in tests.
+        self.price_feed = price_feed if price_feed is not None else shared_price_feed(
+            self.binance_data_ticker, max_age=max_price_age)
         self.current_position = 0
         self.entry_time = 0
         self.span = span
@@ -130,75 +215,115 @@ class SignalStrategy:
         self.prob_threshold = prob_threshold
         self.model_path = model_path
         self.features_path = features_path
+        # Model and feature list are loaded once and hot-reloaded when the files change.
+        self.model_registry = ModelRegistry(model_path, features_path) \
+            if model_path is not None and inference_worker is None else None
+        # Tail inference scores only the rows the smoothing window needs and reuses earlier probabilities.
+        self.tail_predictor = TailPredictor(tail_rows_for(span, smoothing_method),
+                                            use_tree_evaluator=tree_evaluator) if tail_inference else None
+        # Column plan and categorical codes frozen next to the model instead of refit every cycle.
+        self.use_feature_plan = feature_plan
+        self.feature_plan = None
+        self._feature_plan_model = None
+        # Online smoothing keeps rolling/EWM state across cycles instead of re-smoothing the whole history.
+        self.smoother = OnlineSmoother(span, smoothing_method) if online_smoothing else None
+        self._smoothed_model = None
         self.trading_fee = trading_fee
         self.quantity = quote_symbol_quantity
         self.current_signal = None
+        # When set, generate_position_value acts on this signal instead of df[signal_column].
+        self.forced_signal = forced_signal
         self.sent_neutral_signal_flag = False
         self.sent_reverse_signal_flag = False
         self.take_profit_price = np.nan
         self.stop_loss_price = np.nan
+        self.neutral_signal_count = 0
+        self.reverse_signal_count = 0
+        # Trailing-stop ratchet and signal counters survive a restart if the live position still matches.
+        self.state_store = StrategyStateStore(state_path) if state_path is not None else None
+        if self.state_store is not None:
+            self.restore_state()
 
     def main(self):
-        # 1) Initialize the very first next_5min boundary
-        now = datetime.now()
-        minute_rounded_down = now.replace(second=0, microsecond=0)
-        minute_offset = (5 - (minute_rounded_down.minute % 5)) % 5
-        # For the first cycle, pick the next boundary (plus 2s)
-        next_5min = minute_rounded_down + timedelta(minutes=minute_offset, seconds=2)
-
-        while True:
-            now = datetime.now()
-            time_left = (next_5min - now).total_seconds()
-
-            if time_left <= 0:
-                # It's time to run the 5-min signal
-                try:
-                    self.generate_signal()
-                    logging.info(f"Data fetched at: {datetime.now()}")
-                except Exception as e:
-                    logging.error(f"Ran into exception: {e}")
-
-                # 2) Advance `next_5min` by exactly 5 minutes
-                next_5min += timedelta(minutes=5)
+        """
+        Runs signal generation and position monitoring as concurrent tasks on the order
+        manager's event loop (see strategy_runtime.AsyncStrategyRuntime).
+        """
+        runtime = AsyncStrategyRuntime(self)
+        self.order_manager.loop.run_until_complete(runtime.run())
 
-            else:
-                # We haven't reached the 5-min boundary yet.
-                # Monitor position if it's a multiple of 10 seconds, or you can do it unconditionally
-                if now.second % 10 == 0:
-                    try:
-                        self.generate_position_value(df=None, signal_column=None, current_time=now)
-                    except Exception as e:
-                        logging.error(f"Ran into exception while monitoring position: {e}")
-
-                # Sleep until either 10 seconds pass or we reach next_5min, whichever is sooner
-                sleep_for = min(10, time_left)
-                time.sleep(sleep_for)
-
-    def generate_signal(self):
-        data = self.data_client.pull_binance_data(self.binance_data_ticker)
-        logging.info(f'Current shape of data is: {data.shape}')
-        # Compare last row's close_time to "now"
-        last_close_time = data.iloc[-1]['close_time']
-
-        # In many cases, Binance's klines are in UTC. Make sure 'now' is also UTC or that both are naive.
-        # If your times are all naive datetimes in Python and from Binance, you can just compare them directly.
-        # But if 'close_time' is in UTC, you might do: now_utc = pd.Timestamp.utcnow()
-
-        now_local = datetime.utcnow()  # or .utcnow() if everything is UTC
-        if last_close_time > now_local:
-            logging.info(f"Last bar is not fully closed yet because current_time is: {now_local} "
-                         f"and last close_time is :{last_close_time}; dropping the row.")
-            data = data.iloc[:-1]
-        else:
-            logging.info("Last bar is closed; keeping all rows.")
+    def generate_signal(self, act=True):
+        """
+        Computes the signal frame for the latest closed bar. If `act` is False the frame is
+        returned without calling generate_position_value, so the caller can act on it.
+        """
+        self.refresh_bars()
+        if self.inference_worker is not None:
+            df = self.inference_worker.run(self.kline_buffer)
+            if act:
+                self.generate_position_value(df, signal_column='ypred')
+            return df
+
+        data = self.kline_buffer.closed_frame()
+        logging.info(f'Current shape of data is: {data.shape}, fetched {self.kline_buffer.last_fetch_rows} row(s)')
+
+        return self.generate_tbl_signal(data, act=act)
+
+    def refresh_bars(self):
+        # Only bars after the last closed bar are fetched; the in-progress bar is excluded.
+        with metrics.span('pull_binance_data'):
+            self.kline_buffer.refresh()
 
-        self.generate_tbl_signal(data)
-        return
+    def generate_tbl_signal(self, data, act=True):
+        ypred_prob, df = self.predict_probabilities(data)
+        return self.process_predictions(ypred_prob, df, act=act)
 
-    def generate_tbl_signal(self, data):
-        df = self.data_processor.generate_features(data)
-        model = joblib.load(self.model_path)
-        features = joblib.load(self.features_path)
+    def predict_probabilities(self, data):
+        """
+        Computes features for `data` and returns the model's class probabilities together
+        with the feature frame rows they belong to: every row, or only the smoothing
+        window when tail inference is enabled.
+        """
+        with metrics.span('generate_features'):
+            df = self.feature_engine.update(data)
+        with metrics.span('model_load'):
+            model, features = self.model_registry.get()
+        if self.smoother is not None and model is not self._smoothed_model:
+            # Probabilities from another model version must not be mixed into the smoothing state.
+            self.smoother.reset()
+            self._smoothed_model = model
+
+        with metrics.span('prepare_features'):
+            if self.use_feature_plan:
+                plan = self.feature_plan_for(model, features, df)
+                # Codes are frozen, so only the rows tail inference scores need transforming.
+                rows = df.iloc[-self.tail_predictor.tail_rows:] if self.tail_predictor is not None else df
+                x_test_features = plan.transform(rows)
+            else:
+                x_test_features = self.fit_model_input(df, features)
+
+        if self.tail_predictor is not None:
+            keys = df[self.feature_engine.key].iloc[-len(x_test_features):].tolist()
+            with metrics.span('get_predictions_for_lgb'):
+                ypred_prob = self.tail_predictor.predict(model, x_test_features, keys, get_predictions_for_lgb)
+            logging.info(f'Tail inference stats: {self.tail_predictor.stats()}')
+            return ypred_prob, df.iloc[-len(ypred_prob):]
+
+        with metrics.span('get_predictions_for_lgb'):
+            ypred_prob, y_pred = self.model_registry.predict(get_predictions_for_lgb, x_test_features, model=model)
+        logging.info(f'Model stats: {self.model_registry.stats()}')
+        return ypred_prob, df
+
+    def feature_plan_for(self, model, features, df):
+        """Returns the feature plan for the current model, loading or building it after a (re)load."""
+        if self.feature_plan is None or self._feature_plan_model is not model:
+            self.feature_plan = load_or_build_plan(self.model_path, self.model_registry.model_digest, df, features,
+                                                   model=model)
+            self._feature_plan_model = model
+        return self.feature_plan
+
+    def fit_model_input(self, df, features):
+        """Re-derives the model columns and refits the categorical encoders on `df` (feature_plan=False)."""
         x_test = df[features]
 
         numeric_features = x_test[features].select_dtypes(include=['number']).columns.tolist()
@@ -208,14 +333,41 @@ class SignalStrategy:
         x_test_features, numeric_features, cat_features = process_feature_name_format(x_test_features, numeric_features,
                                                                                       cat_features)
         x_test_features, label_encoders = encode_categorical_features(x_test_features, cat_features)
+        return x_test_features
 
-        ypred_prob, y_pred = get_predictions_for_lgb(model, x_test_features)
-        self.process_predictions(ypred_prob, df)
-        return None, None
+    def signal_from_probabilities(self, probabilities):
+        """Maps smoothed (n, 3) probabilities to signals in {-1, 0, 1}."""
+        return np.where(
+            (probabilities[:, 0] >= self.prob_threshold) | (probabilities[:, 2] >= self.prob_threshold),
+            np.argmax(probabilities, axis=1),
+            1
+        ) - 1
 
-    def process_predictions(self, ypred_prob, x_test):
+    def process_predictions_online(self, ypred_prob, x_test, act=True):
+        """
+        Online counterpart of process_predictions: feeds the new rows into the smoother
+        and returns the last row of x_test with the latest smoothed probabilities and 'ypred'.
+        """
+        key = self.feature_engine.key if self.feature_engine is not None else 'close_time'
+        with metrics.span('apply_smoothing'):
+            self.smoother.update(x_test[key].tolist(), ypred_prob)
+        probabilities = self.smoother.value[None, :]
+        # Undefined until the rolling window has filled, like apply_smoothing; treat as neutral.
+        signal = 0 if np.isnan(probabilities).any() else int(self.signal_from_probabilities(probabilities)[0])
+        # Only the last row is copied, not the whole window.
+        signal_frame = x_test.iloc[-1:].assign(
+            **{f'prob_class_{i}_mean': probabilities[0, i] for i in range(3)}, ypred=signal)
+
+        if act:
+            self.generate_position_value(signal_frame, signal_column='ypred')
+        return signal_frame
+
+    def process_predictions(self, ypred_prob, x_test, act=True):
+        if self.smoother is not None:
+            return self.process_predictions_online(ypred_prob, x_test, act=act)
         ytest_pred_prob_temp = ypred_prob.copy()
-        x_test_temp = apply_smoothing(x_test.copy(), ytest_pred_prob_temp, self.span, self.smoothing_method)
+        with metrics.span('apply_smoothing'):
+            x_test_temp = apply_smoothing(x_test.copy(), ytest_pred_prob_temp, self.span, self.smoothing_method)
 
         probabilities = x_test_temp[[f'prob_class_{i}_mean' for i in range(3)]].values
 
@@ -228,30 +380,31 @@ class SignalStrategy:
 
         x_test_temp['ypred'] = x_test_temp['ypred'].map({0: -1, 1: 0, 2: 1})
 
-        self.generate_position_value(x_test_temp, signal_column='ypred')
-        return
+        if act:
+            self.generate_position_value(x_test_temp, signal_column='ypred')
+        return x_test_temp
 
     def generate_position_value(self, df=None, signal_column=None, neutral_tolerance=3, current_time=None,
                                 reverse_tolerance=0):
         # Ensure df and signal_column are not None
-        # if df is not None and signal_column is not None and signal_column in df.columns:
-        #     current_signal = df[signal_column].iloc[-1]
-        current_signal = -1
+        if self.forced_signal is not None:
+            current_signal = self.forced_signal
+        elif df is not None and signal_column is not None and signal_column in df.columns:
+            current_signal = df[signal_column].iloc[-1]
+        else:
+            current_signal = None
         self.current_signal = current_signal
-        # else:
-        #     current_signal = None
 
-        data = self.data_client.pull_binance_data(self.binance_data_ticker)
-        current_price = data['close'].iloc[-1]
+        current_price = self.price_feed.get_price()
 
         if current_signal is not None:
             message = f'Current signal is: {current_signal} at price: {current_price}'
             logging.info(message)
             if current_signal != 0:
-                utils.send_discord_message(DataConfig.discord_logs_webhook, message)
+                self.notifier.send(DataConfig.discord_logs_webhook, message)
 
-        # Fetch updated positions from the client
-        current_positions = self.order_manager.fetch_current_positions()
+        # Fetch one fresh snapshot per tick; later reads in this tick reuse it until one of our orders fills.
+        current_positions = self.order_manager.fetch_current_positions(max_age=0)
         # if len(current_positions) > 0:
         position_info = check_position(current_positions)
         # else:
@@ -260,15 +413,19 @@ class SignalStrategy:
         # Debug logging - only shown in debug mode
         logging.debug(f'Current positions: {current_positions}')
         logging.debug(f'Position info: {position_info}')
+        logging.debug(f'Position cache: {self.order_manager.position_cache_stats()}')
 
         # Get current position and notional value from real-time data
         real_time_position = position_info['position']  # 'long', 'short', or 'none'
         real_time_entry_price = position_info['entry_price']
         position_amount = position_info['positionAmt']
         pprint.pprint(position_info)
-        if current_time is not None and current_time.second % 30 == 0:
+        # Every 30 seconds make sure the resting orders match what the position needs.
+        reconcile_tick = current_time is not None and current_time.second % 30 == 0
+        if reconcile_tick:
             logging.info(f'Monitoring positions: current price is: {current_price}')
-            self.order_manager.cancel_all_orders()
+            if real_time_position == 'none':
+                self.order_manager.cancel_all_orders()
 
         # Initialize neutral signal count tracking variable if it doesn't exist
         if not hasattr(self, 'neutral_signal_count'):
@@ -292,7 +449,7 @@ class SignalStrategy:
             self.sent_reverse_signal_flag = False
 
             message = f'Opened new position with signal: {current_signal} at price: {current_price} <@176806410066067456>'
-            utils.send_discord_message(DataConfig.discord_webhook, content=message)
+            self.notifier.send(DataConfig.discord_webhook, message)
 
             # Use the place order function to open a position
             order = self.order_manager.open_position_at_market(signal=current_signal, quantity=self.quantity)
@@ -301,7 +458,7 @@ class SignalStrategy:
                 current_positions = check_position(self.order_manager.fetch_current_positions())
                 avg_fill_price = float(current_positions['entry_price'])
                 message = f'Last order (open) average fill price: {avg_fill_price}, Current price: {current_price} <@176806410066067456>'
-                utils.send_discord_message(DataConfig.discord_webhook, content=message)
+                self.notifier.send(DataConfig.discord_webhook, message)
                 logging.info(message)
 
                 self.order_manager.cancel_all_orders()
@@ -314,16 +471,17 @@ class SignalStrategy:
                             1 - self.take_profit)
                 self.stop_loss_price = round(stop_loss_price, 1)
                 self.take_profit_price = round(take_profit_price, 1)
-                self.order_manager.place_stop_loss_order(self.stop_loss_price, real_time_position, quantity=self.quantity)
-                self.order_manager.place_take_profit_order(self.take_profit_price, real_time_position, quantity=self.quantity)
+                self.place_bracket(real_time_position, self.quantity)
 
                 # self.submit_trailing_stop(real_time_entry_price, real_time_position, self.stop_loss, self.quantity)
 
         elif real_time_position != 'none':
             # Active position, monitor the price for favorable movement before placing a trailing stop
             price_change = (current_price - real_time_entry_price) / real_time_entry_price
-            if current_signal is not None:
-                self.update_existing_order_price(current_price, position_info)
+            # Monitor ticks have no signal but still trail the stop and, every 30 seconds,
+            # put missing legs back once a bracket has been placed.
+            if current_signal is not None or not np.isnan(self.stop_loss_price):
+                self.update_existing_order_price(current_price, position_info, force_reconcile=reconcile_tick)
 
             if (real_time_position == 'long' and current_signal == -1) or (
                     real_time_position == 'short' and current_signal == 1):
@@ -347,7 +505,7 @@ class SignalStrategy:
                             logging.info('signal 0 and covering trading fees')
                 elif not self.sent_neutral_signal_flag:
                     message = 'Signal became neutral, but count did not exceed tolerance <@176806410066067456>'
-                    utils.send_discord_message(DataConfig.discord_logs_webhook, message)
+                    self.notifier.send(DataConfig.discord_logs_webhook, message)
                     logging.info(
                         f'Signal became neutral, but count did not exceed tolerance, current neutral_signal_count: {self.neutral_signal_count}')
                     self.sent_neutral_signal_flag = True
@@ -358,13 +516,53 @@ class SignalStrategy:
                 self.sent_neutral_signal_flag = False
                 self.sent_reverse_signal_flag = False
 
-    def update_existing_order_price(self, current_price, position_info):
+        self.save_state()
+
+    def snapshot_state(self, position_info) -> dict:
+        """Returns the persisted strategy fields plus the position they belong to, as plain JSON types."""
+        state = {field: getattr(self, field, None) for field in STRATEGY_STATE_FIELDS}
+        state['position_info'] = dict(position_info)
+        return {key: value.item() if isinstance(value, np.generic) else value for key, value in state.items()}
+
+    def save_state(self):
+        if self.state_store is None:
+            return
+        try:
+            # Reuses this tick's position snapshot unless one of our orders filled since.
+            position_info = check_position(self.order_manager.fetch_current_positions())
+            self.state_store.save(self.snapshot_state(position_info))
+        except Exception as e:
+            logging.warning(f'Failed to save strategy state: {e}')
+
+    def restore_state(self):
+        """
+        Restores the saved stop loss/take profit ratchet and signal counters if they were
+        saved for the position that is open now, so a restart does not re-place orders.
+        """
+        state, saved_at = self.state_store.load()
+        if state is None:
+            return False
+        live = check_position(self.order_manager.fetch_current_positions(max_age=0))
+        if not same_position(state.get('position_info'), live):
+            logging.info(f"Saved state was for {state.get('position_info')}, live position is {live}; starting fresh")
+            return False
+        for field in STRATEGY_STATE_FIELDS:
+            if field in state:
+                value = state[field]
+                # update_existing_order_price checks `is np.nan`, so restore the singleton.
+                setattr(self, field, np.nan if isinstance(value, float) and np.isnan(value) else value)
+        logging.info(f'Restored strategy state saved {time.time() - (saved_at or time.time()):.0f}s ago: '
+                     f'stop loss {self.stop_loss_price}, take profit {self.take_profit_price}')
+        return True
+
+    def update_existing_order_price(self, current_price, position_info, force_reconcile=False):
         """
         Update stop loss and take profit prices only if they change, and log changes to Discord and logs.
 
         Args:
             current_price (float): The current market price of the asset.
-            real_time_position (str): The current position ('long' or 'short').
+            position_info (dict): The current position as returned by check_position.
+            force_reconcile (bool): Reconcile resting orders even if the prices did not change.
         """
         # Store the old prices for comparison
         real_time_position = position_info['position']  # 'long', 'short', or 'none'
@@ -388,7 +586,7 @@ class SignalStrategy:
             new_take_profit_price = min(self.take_profit_price, round(current_price * (1 - self.take_profit), 1))
         else:
             message = f"Invalid position detected: {real_time_position}. Must be 'long' or 'short'."
-            utils.send_discord_message(DataConfig.discord_logs_webhook, message)
+            self.notifier.send(DataConfig.discord_logs_webhook, message)
             logging.error(message)
             raise ValueError(message)
 
@@ -399,30 +597,55 @@ class SignalStrategy:
                 f"Prices updated for {real_time_position}: "
                 f"Stop Loss: {old_stop_loss_price} -> {new_stop_loss_price}, "
                 f"Take Profit: {old_take_profit_price} -> {new_take_profit_price}. "
-                f"Canceling existing open orders and placing new ones."
+                f"Reconciling open orders."
             )
-            utils.send_discord_message(DataConfig.discord_logs_webhook, message)
+            self.notifier.send(DataConfig.discord_logs_webhook, message)
             logging.info(message)
 
             # Update the prices
             self.stop_loss_price = new_stop_loss_price
             self.take_profit_price = new_take_profit_price
 
-            # Cancel open orders and place new ones
-            self.order_manager.cancel_all_orders()
-            self.order_manager.place_stop_loss_order(self.stop_loss_price, real_time_position, quantity=position_amount)
-            self.order_manager.place_take_profit_order(self.take_profit_price, real_time_position, quantity=position_amount)
-            orders = self.order_manager.get_order_sync()
-            logging.info(f'Current length of order after placing TP/SL order is: {len(orders)}')
-            pprint.pprint(orders)
+            # Only replace the legs whose price or size changed.
+            result = self.reconcile_bracket(real_time_position, position_amount)
+            logging.info(f'Reconciled TP/SL orders: {result}')
         else:
             # Log that no updates were made
             message = (
                 f"No changes to stop loss or take profit prices for {real_time_position}. "
                 f"Existing orders remain unchanged. Stop Loss: {self.stop_loss_price}, Take Profit: {self.take_profit_price}. "
             )
-            utils.send_discord_message(DataConfig.discord_logs_webhook, message)
+            self.notifier.send(DataConfig.discord_logs_webhook, message)
             logging.info(message)
+            if force_reconcile:
+                self.reconcile_bracket(real_time_position, position_amount)
+
+    def reconcile_bracket(self, real_time_position, quantity):
+        """
+        Makes the resting stop loss and take profit match the current prices, only
+        cancelling and placing the orders that differ, and reports any leg that failed.
+        """
+        desired = bracket_orders(real_time_position, self.stop_loss_price, self.take_profit_price, quantity)
+        result = self.order_manager.reconcile_orders(desired)
+        if result and result.get('failed'):
+            message = (f"Failed to replace bracket leg(s) {result['failed']} for {real_time_position} position, "
+                       f"kept the previous order(s) {result.get('kept_stale', [])} <@176806410066067456>")
+            self.notifier.send(DataConfig.discord_logs_webhook, message)
+            logging.error(message)
+        return result
+
+    def place_bracket(self, real_time_position, quantity):
+        """
+        Places the stop loss and take profit at the current prices in one concurrent call
+        and reports any leg that failed.
+        """
+        bracket = self.order_manager.place_bracket_orders(self.stop_loss_price, self.take_profit_price,
+                                                          real_time_position, quantity=quantity)
+        if bracket['failed']:
+            message = f"Failed to place bracket leg(s) {bracket['failed']} for {real_time_position} position <@176806410066067456>"
+            self.notifier.send(DataConfig.discord_logs_webhook, message)
+            logging.error(message)
+        return bracket
 
     def flip_position(self, current_signal, current_price):
         """
@@ -435,7 +658,7 @@ class SignalStrategy:
 
         message = f'Signal flipped. Closed previous position and opened new one with signal: {current_signal} at price: {current_price} <@176806410066067456>'
         logging.info(message)
-        utils.send_discord_message(DataConfig.discord_webhook, content=message)
+        self.notifier.send(DataConfig.discord_webhook, message)
 
         # Open a new position with the flipped signal
         # if current_signal == 1:
@@ -446,7 +669,7 @@ class SignalStrategy:
             current_positions = check_position(self.order_manager.fetch_current_positions())
             avg_fill_price = float(current_positions['entry_price'])
             message = f'Last order (open) average fill price: {avg_fill_price}, Current price: {current_price} <@176806410066067456>'
-            utils.send_discord_message(DataConfig.discord_webhook, content=message)
+            self.notifier.send(DataConfig.discord_webhook, message)
             logging.info(message)
 
             real_time_position = 'short' if current_signal == -1 else 'long'
@@ -459,9 +682,7 @@ class SignalStrategy:
             self.stop_loss_price = round(stop_loss_price, 1)
             self.take_profit_price = round(take_profit_price, 1)
             self.order_manager.cancel_all_orders()
-            self.order_manager.place_stop_loss_order(self.stop_loss_price, real_time_position, quantity=self.quantity)
-            self.order_manager.place_take_profit_order(self.take_profit_price, real_time_position,
-                                                       quantity=self.quantity)
+            self.place_bracket(real_time_position, self.quantity)
 
 
 def parse_strategy_args():
@@ -497,6 +718,61 @@ def parse_strategy_args():
         default=0.0075,
         help='Stop loss percentage (default: 0.0075)'
     )
+    parser.add_argument(
+        '--tail_inference',
+        action='store_true',
+        help='Only score the rows the smoothing window needs, reusing earlier probabilities'
+    )
+    parser.add_argument(
+        '--tree_evaluator',
+        action='store_true',
+        help='With --tail_inference, score rows with the NumPy tree evaluator instead of LightGBM'
+    )
+    parser.add_argument(
+        '--feature_store',
+        type=str,
+        default=None,
+        help='Directory of the columnar feature store to persist features in and warm-start from'
+    )
+    parser.add_argument(
+        '--state_file',
+        type=str,
+        default=None,
+        help='Persist the trailing-stop state here and restore it on restart if the position matches'
+    )
+    parser.add_argument(
+        '--auth_cache',
+        type=str,
+        default=None,
+        help='Cache the Bluefin auth token in this file to skip onboarding on restart'
+    )
+    parser.add_argument(
+        '--refit_encoders',
+        action='store_true',
+        help='Refit the categorical encoders every cycle instead of using the feature plan saved next to the model'
+    )
+    parser.add_argument(
+        '--online_smoothing',
+        action='store_true',
+        help='Keep rolling/EWM smoothing state across cycles instead of re-smoothing all history'
+    )
+    parser.add_argument(
+        '--inference_worker',
+        action='store_true',
+        help='Compute features and predictions in a separate worker process'
+    )
+    parser.add_argument(
+        '--metrics_file',
+        type=str,
+        default=None,
+        help='Write per-stage latency percentiles to this JSON file every minute'
+    )
+    parser.add_argument(
+        '--metrics_port',
+        type=int,
+        default=None,
+        help='Serve per-stage latency percentiles as JSON on this local port'
+    )
 
     return parser.parse_args()
 
@@ -505,6 +781,10 @@ if __name__ == '__main__':
     args = parse_strategy_args()
 
     setup_logging(debug=False)
+    if args.metrics_file:
+        metrics.start_exporter(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
 
     ticker = 'ETHUSD'
     minutes = 5
@@ -515,13 +795,10 @@ if __name__ == '__main__':
     model_path = './models/ETHUSDT_kaggle_features_transformed.joblib'
     features_path = './models/kaggle_features_transformed.joblib'
 
-    feature_processor = data_processor.CryptoDataProcessor(ticker=binance_ticker, existing_filename=datafile,
-                                                           db_path='./models/ETHUSDT_prod_features.sqlite', offset=60)
-    binance_client = binance_client.BinanceClient(time_interval=minutes, symbol=binance_ticker)
-    strategy = SignalStrategy(
+    processor_kwargs = dict(ticker=binance_ticker, existing_filename=datafile,
+                            db_path='./models/ETHUSDT_prod_features.sqlite', offset=60)
+    strategy_kwargs = dict(
         ticker=ticker,
-        client_data=binance_client,
-        data_processor=feature_processor,
         prob_threshold=0.5,
         smoothing_method='rolling',
         span=8,
@@ -530,8 +807,30 @@ if __name__ == '__main__':
         quote_symbol_quantity=args.quoteSymbolQuantity,
         trading_fee=0.0015,
         model_path=model_path,
+        features_path=features_path,
+        tail_inference=args.tail_inference,
+        tree_evaluator=args.tree_evaluator,
+        feature_store=args.feature_store,
+        feature_plan=not args.refit_encoders,
+        online_smoothing=args.online_smoothing,
+    )
+    if args.inference_worker:
+        worker = InferenceWorker(strategy_kwargs, processor_kwargs).start()
+        feature_processor = None
+    else:
+        worker = None
+        feature_processor = data_processor.CryptoDataProcessor(**processor_kwargs)
+    binance_client = binance_client.BinanceClient(time_interval=minutes, symbol=binance_ticker)
+    strategy = SignalStrategy(
+        client_data=binance_client,
+        data_processor=feature_processor,
         api_key=args.privateKey,
-        features_path=features_path
+        state_path=args.state_file,
+        auth_cache=args.auth_cache,
+        inference_worker=worker,
+        # The manual single-tick run below has no signal frame, so it acts on a fixed short.
+        forced_signal=-1,
+        **strategy_kwargs,
     )
     # strategy.main()
     strategy.generate_position_value(df=None, signal_column=None)
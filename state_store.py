@@ -0,0 +1,107 @@
+"""
+Small persisted state for fast, churn-free restarts.
+
+StrategyStateStore keeps the strategy's trailing-stop ratchet and signal counters next to
+the position they belong to; on boot the caller only restores them if the live position
+still matches. AuthTokenCache keeps the Bluefin auth token so a restart can skip the
+onboarding signature round trip while the token is fresh.
+
+Both write JSON atomically (temp file + os.replace), so a crash mid-write never leaves a
+half-written file behind.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+
+
+def _write_json(path, payload, mode=0o644):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = path + '.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f'Ignoring unreadable state file {path}: {e}')
+        return None
+
+
+class StrategyStateStore:
+    """
+    Persists a flat dict of strategy state. save() skips the write when nothing changed,
+    so it can be called on every tick.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._last_saved = None
+        self.saves = 0
+
+    def save(self, state: dict) -> bool:
+        if state == self._last_saved:
+            return False
+        _write_json(self.path, {'saved_at': time.time(), 'state': state})
+        self._last_saved = dict(state)
+        self.saves += 1
+        return True
+
+    def load(self):
+        """Returns (state, saved_at) or (None, None) when there is no usable snapshot."""
+        payload = _read_json(self.path)
+        if not payload or 'state' not in payload:
+            return None, None
+        self._last_saved = dict(payload['state'])
+        return payload['state'], payload.get('saved_at')
+
+
+def same_position(saved: dict, live: dict, rel_tol=1e-6) -> bool:
+    """True if two check_position() results describe the same open position."""
+    if not saved or not live or live['position'] == 'none' or saved.get('position') != live['position']:
+        return False
+    return (math.isclose(abs(float(saved.get('positionAmt', 0))), abs(float(live['positionAmt'])), rel_tol=rel_tol)
+            and math.isclose(float(saved.get('entry_price', 0)), float(live['entry_price']), rel_tol=rel_tol))
+
+
+class AuthTokenCache:
+    """
+    Caches one auth token per (account, network). The account is identified by a hash of
+    the private key, never the key itself, and the file is created readable by the owner
+    only.
+    """
+
+    def __init__(self, path, ttl=6 * 3600):
+        self.path = path
+        self.ttl = ttl
+
+    @staticmethod
+    def _account(private_key, network):
+        return hashlib.sha256(f'{private_key}|{network}'.encode()).hexdigest()[:32]
+
+    def get(self, private_key, network):
+        payload = _read_json(self.path) or {}
+        entry = payload.get(self._account(private_key, network))
+        if not entry or time.time() - entry.get('created', 0) > self.ttl:
+            return None
+        return entry.get('token')
+
+    def put(self, private_key, network, token):
+        payload = _read_json(self.path) or {}
+        payload[self._account(private_key, network)] = {'token': token, 'created': time.time()}
+        _write_json(self.path, payload, mode=0o600)
+
+    def invalidate(self, private_key, network):
+        payload = _read_json(self.path) or {}
+        if payload.pop(self._account(private_key, network), None) is not None:
+            _write_json(self.path, payload, mode=0o600)
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from latency import metrics
+
+
+def next_boundary(now: float, period: float, offset: float = 0.0) -> float:
+    """Returns the first wall-clock time after `now` that is `offset` seconds past a multiple of `period`."""
+    boundary = (now - offset) // period * period + offset
+    return boundary + period if boundary <= now else boundary
+
+
+class AsyncStrategyRuntime:
+    """
+    Asyncio runtime for one or more SignalStrategy instances.
+
+    Signal generation (every `signal_period` seconds, `signal_offset` after the bar
+    close) and position monitoring (every `monitor_period` seconds) run as independent
+    tasks on the order manager's event loop, which also drives the Bluefin client and
+    the order tracker. The strategy's synchronous code runs in worker threads; its
+    order manager calls are submitted back onto the loop, so a slow feature computation
+    never blocks monitoring or exchange I/O. Strategies with an InferenceWorker compute
+    features and predictions in its process, so they do not hold this process's GIL.
+
+    All strategies must share one order manager event loop (see
+    BluefinOrderManager.for_symbol). Each strategy gets its own signal task and monitor
+    task with their own deadlines, so its signals are computed in the same bar-close
+    window as the others', but a strategy that holds its decision lock (e.g. waiting up
+    to 30s for a fill) never delays another strategy's stop and trailing checks.
+    Decisions that touch a strategy's positions and orders (acting on a new signal, a
+    monitor tick) are serialized through a per-strategy lock so they never interleave.
+    Ticks are scheduled on absolute deadlines: a tick that overruns skips forward to the
+    next boundary instead of drifting, and no boundary is missed because of sleep jitter.
+    """
+
+    def __init__(self, strategies, signal_period=300, signal_offset=2, monitor_period=10, workers=None):
+        self.strategies = list(strategies) if isinstance(strategies, (list, tuple)) else [strategies]
+        self.signal_period = signal_period
+        self.signal_offset = signal_offset
+        self.monitor_period = monitor_period
+        if workers is None:
+            workers = 2 * len(self.strategies)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='strategy')
+        self.decision_locks = {}
+        self.missed_monitor_ticks = 0
+        self._tasks = []
+
+    async def _in_thread(self, fn, *args, cycle=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        if cycle is None:
+            return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+        return await loop.run_in_executor(self.executor, lambda: metrics.run_in_cycle(cycle, fn, *args, **kwargs))
+
+    async def _sleep_until(self, deadline: float):
+        delay = deadline - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _signal_cycle(self, strategy):
+        cycle = metrics.new_cycle(f'{strategy.ticker} signal')
+        # Spans recorded by coroutines awaited here (e.g. the inference worker) land in the cycle too.
+        with metrics.in_cycle(cycle):
+            await self._run_signal_cycle(strategy, cycle)
+
+    async def _run_signal_cycle(self, strategy, cycle):
+        try:
+            # Features and predictions run outside the lock so monitoring keeps going.
+            worker = getattr(strategy, 'inference_worker', None)
+            if worker is not None:
+                # Only the kline fetch runs here; the CPU-bound part runs in the worker process.
+                await self._in_thread(strategy.refresh_bars, cycle=cycle)
+                # A signal later than the next bar is useless; past that the worker is restarted.
+                df = await worker.compute(strategy.kline_buffer, cycle=cycle, timeout=self.signal_period)
+            else:
+                df = await self._in_thread(strategy.generate_signal, act=False, cycle=cycle)
+            async with self.decision_locks[strategy]:
+                await self._in_thread(strategy.generate_position_value, df, signal_column='ypred', cycle=cycle)
+            logging.info(f"Data fetched at: {datetime.now()} for {strategy.ticker}")
+        except Exception as e:
+            logging.error(f"Ran into exception for {strategy.ticker}: {e}")
+        finally:
+            metrics.finish_cycle(cycle)
+
+    async def _monitor_tick(self, strategy, current_time):
+        cycle = metrics.new_cycle('monitor')
+        try:
+            async with self.decision_locks[strategy]:
+                await self._in_thread(strategy.generate_position_value, df=None, signal_column=None,
+                                      current_time=current_time, cycle=cycle)
+        except Exception as e:
+            logging.error(f"Ran into exception while monitoring position for {strategy.ticker}: {e}")
+        finally:
+            metrics.finish_cycle(cycle, log=False)
+
+    async def signal_loop(self, strategy):
+        deadline = next_boundary(time.time(), self.signal_period, self.signal_offset)
+        while True:
+            await self._sleep_until(deadline)
+            await self._signal_cycle(strategy)
+            deadline = next_boundary(max(deadline, time.time()), self.signal_period, self.signal_offset)
+
+    async def monitor_loop(self, strategy):
+        deadline = next_boundary(time.time(), self.monitor_period)
+        while True:
+            await self._sleep_until(deadline)
+            # How late the tick starts; it should stay flat while signals are computed.
+            metrics.record('monitor_lag', max(0.0, time.time() - deadline))
+            await self._monitor_tick(strategy, datetime.fromtimestamp(deadline))
+
+            next_deadline = next_boundary(time.time(), self.monitor_period)
+            skipped = int(round((next_deadline - deadline) / self.monitor_period)) - 1
+            if skipped > 0:
+                self.missed_monitor_ticks += skipped
+                logging.warning(f'Position monitor for {strategy.ticker} overran by {skipped} tick(s)')
+            deadline = next_deadline
+
+    async def run(self):
+        self.decision_locks = {strategy: asyncio.Lock() for strategy in self.strategies}
+
+        # Open the order-update socket once per client and fan updates out to every symbol.
+        trackers_by_client = {}
+        for strategy in self.strategies:
+            tracker = strategy.order_manager.order_tracker
+            if tracker is not None:
+                trackers_by_client.setdefault(id(tracker.client), []).append(tracker)
+        for trackers in trackers_by_client.values():
+            await trackers[0].subscribe(peers=trackers[1:])
+
+        self._tasks = []
+        for strategy in self.strategies:
+            self._tasks.append(asyncio.create_task(self.signal_loop(strategy), name=f'signal-{strategy.ticker}'))
+            self._tasks.append(asyncio.create_task(self.monitor_loop(strategy), name=f'monitor-{strategy.ticker}'))
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            self.executor.shutdown(wait=False)
+            for strategy in self.strategies:
+                worker = getattr(strategy, 'inference_worker', None)
+                if worker is not None:
+                    worker.close()
@@ -0,0 +1,278 @@
+"""
+Tail-window inference for the live signal.
+
+Only the last rows of the probability series reach the smoothed signal the strategy acts
+on, so TailPredictor scores just the rows of that window it has not seen yet (normally
+the one bar that closed since the last cycle) and reuses the probabilities it computed
+for the others. Per-cycle predict cost is O(new rows) and smoothing cost is O(window)
+instead of O(history).
+
+NumpyTreeEnsemble is an optional evaluator compiled from a LightGBM multiclass model
+dump. It walks every tree at once with NumPy gathers, which avoids LightGBM's per-call
+overhead when scoring one or two rows. TailPredictor checks it against the model on the
+first rows it scores and falls back to the model if they disagree.
+"""
+import logging
+import time
+
+import numpy as np
+
+# (1 - 2 / (span + 1)) ** (EWM_TAIL_FACTOR * span) is below e**-7 for any span >= 1, so
+# older rows no longer move the smoothed value in a way the threshold can see.
+EWM_TAIL_FACTOR = 4
+
+
+def tail_rows_for(span, smoothing_method):
+    """Number of trailing probability rows the smoothed value of the last row depends on."""
+    if smoothing_method == 'rolling':
+        return int(span)
+    return int(EWM_TAIL_FACTOR * span)
+
+
+class NumpyTreeEnsemble:
+    """
+    NumPy-only evaluator for a LightGBM multiclass (softmax) model.
+
+    Every tree is flattened into shared node arrays; internal nodes have non-negative
+    ids and leaves are stored as ~leaf_index. predict_proba advances one node per tree
+    per step for all rows at once, so a call costs max_depth vectorized steps. Numeric
+    splits follow LightGBM's missing-value rules (missing_type None/Zero/NaN and
+    default_left); categorical splits send the listed categories left.
+
+    Pandas category columns are coded against the model's training categories
+    (pandas_categorical in the dump), like LightGBM does, not by the live frame's own
+    category order. Input that went through a FeaturePlan is already coded.
+    """
+
+    def __init__(self, dump):
+        if dump.get('objective', '').split(' ')[0] != 'multiclass':
+            raise ValueError(f"Unsupported objective for the tree evaluator: {dump.get('objective')}")
+        self.num_class = dump['num_class']
+        self.feature_names = list(dump['feature_names'])
+        self.pandas_categorical = dump.get('pandas_categorical')
+
+        split_feature, threshold, left, right = [], [], [], []
+        default_left, missing_type, cat_index = [], [], []
+        categories = []
+        leaf_value = []
+        roots, tree_class = [], []
+
+        def add(node):
+            if 'leaf_value' in node:
+                leaf_value.append(node['leaf_value'])
+                return ~(len(leaf_value) - 1)
+            idx = len(split_feature)
+            split_feature.append(node['split_feature'])
+            default_left.append(bool(node.get('default_left', False)))
+            missing_type.append({'None': 0, 'Zero': 1, 'NaN': 2}[node.get('missing_type', 'None')])
+            if node['decision_type'] == '==':
+                cats = [int(c) for c in str(node['threshold']).split('||')]
+                cat_index.append(len(categories))
+                categories.append(cats)
+                threshold.append(np.nan)
+            elif node['decision_type'] == '<=':
+                cat_index.append(-1)
+                threshold.append(float(node['threshold']))
+            else:
+                raise ValueError(f"Unsupported decision type: {node['decision_type']}")
+            left.append(0)
+            right.append(0)
+            left[idx] = add(node['left_child'])
+            right[idx] = add(node['right_child'])
+            return idx
+
+        for i, tree in enumerate(dump['tree_info']):
+            roots.append(add(tree['tree_structure']))
+            tree_class.append(i % self.num_class)
+
+        self.split_feature = np.array(split_feature, dtype=np.int64)
+        self.threshold = np.array(threshold, dtype=np.float64)
+        self.left = np.array(left, dtype=np.int64)
+        self.right = np.array(right, dtype=np.int64)
+        self.default_left = np.array(default_left, dtype=bool)
+        self.missing_type = np.array(missing_type, dtype=np.int8)
+        self.cat_index = np.array(cat_index, dtype=np.int64)
+        max_cat = max((max(c) for c in categories if c), default=0)
+        self.cat_table = np.zeros((max(len(categories), 1), max_cat + 1), dtype=bool)
+        for i, cats in enumerate(categories):
+            self.cat_table[i, [c for c in cats if c >= 0]] = True
+        self.leaf_value = np.array(leaf_value, dtype=np.float64)
+        self.roots = np.array(roots, dtype=np.int64)
+        self.tree_class = np.array(tree_class, dtype=np.int64)
+
+    @classmethod
+    def from_model(cls, model):
+        """Compiles a lightgbm.Booster or LGBMClassifier."""
+        booster = getattr(model, 'booster_', model)
+        return cls(booster.dump_model())
+
+    def _categorical_codes(self, x):
+        """Category column -> float codes under the training categories; unknown values are NaN."""
+        cat_columns = [name for name in x.columns if str(x[name].dtype) == 'category']
+        if not cat_columns:
+            return {}
+        categories = self.pandas_categorical
+        if categories is None:
+            # Trained without category columns: LightGBM then codes by the frame's own categories.
+            categories = [list(x[name].cat.categories) for name in cat_columns]
+        elif len(categories) != len(cat_columns):
+            raise ValueError(f'Model was trained with {len(categories)} category columns, got {len(cat_columns)}')
+        codes = {}
+        for name, values in zip(cat_columns, categories):
+            col = x[name]
+            if list(col.cat.categories) != list(values):
+                col = col.cat.set_categories(values)
+            code = col.cat.codes.to_numpy(np.float64)
+            code[code < 0] = np.nan
+            codes[name] = code
+        return codes
+
+    def _matrix(self, x):
+        if hasattr(x, 'columns'):
+            codes = self._categorical_codes(x)
+            columns = [codes[name] if name in codes else x[name].to_numpy(np.float64) for name in self.feature_names]
+            return np.column_stack(columns) if columns else np.empty((len(x), 0))
+        return np.asarray(x, dtype=np.float64)
+
+    def raw_scores(self, x):
+        x = self._matrix(x)
+        n_rows = len(x)
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        rows = np.arange(n_rows)[:, None]
+        while True:
+            internal = node >= 0
+            if not internal.any():
+                break
+            idx = np.where(internal, node, 0)
+            value = x[rows, self.split_feature[idx]]
+
+            nan = np.isnan(value)
+            mtype = self.missing_type[idx]
+            missing = ((mtype == 2) & nan) | ((mtype == 1) & (nan | (value == 0)))
+            value = np.where(nan & (mtype != 2), 0.0, value)
+            numeric_left = value <= self.threshold[idx]
+
+            cat = self.cat_index[idx]
+            is_cat = cat >= 0
+            code = np.where(nan | (value < 0), -1, value).astype(np.int64)
+            in_table = (code >= 0) & (code < self.cat_table.shape[1])
+            cat_left = in_table & self.cat_table[np.where(is_cat, cat, 0), np.where(in_table, code, 0)]
+
+            go_left = np.where(is_cat, cat_left, np.where(missing, self.default_left[idx], numeric_left))
+            node = np.where(internal, np.where(go_left, self.left[idx], self.right[idx]), node)
+
+        scores = np.zeros((n_rows, self.num_class))
+        leaf = self.leaf_value[~node]
+        for k in range(self.num_class):
+            scores[:, k] = leaf[:, self.tree_class == k].sum(axis=1)
+        return scores
+
+    def predict_proba(self, x):
+        scores = self.raw_scores(x)
+        scores -= scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def check_parity(self, model, x, atol=1e-9):
+        """Max absolute difference against the model's own predict_proba/predict on x."""
+        expected = model.predict_proba(x) if hasattr(model, 'predict_proba') else model.predict(x)
+        diff = float(np.max(np.abs(self.predict_proba(x) - np.asarray(expected)))) if len(x) else 0.0
+        if diff > atol:
+            logging.warning(f'Tree evaluator differs from the model by {diff:.2e}')
+        return diff
+
+
+class TailPredictor:
+    """
+    Scores only the trailing `tail_rows` rows of the model input and keeps the
+    probabilities of rows it already scored, keyed by `keys` (the bar close time).
+
+    The cache is dropped when the model object changes (hot reload). With
+    use_tree_evaluator the model is compiled once per version into a
+    NumpyTreeEnsemble and checked against the model on the first rows it scores; if
+    compiling fails or the check differs by more than `parity_atol`, the regular
+    predict_fn is used instead.
+    """
+
+    def __init__(self, tail_rows, use_tree_evaluator=False, parity_atol=1e-9):
+        self.tail_rows = max(1, int(tail_rows))
+        self.use_tree_evaluator = use_tree_evaluator
+        self.parity_atol = parity_atol
+        self._probs = {}
+        self._model = None
+        self._evaluator = None
+        self._parity_checked = False
+        self.parity_diff = float('nan')
+
+        self.rows_scored = 0
+        self.cache_hits = 0
+        self.last_predict_seconds = float('nan')
+
+    def _reset(self, model):
+        self._probs = {}
+        self._model = model
+        self._evaluator = None
+        self._parity_checked = False
+        self.parity_diff = float('nan')
+        if self.use_tree_evaluator:
+            try:
+                self._evaluator = NumpyTreeEnsemble.from_model(model)
+            except Exception as e:
+                logging.warning(f'Tree evaluator unavailable, using the model: {e}')
+
+    def _check_evaluator(self, model, rows):
+        """Compares the compiled evaluator with the model on `rows`; drops it if they disagree."""
+        self._parity_checked = True
+        try:
+            self.parity_diff = self._evaluator.check_parity(model, rows, atol=self.parity_atol)
+        except Exception as e:
+            logging.warning(f'Tree evaluator parity check failed, using the model: {e}')
+            self._evaluator = None
+            return
+        if not self.parity_diff <= self.parity_atol:
+            logging.warning('Tree evaluator disabled; scoring with the model')
+            self._evaluator = None
+
+    def predict(self, model, x, keys, predict_fn):
+        """
+        :param x: Model input rows (DataFrame) aligned with `keys`.
+        :param predict_fn: predict_fn(model, rows) -> (probabilities, labels), as
+                           get_predictions_for_lgb.
+        :return: (len(tail), 3) probabilities for the last min(tail_rows, len(x)) rows.
+        """
+        if model is not self._model:
+            self._reset(model)
+
+        x_tail = x.iloc[-self.tail_rows:]
+        tail_keys = list(keys[-self.tail_rows:])
+        missing = [i for i, key in enumerate(tail_keys) if key not in self._probs]
+        self.cache_hits += len(tail_keys) - len(missing)
+
+        if self._evaluator is not None and not self._parity_checked:
+            self._check_evaluator(model, x_tail)
+
+        if missing:
+            rows = x_tail.iloc[missing]
+            start = time.perf_counter()
+            if self._evaluator is not None:
+                probs = self._evaluator.predict_proba(rows)
+            else:
+                probs, _ = predict_fn(model, rows)
+            self.last_predict_seconds = time.perf_counter() - start
+            for i, row in zip(missing, np.asarray(probs, dtype=np.float64)):
+                self._probs[tail_keys[i]] = row
+            self.rows_scored += len(missing)
+
+        # Keep only the window so the cache stays O(tail_rows).
+        self._probs = {key: self._probs[key] for key in tail_keys}
+        return np.vstack([self._probs[key] for key in tail_keys])
+
+    def stats(self) -> dict:
+        return {
+            'tail_rows': self.tail_rows,
+            'rows_scored': self.rows_scored,
+            'cache_hits': self.cache_hits,
+            'tree_evaluator': self._evaluator is not None,
+            'tree_evaluator_parity': self.parity_diff,
+            'last_predict_ms': self.last_predict_seconds * 1000,
+        }
@@ -0,0 +1,75 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from bluefin_parser import (
+    BASE18, ORDER_KEYS_TO_SCALE, POSITION_KEYS_TO_SCALE, _legacy_parse_position, _random_scaled,
+    parse_order, parse_orders, parse_position, scale_base18,
+)
+
+
+def decimal_path(value):
+    return float(Decimal(value) / Decimal(10 ** 18))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_scale_base18_matches_decimal_on_random_values(seed):
+    rng = random.Random(seed)
+    for _ in range(20000):
+        value = _random_scaled(rng)
+        assert scale_base18(value) == decimal_path(value), value
+
+
+@pytest.mark.parametrize('value', [
+    '0', '1', '-1', str(BASE18), str(-BASE18), '999999999999999999', '1000000000000000001',
+    '9' * 28, '-' + '9' * 28, '3000123456789012345678',
+])
+def test_scale_base18_edge_cases(value):
+    assert scale_base18(value) == decimal_path(value)
+    assert scale_base18(int(value)) == decimal_path(value)
+
+
+def test_scale_base18_falls_back_to_decimal_for_non_integer_strings():
+    assert scale_base18('1.5e18') == 1.5
+    assert scale_base18('2500000000000000000.0') == 2.5
+
+
+def test_scale_base18_does_not_truncate_numeric_values():
+    assert scale_base18(1.5e18) == 1.5
+    assert scale_base18(2500000000000000000.0) == 2.5
+    assert scale_base18(1.5) == 1.5e-18
+    assert scale_base18(Decimal('1500000000000000000.5')) == decimal_path('1500000000000000000.5')
+    assert parse_position({'quantity': 1.5e16, 'leverage': 3 * BASE18})['quantity'] == 0.015
+
+
+def test_exact_returns_decimals():
+    assert scale_base18('1500000000000000000', exact=True) == Decimal('1.5')
+    assert parse_order({'price': '1500000000000000000'}, exact=True)['price'] == Decimal('1.5')
+
+
+def test_parse_position_matches_legacy_parser():
+    rng = random.Random(1)
+    for _ in range(200):
+        position = {key: _random_scaled(rng) for key in POSITION_KEYS_TO_SCALE}
+        position.update({'symbol': 'ETH-PERP', 'side': 'BUY', 'userAddress': '0x0'})
+        assert parse_position(position) == _legacy_parse_position(position)
+
+
+def test_parse_orders_converts_only_scaled_fields_and_copies():
+    order = {key: '2000000000000000000' for key in ORDER_KEYS_TO_SCALE}
+    order.update({'hash': '0xabc', 'orderStatus': 'OPEN'})
+
+    [parsed] = parse_orders([order])
+
+    assert all(parsed[key] == 2.0 for key in ORDER_KEYS_TO_SCALE)
+    assert parsed['hash'] == '0xabc' and parsed['orderStatus'] == 'OPEN'
+    assert order['price'] == '2000000000000000000'
+    assert parse_orders(None) == []
+
+
+def test_unparseable_field_is_kept_and_logged(caplog):
+    parsed = parse_position({'quantity': 'not-a-number', 'side': 'BUY'})
+
+    assert parsed['quantity'] == 'not-a-number'
+    assert 'quantity' in caplog.text
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip('bluefin_v2_client')
+
+from exchange_simulator import SimulatedBluefinExchange
+from order_manager_bluefin import BluefinOrderManager
+
+
+@pytest.fixture
+def manager():
+    # Half fills: the market order is still PARTIAL_FILLED when it is posted, so the
+    # fill has to come through the order tracker.
+    exchange = SimulatedBluefinExchange(price=3000.0, fill_ratio=0.5, match_interval=0.05, trading_fee=0.001)
+    manager = BluefinOrderManager(private_key=None, trading_fee=0.001, quantity=0.02, client=exchange)
+    yield manager
+    manager.loop.close()
+
+
+def test_open_fill_and_close_round_trip(manager):
+    exchange = manager.client
+
+    opened = manager.open_position_at_market(1)
+
+    assert opened['orderStatus'] == 'FILLED'
+    assert manager.order_tracker.status_lookups >= 1
+    assert manager.order_tracker.assumed_fills == 0
+    position = manager.fetch_current_positions()
+    assert position['side'] == 'BUY'
+    assert position['quantity'] == pytest.approx(0.02)
+    assert position['avgEntryPrice'] == pytest.approx(3000.0)
+
+    exchange.set_price(3030.0)
+    closed = manager.close_position_at_market('long')
+
+    assert closed['orderStatus'] == 'FILLED'
+    assert closed['hash'] != opened['hash']
+    assert manager.fetch_current_positions() == {}
+    assert manager.order_tracker.pending() == []
+    assert exchange.fills == 4
+    assert exchange.realized_pnl == pytest.approx(30.0 * 0.02)
+    assert exchange.fees == pytest.approx((3000.0 + 3030.0) * 0.02 * 0.001)
@@ -0,0 +1,106 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from feature_engine import IncrementalFeatureEngine
+
+
+class StubProcessor:
+    """One column per indicator family: fixed window, recursive EWM, running total, category."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_features(self, data):
+        self.calls.append(len(data))
+        close = data['close']
+        out = pd.DataFrame({'close_time': data['close_time'].to_numpy()}, index=data.index)
+        out['sma_20'] = close.rolling(20).mean()
+        out['ema_10'] = close.ewm(span=10, adjust=False).mean()
+        out['obv'] = (np.sign(close.diff()).fillna(0) * data['volume']).cumsum()
+        out['trend'] = pd.Categorical(np.where(close > out['sma_20'], 'up', 'down'))
+        return out
+
+
+def make_klines(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'close_time': pd.date_range('2024-01-01', periods=n, freq='5min'),
+        'close': 2000 + np.cumsum(rng.normal(0, 5, n)),
+        'volume': rng.uniform(10, 500, n),
+    })
+
+
+def run_bar_by_bar(engine, data, seed_rows=250):
+    engine.update(data.iloc[:seed_rows])
+    for end in range(seed_rows + 1, len(data) + 1):
+        engine.update(data.iloc[:end])
+    return engine.features
+
+
+def assert_same_features(actual, expected):
+    assert list(actual.index) == list(expected.index)
+    for col in ('sma_20', 'ema_10', 'obv'):
+        np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float),
+                                   rtol=1e-9, atol=1e-8, err_msg=col)
+    assert actual['trend'].astype(str).tolist() == expected['trend'].astype(str).tolist()
+    assert (actual['close_time'].to_numpy() == expected['close_time'].to_numpy()).all()
+
+
+def test_bar_by_bar_update_matches_full_recompute():
+    data = make_klines()
+    processor = StubProcessor()
+    engine = IncrementalFeatureEngine(processor, warmup_bars=30, feature_warmup={'ema_': 200},
+                                      cumulative_columns=('obv',))
+
+    features = run_bar_by_bar(engine, data)
+
+    assert_same_features(features, processor.generate_features(data))
+    # Every incremental call only saw the new bar plus the EWM warm-up.
+    assert max(processor.calls[1:-1]) == 201
+
+
+def test_running_totals_drift_without_reanchoring():
+    data = make_klines()
+    processor = StubProcessor()
+    engine = IncrementalFeatureEngine(processor, warmup_bars=30, feature_warmup={'ema_': 200})
+
+    features = run_bar_by_bar(engine, data)
+
+    full = processor.generate_features(data)
+    assert np.abs(features['obv'].to_numpy() - full['obv'].to_numpy()).max() > 1.0
+
+
+def test_warmup_for_uses_the_longest_matching_prefix():
+    engine = IncrementalFeatureEngine(StubProcessor(), warmup_bars=30,
+                                      feature_warmup={'ema_': 200, 'adx_': 400})
+
+    assert engine.warmup_for(['sma_20', 'ema_10']) == 200
+    assert engine.warmup_for(['sma_20', 'ema_10', 'adx_14']) == 400
+    assert engine.warmup_for(['sma_20']) == 30
+
+
+def test_parity_is_checked_after_the_first_update_and_periodically(caplog):
+    data = make_klines(400)
+    # No re-anchoring, so the running total drifts and the check reports it.
+    engine = IncrementalFeatureEngine(StubProcessor(), warmup_bars=30, feature_warmup={'ema_': 200},
+                                      parity_check_every=50)
+
+    with caplog.at_level('WARNING'):
+        run_bar_by_bar(engine, data, seed_rows=250)
+
+    # Updates 1, 50, 100 and 150 of the 150 incremental ones.
+    assert engine.parity_checks == 4
+    assert set(engine.last_parity) == {'obv'}
+    assert 'differ from full recompute' in caplog.text
+
+
+def test_scheduled_parity_check_passes_with_warmup_and_reanchoring():
+    engine = IncrementalFeatureEngine(StubProcessor(), warmup_bars=30, feature_warmup={'ema_': 200},
+                                      cumulative_columns=('obv',), parity_check_every=50)
+
+    run_bar_by_bar(engine, make_klines(400), seed_rows=250)
+
+    assert engine.parity_checks == 4
+    assert engine.last_parity == {}
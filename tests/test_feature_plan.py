@@ -0,0 +1,115 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+import feature_plan
+from feature_plan import SOURCE_LIVE, SOURCE_MODEL, SOURCE_TRAINING, FeaturePlan, load_or_build_plan
+
+
+def format_names(df, numeric, categorical):
+    # Stand-in for the training pipeline's name formatting: brackets are not valid LightGBM names.
+    rename = {col: col.replace('[', '_').replace(']', '') for col in df.columns}
+    return df.rename(columns=rename), [rename[c] for c in numeric], [rename[c] for c in categorical]
+
+
+def label_encode(df, categorical):
+    # Stand-in for encode_categorical_features: sklearn LabelEncoder semantics (sorted classes).
+    df = df.copy()
+    encoders = {}
+    for col in categorical:
+        classes = np.array(sorted(df[col].dropna().astype(str).unique()))
+        df[col] = np.searchsorted(classes, df[col].astype(str))
+        encoders[col] = SimpleNamespace(classes_=classes)
+    return df, encoders
+
+
+@pytest.fixture(autouse=True)
+def training_pipeline(monkeypatch):
+    monkeypatch.setattr(feature_plan, 'process_feature_name_format', format_names)
+    monkeypatch.setattr(feature_plan, 'encode_categorical_features', label_encode)
+
+
+def feature_frame(regimes):
+    n = len(regimes)
+    return pd.DataFrame({
+        'rsi[14]': np.linspace(30, 70, n),
+        'regime': pd.Categorical(regimes),
+        'CDLDOJI': pd.Categorical(['0'] * n),
+        'atr': np.arange(n, dtype=float),
+    })
+
+
+FEATURES = ['rsi[14]', 'regime', 'CDLDOJI', 'atr']
+
+
+def test_codes_come_from_the_model_training_categories():
+    # The live window has no 'calm' bars, so refitting would code 'trend' as 0.
+    live = feature_frame(['trend', 'volatile', 'trend'])
+    model = SimpleNamespace(booster_=SimpleNamespace(pandas_categorical=[['calm', 'trend', 'volatile']]))
+
+    plan = FeaturePlan.build(live, FEATURES, model=model)
+
+    assert plan.source == SOURCE_MODEL
+    assert plan.output_columns == ['rsi_14', 'atr', 'regime']
+    assert plan.transform(live)['regime'].tolist() == [1.0, 2.0, 1.0]
+
+
+def test_codes_come_from_a_training_frame():
+    training = feature_frame(['calm', 'trend', 'volatile', 'calm'])
+    live = feature_frame(['trend', 'unseen'])
+
+    plan = FeaturePlan.build(live, FEATURES, training_frame=training)
+
+    assert plan.source == SOURCE_TRAINING and not plan.fitted_on_live
+    out = plan.transform(live)
+    assert out['regime'].iloc[0] == 1.0
+    assert np.isnan(out['regime'].iloc[1])
+    np.testing.assert_allclose(out['rsi_14'], live['rsi[14]'])
+
+
+def test_live_fitted_plan_is_not_frozen(tmp_path, caplog):
+    live = feature_frame(['trend', 'volatile'])
+    plan = FeaturePlan.build(live, FEATURES)
+    assert plan.source == SOURCE_LIVE and plan.fitted_on_live
+    with pytest.raises(ValueError):
+        plan.save(str(tmp_path / 'plan.joblib'))
+
+    model_path = str(tmp_path / 'model.joblib')
+    with caplog.at_level(logging.ERROR):
+        plan = load_or_build_plan(model_path, 'digest', live, FEATURES)
+    assert plan.fitted_on_live
+    assert 'fitted on the live window' in caplog.text
+    assert not (tmp_path / 'model.joblib.plan.joblib').exists()
+
+
+def test_numeric_only_plan_has_nothing_to_refit():
+    live = feature_frame(['trend', 'volatile'])
+    plan = FeaturePlan.build(live, ['rsi[14]', 'atr'])
+    assert not plan.fitted_on_live
+
+
+def test_build_checks_the_encoded_column_order(monkeypatch):
+    def reorder(df, categorical):
+        df, encoders = label_encode(df, categorical)
+        return df[categorical + [c for c in df.columns if c not in categorical]], encoders
+
+    monkeypatch.setattr(feature_plan, 'encode_categorical_features', reorder)
+    with pytest.raises(ValueError, match='numeric then categorical'):
+        FeaturePlan.build(feature_frame(['calm', 'trend']), FEATURES)
+
+
+def test_saved_plan_round_trips(tmp_path):
+    pytest.importorskip('joblib')
+    live = feature_frame(['calm', 'trend'])
+    model = SimpleNamespace(pandas_categorical=[['calm', 'trend']])
+    model_path = str(tmp_path / 'model.joblib')
+
+    built = load_or_build_plan(model_path, 'digest', live, FEATURES, model=model)
+    loaded = load_or_build_plan(model_path, 'digest', live, FEATURES)
+
+    assert loaded.source == SOURCE_MODEL
+    assert loaded.code_tables == built.code_tables
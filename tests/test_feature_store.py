@@ -0,0 +1,118 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from feature_engine import IncrementalFeatureEngine
+from feature_store import META_FILE, ColumnarFeatureStore
+from test_feature_engine import StubProcessor, make_klines
+
+
+def mixed_frame(n=10, start=0):
+    times = pd.date_range('2024-01-01', periods=n, freq='5min') + pd.Timedelta(minutes=5 * start)
+    return pd.DataFrame({
+        'close_time': times,
+        'open_time': (times - pd.Timedelta(minutes=5)).astype('datetime64[ms]'),
+        'value': np.arange(start, start + n, dtype=np.float32),
+        'flag': np.arange(n) % 2 == 0,
+        'side': np.array(['long', 'short', None] * n, dtype=object)[:n],
+        'regime': pd.Categorical(['calm', 'trend'] * (n // 2) + ['calm'] * (n % 2)),
+    }, index=pd.RangeIndex(start + 100, start + 100 + n, name='bar'))
+
+
+def test_read_restores_index_and_dtypes(tmp_path):
+    store = ColumnarFeatureStore(str(tmp_path / 'features'))
+    frame = pd.concat([mixed_frame(6), mixed_frame(6, start=6)])
+    store.append(frame.iloc[:6])
+    store.append(frame.iloc[6:])
+
+    restored = ColumnarFeatureStore(str(tmp_path / 'features')).read()
+
+    pd.testing.assert_index_equal(restored.index, frame.index, exact=False)
+    assert restored.index.name == 'bar'
+    assert restored.dtypes.astype(str).to_dict() == frame.dtypes.astype(str).to_dict()
+    assert restored['side'].iloc[:2].tolist() == ['long', 'short']
+    assert pd.isna(restored['side'].iloc[2])
+    assert restored['regime'].astype(str).tolist() == frame['regime'].astype(str).tolist()
+
+
+def test_string_columns_keep_their_dtype(tmp_path):
+    frame = mixed_frame(4)
+    frame['name'] = pd.array(['a', 'b', 'a', 'c'], dtype='string')
+    store = ColumnarFeatureStore(str(tmp_path / 'features'), fsync=False)
+    store.append(frame)
+
+    assert store.read()['name'].dtype == frame['name'].dtype
+
+
+def test_uncommitted_bytes_are_dropped(tmp_path):
+    path = str(tmp_path / 'features')
+    store = ColumnarFeatureStore(path)
+    store.append(mixed_frame(5))
+    # A crash after the column files were written but before meta.json was replaced.
+    with open(os.path.join(path, '0.bin'), 'ab') as f:
+        f.write(b'\x00' * 64)
+
+    store = ColumnarFeatureStore(path)
+    assert len(store) == 5
+    store.append(mixed_frame(5, start=5))
+    assert store.read()['value'].tolist() == list(range(10))
+
+
+def test_new_segment_is_recorded(tmp_path):
+    path = str(tmp_path / 'features')
+    store = ColumnarFeatureStore(path)
+    store.append(mixed_frame(5))
+    assert store.segment_start is None
+
+    later = mixed_frame(5, start=50)
+    store.append(later, new_segment=True)
+
+    assert ColumnarFeatureStore(path).segment_start == later['close_time'].iloc[0]
+    with open(os.path.join(path, META_FILE)) as f:
+        assert len(json.load(f)['segments']) == 1
+
+
+def test_engine_restart_continues_from_the_store(tmp_path):
+    data = make_klines(400)
+    path = str(tmp_path / 'features')
+    kwargs = dict(warmup_bars=30, feature_warmup={'ema_': 200}, cumulative_columns=('obv',))
+
+    engine = IncrementalFeatureEngine(StubProcessor(), store=ColumnarFeatureStore(path), **kwargs)
+    engine.update(data.iloc[:300])
+    engine.update(data.iloc[:350])
+
+    processor = StubProcessor()
+    restarted = IncrementalFeatureEngine(processor, store=ColumnarFeatureStore(path), **kwargs)
+    features = restarted.update(data)
+
+    # Only the bars after the store were computed, and the frame looks like a fresh run.
+    assert processor.calls == [50 + 200]
+    full = StubProcessor().generate_features(data)
+    pd.testing.assert_index_equal(features.index, full.index, exact=False)
+    assert features.dtypes.astype(str).to_dict() == full.dtypes.astype(str).to_dict()
+    np.testing.assert_allclose(features['obv'].to_numpy(), full['obv'].to_numpy(), rtol=1e-9)
+
+
+def test_engine_starts_a_new_segment_after_a_gap(tmp_path, caplog):
+    data = make_klines(600)
+    path = str(tmp_path / 'features')
+
+    IncrementalFeatureEngine(StubProcessor(), warmup_bars=30, store=ColumnarFeatureStore(path)).update(data.iloc[:200])
+
+    later = data.iloc[300:]
+    engine = IncrementalFeatureEngine(StubProcessor(), warmup_bars=30, store=ColumnarFeatureStore(path))
+    with caplog.at_level('WARNING'):
+        engine.update(later)
+    assert 'new store segment' in caplog.text
+
+    store = ColumnarFeatureStore(path)
+    assert store.segment_start == later['close_time'].iloc[0]
+    assert len(store) == 200 + len(later)
+
+    # After another restart only the new segment is loaded.
+    engine = IncrementalFeatureEngine(StubProcessor(), warmup_bars=30, max_rows=1000, store=store)
+    assert len(engine.update(later)) == len(later)
@@ -0,0 +1,238 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+pd = pytest.importorskip('pandas')
+
+import inference_worker
+import strategy_runtime
+from inference_worker import InferenceWorker, WorkerBusy
+from latency import LatencyRecorder
+from strategy_runtime import AsyncStrategyRuntime
+
+
+class FakeProcess:
+    def __init__(self):
+        self.terminated = False
+
+    def terminate(self):
+        self.terminated = True
+
+
+class FakePool:
+    """Stands in for the ProcessPoolExecutor: requests stay pending until the test resolves them."""
+
+    def __init__(self):
+        self.futures = []
+        self.process = FakeProcess()
+        self._processes = {1: self.process}
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+        # What the real pool does once its process is gone.
+        for future in self.futures:
+            if not future.done():
+                future.set_exception(BrokenProcessPool('terminated'))
+
+
+@pytest.fixture
+def worker():
+    worker = InferenceWorker({'ticker': 'ETH'}, {})
+    worker._executor = FakePool()
+    yield worker
+    worker._executor = None
+    worker.close()
+
+
+def make_buffer():
+    return SimpleNamespace(closed_view=lambda: np.ones((4, 2)), columns=['close', 'close_time'],
+                           datetime_columns=('close_time',))
+
+
+def test_second_request_raises_instead_of_blocking(worker):
+    pool = worker._executor
+    worker.submit(make_buffer())
+
+    with pytest.raises(WorkerBusy):
+        worker.submit(make_buffer())
+    assert worker.busy == 1
+
+    pool.futures[0].set_result((None, {}))
+    worker.submit(make_buffer())
+    assert len(pool.futures) == 2
+
+
+def test_timeout_restarts_the_worker(worker):
+    pool = worker._executor
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await worker.compute(make_buffer(), timeout=0.05)
+
+    asyncio.run(scenario())
+
+    assert pool.process.terminated and pool.shut_down
+    assert worker._executor is None
+    assert worker.restarts == 1 and worker.failures == 1
+    # The timed-out request no longer holds the worker.
+    assert worker._busy.acquire(blocking=False)
+    worker._busy.release()
+
+
+def test_blocking_run_timeout_restarts_the_worker(worker):
+    pool = worker._executor
+    with pytest.raises(concurrent.futures.TimeoutError):
+        worker.run(make_buffer(), timeout=0.05)
+
+    assert pool.process.terminated
+    assert worker.restarts == 1
+
+
+def test_busy_is_not_a_failure(worker):
+    async def scenario():
+        worker.submit(make_buffer())
+        with pytest.raises(WorkerBusy):
+            await worker.compute(make_buffer())
+
+    asyncio.run(scenario())
+    assert worker.failures == 0 and worker.restarts == 0
+    assert worker._executor is not None
+
+
+# Real worker process ------------------------------------------------------------------
+# The worker runs the real _init_worker/_compute with SignalStrategy swapped for a stub,
+# since the feature pipeline needs data_processor, which is not part of this repo.
+
+class StubStrategy:
+    """Echoes the bars it received, after burning `burn` seconds of CPU like a feature computation."""
+
+    def __init__(self, data_processor, **kwargs):
+        self.burn = data_processor.get('burn', 0.0)
+        self.feature_engine = SimpleNamespace(key='close_time')
+        self.model_registry = SimpleNamespace(get=lambda: None, version=7)
+
+    def generate_tbl_signal(self, data, act=True):
+        deadline = time.perf_counter() + self.burn
+        while time.perf_counter() < deadline:
+            pass
+        return data.assign(prob_class_0_mean=data['close'].sum(), prob_class_1_mean=float(len(data)),
+                           prob_class_2_mean=float(os.getpid()), ypred=np.sign(data['close'].diff()).fillna(0.0))
+
+
+def _init_stub_worker(*args):
+    import signals_tbl_eth_bluefin as signals
+    signals.SignalStrategy = StubStrategy
+    signals.data_processor = SimpleNamespace(CryptoDataProcessor=lambda **kwargs: kwargs)
+    inference_worker._init_worker(*args)
+
+
+def _worker_segments():
+    return list(inference_worker._segments)
+
+
+def stub_worker(burn=0.0):
+    """Starts an InferenceWorker on a real spawned process running StubStrategy."""
+    worker = InferenceWorker({'ticker': 'ETHUSD', 'trading_fee': 0.0015, 'quote_symbol_quantity': 0.01},
+                             {'burn': burn})
+    worker._executor = ProcessPoolExecutor(
+        max_workers=1, mp_context=worker.context, initializer=_init_stub_worker,
+        initargs=(worker.strategy_kwargs, worker.data_processor_kwargs, logging.WARNING))
+    return worker.start()
+
+
+def bar_buffer(count):
+    close_time = pd.date_range('2024-01-01', periods=count, freq='5min') + pd.Timedelta(minutes=5, milliseconds=-1)
+    close = 3000.0 + np.cos(np.arange(count))
+    bars = np.column_stack([close, close_time.to_numpy(dtype='datetime64[ms]').astype(np.int64)]).astype(np.float64)
+    return SimpleNamespace(closed_view=lambda: bars, columns=['close', 'close_time'],
+                           datetime_columns=('close_time',), close=close, close_time=close_time)
+
+
+@pytest.fixture
+def real_worker():
+    worker = stub_worker()
+    yield worker
+    worker.close()
+
+
+def test_bars_round_trip_through_shared_memory(real_worker):
+    for count in (100, 200):
+        buffer = bar_buffer(count)
+        frame = real_worker.run(buffer, timeout=30)
+
+        assert list(frame.columns) == ['close_time', *inference_worker.SIGNAL_COLUMNS]
+        row = frame.iloc[-1]
+        assert row['close_time'] == buffer.close_time[-1]
+        assert row['prob_class_0_mean'] == buffer.close.sum()
+        assert row['prob_class_1_mean'] == count
+        assert row['prob_class_2_mean'] != os.getpid()
+        assert row['ypred'] == np.sign(buffer.close[-1] - buffer.close[-2])
+
+    # Both cycles fit the first segment, so the worker stayed attached to it.
+    segment = real_worker._segment.name
+    assert real_worker._executor.submit(_worker_segments).result() == [segment]
+
+    # A history larger than the segment gets a new one; the worker drops the old.
+    frame = real_worker.run(bar_buffer(5000), timeout=30)
+    assert frame.iloc[-1]['prob_class_1_mean'] == 5000
+    assert real_worker._segment.name != segment
+    assert real_worker._executor.submit(_worker_segments).result() == [real_worker._segment.name]
+    assert real_worker.stats()['requests'] == 3
+
+
+class WorkerStrategy:
+    """Parent-side strategy whose signals come from an InferenceWorker."""
+
+    def __init__(self, worker):
+        self.ticker = 'ETHUSD'
+        self.inference_worker = worker
+        self.kline_buffer = bar_buffer(500)
+        self.order_manager = SimpleNamespace(order_tracker=None)
+        self.signals = []
+
+    def refresh_bars(self):
+        pass
+
+    def generate_position_value(self, df=None, signal_column=None, current_time=None, **kwargs):
+        if df is not None:
+            self.signals.append(df)
+
+
+def test_monitor_lag_stays_flat_while_the_worker_computes(monkeypatch):
+    recorder = LatencyRecorder(budgets={})
+    monkeypatch.setattr(strategy_runtime, 'metrics', recorder)
+    worker = stub_worker(burn=0.6)
+    strategy = WorkerStrategy(worker)
+    runtime = AsyncStrategyRuntime(strategy, signal_period=1.0, signal_offset=0, monitor_period=0.05)
+
+    async def main():
+        try:
+            await asyncio.wait_for(runtime.run(), 1.8)
+        except asyncio.TimeoutError:
+            pass
+
+    try:
+        asyncio.run(main())
+    finally:
+        worker.close()
+
+    assert len(strategy.signals) >= 1
+    lag = recorder.snapshot()['monitor_lag']
+    assert lag['count'] >= 20
+    assert lag['max_ms'] < 50
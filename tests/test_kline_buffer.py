@@ -0,0 +1,123 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+pytest.importorskip('requests')
+
+from kline_buffer import KlineBuffer
+
+START = pd.Timestamp('2024-01-01')
+BAR = pd.Timedelta(minutes=5)
+
+
+def klines(first, count, close_offset=0.0):
+    """Bars `first` .. `first + count - 1`; the close of bar i is 100 + i (+ close_offset)."""
+    index = np.arange(first, first + count)
+    open_time = START + index * BAR
+    return pd.DataFrame({
+        'open_time': open_time,
+        'close': 100.0 + index + close_offset,
+        'volume': np.ones(count),
+        'close_time': open_time + BAR - pd.Timedelta(milliseconds=1),
+        'symbol': 'ETHUSDT',
+    })
+
+
+class FakeDataClient:
+    def __init__(self, bars):
+        self.bars = bars
+        self.pulls = 0
+
+    def pull_binance_data(self, ticker):
+        self.pulls += 1
+        return klines(0, self.bars)
+
+
+class FakeFetcher:
+    """Returns the bars from start_time_ms up to `bars` (exclusive), or raises `error`."""
+
+    def __init__(self, bars, close_offset=0.0, error=None):
+        self.bars = bars
+        self.close_offset = close_offset
+        self.error = error
+        self.starts = []
+
+    def fetch(self, symbol, start_time_ms, limit=1000):
+        self.starts.append(pd.to_datetime(int(start_time_ms), unit='ms'))
+        if self.error is not None:
+            raise self.error
+        first = int((pd.to_datetime(int(start_time_ms), unit='ms') - START) // BAR)
+        return klines(first, max(0, self.bars - first), self.close_offset)
+
+
+def set_clock(buffer, bar):
+    """Puts the buffer's clock one minute into bar `bar`, so that bar is still in progress."""
+    now_ms = np.int64((START + bar * BAR + pd.Timedelta(minutes=1)).value // 10 ** 6)
+    buffer._now_ms = lambda: now_ms
+
+
+def make_buffer(bars, fetcher, capacity=100):
+    buffer = KlineBuffer(FakeDataClient(bars), 'ETHUSDT', capacity=capacity, fetcher=fetcher)
+    set_clock(buffer, bars - 1)
+    return buffer
+
+
+def test_in_progress_bar_is_replaced_not_duplicated():
+    fetcher = FakeFetcher(bars=50, close_offset=0.5)
+    buffer = make_buffer(50, fetcher)
+    buffer.refresh()
+    assert len(buffer) == 50
+    assert len(buffer.closed_frame()) == 49
+    assert 'symbol' not in buffer.columns
+
+    # The last bar is still open: the refetch replaces it with its updated close.
+    buffer.refresh()
+    assert fetcher.starts == [START + 49 * BAR]
+    assert len(buffer) == 50
+    assert buffer.last_price() == pytest.approx(149.5)
+
+    # It closes and a new one opens.
+    fetcher.bars = 51
+    set_clock(buffer, 50)
+    buffer.refresh()
+    closed = buffer.closed_frame()
+    assert len(buffer) == 51
+    assert closed['close_time'].is_monotonic_increasing
+    assert closed['close'].iloc[-1] == pytest.approx(149.5)
+    assert closed['close_time'].iloc[-1] == START + 50 * BAR - pd.Timedelta(milliseconds=1)
+
+
+def test_capacity_is_kept_across_compactions():
+    fetcher = FakeFetcher(bars=30)
+    buffer = make_buffer(30, fetcher, capacity=20)
+    buffer.refresh()
+    assert len(buffer) == 20
+
+    # Enough bars to wrap the 2 x capacity backing array several times.
+    for bars in range(31, 131, 3):
+        fetcher.bars = bars
+        set_clock(buffer, bars - 1)
+        buffer.refresh()
+        assert len(buffer) == 20
+        closed = buffer.closed_frame()
+        expected = 100.0 + np.arange(bars - 20, bars - 1)
+        np.testing.assert_array_equal(closed['close'].to_numpy(), expected)
+    assert buffer.full_pulls == 1
+
+
+def test_failed_incremental_fetch_falls_back_to_a_full_pull():
+    fetcher = FakeFetcher(bars=40, error=ConnectionError('timeout'))
+    buffer = make_buffer(40, fetcher)
+    buffer.refresh()
+
+    buffer.refresh()
+
+    assert buffer.data_client.pulls == 2
+    assert buffer.full_pulls == 2
+    assert buffer.incremental_pulls == 0
+    assert len(buffer.closed_frame()) == 39
+
+    fetcher.error = None
+    buffer.refresh()
+    assert buffer.incremental_pulls == 1
+    assert buffer.data_client.pulls == 2
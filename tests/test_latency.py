@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from latency import LatencyRecorder
+
+
+def test_spans_collect_into_the_active_cycle():
+    recorder = LatencyRecorder(budgets={})
+    cycle = recorder.new_cycle('signal')
+
+    def work():
+        with recorder.span('generate_features'):
+            pass
+        recorder.record('model_load', 0.25)
+
+    recorder.run_in_cycle(cycle, work)
+    recorder.record('outside', 1.0)
+
+    assert set(cycle['spans']) == {'generate_features', 'model_load'}
+    assert cycle['spans']['model_load'] == 0.25
+    assert recorder.snapshot()['outside']['count'] == 1
+
+
+def test_cycle_follows_coroutines_submitted_to_the_loop_thread():
+    """Exchange calls run on the event loop thread but belong to the calling thread's cycle."""
+    recorder = LatencyRecorder(budgets={})
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+
+    async def post_signed_order():
+        await asyncio.sleep(0)
+        recorder.record('post_signed_order', 0.1)
+
+    def strategy_thread():
+        asyncio.run_coroutine_threadsafe(post_signed_order(), loop).result(timeout=2)
+
+    signal_cycle, monitor_cycle = recorder.new_cycle('signal'), recorder.new_cycle('monitor')
+    try:
+        recorder.run_in_cycle(signal_cycle, strategy_thread)
+        recorder.run_in_cycle(monitor_cycle, strategy_thread)
+        asyncio.run_coroutine_threadsafe(post_signed_order(), loop).result(timeout=2)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join(timeout=2)
+        loop.close()
+
+    assert signal_cycle['spans'] == {'post_signed_order': 0.1}
+    assert monitor_cycle['spans'] == {'post_signed_order': 0.1}
+    assert recorder.snapshot()['post_signed_order']['count'] == 3
+
+
+def test_cycles_of_concurrent_tasks_stay_separate():
+    recorder = LatencyRecorder(budgets={})
+    cycles = [recorder.new_cycle(f'c{i}') for i in range(2)]
+
+    async def tick(cycle, seconds):
+        with recorder.in_cycle(cycle):
+            await asyncio.sleep(0.01)
+            recorder.record('reconcile_orders', seconds)
+
+    async def main():
+        await asyncio.gather(tick(cycles[0], 1.0), tick(cycles[1], 2.0))
+
+    asyncio.run(main())
+
+    assert cycles[0]['spans'] == {'reconcile_orders': 1.0}
+    assert cycles[1]['spans'] == {'reconcile_orders': 2.0}
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import lazy_imports
+from lazy_imports import is_loaded, lazy_import
+
+REPO = str(Path(__file__).resolve().parents[1])
+
+
+@pytest.fixture
+def heavy_module(tmp_path, monkeypatch):
+    """A throwaway module on sys.path that counts how often it is imported."""
+    (tmp_path / 'lazy_heavy_module.py').write_text(
+        'import builtins\n'
+        'builtins.lazy_heavy_imports = getattr(builtins, "lazy_heavy_imports", 0) + 1\n'
+        'VALUE = 42\n'
+        'def double(x):\n'
+        '    return 2 * x\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(lazy_imports, 'import_times', {})
+    import builtins
+    monkeypatch.setattr(builtins, 'lazy_heavy_imports', 0, raising=False)
+    yield builtins
+    sys.modules.pop('lazy_heavy_module', None)
+
+
+def test_import_is_deferred_until_first_use(heavy_module):
+    module = lazy_import('lazy_heavy_module')
+
+    assert not is_loaded(module)
+    assert 'lazy_heavy_module' not in sys.modules
+    assert repr(module) == '<lazy lazy_heavy_module>'
+
+    assert module.VALUE == 42
+    assert is_loaded(module)
+    assert heavy_module.lazy_heavy_imports == 1
+    assert 'lazy_heavy_module' in lazy_imports.import_times
+    assert repr(module) == '<lazy lazy_heavy_module (loaded)>'
+
+
+def test_attribute_proxy_is_resolved_once_and_callable(heavy_module):
+    double = lazy_import('lazy_heavy_module', 'double')
+    value = lazy_import('lazy_heavy_module', 'VALUE')
+
+    assert double(21) == 42
+    assert double(1) == 2
+    assert value.real == 42
+    assert is_loaded(double) and is_loaded(value)
+    assert heavy_module.lazy_heavy_imports == 1
+
+
+def test_missing_attribute_raises_on_use(heavy_module):
+    missing = lazy_import('lazy_heavy_module', 'missing')
+
+    with pytest.raises(AttributeError):
+        missing()
+    assert not is_loaded(missing)
+
+
+def test_strategy_import_defers_pandas_and_requests():
+    pytest.importorskip('numpy')
+    code = ('import sys, signals_tbl_eth_bluefin, portfolio_runner; '
+            'print(sorted(m for m in ("pandas", "requests", "lightgbm") if m in sys.modules))')
+    out = subprocess.run([sys.executable, '-c', code], cwd=REPO, capture_output=True, text=True, check=True)
+
+    assert out.stdout.strip() == '[]'
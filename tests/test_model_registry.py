@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+joblib = pytest.importorskip('joblib')
+
+from model_registry import ModelRegistry
+
+
+def bump_mtime(path, seconds=10):
+    # Coarse file-system clocks can give two quick writes the same mtime.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    model_path, features_path = str(tmp_path / 'model.joblib'), str(tmp_path / 'features.joblib')
+    joblib.dump({'name': 'model-a'}, model_path)
+    joblib.dump(['rsi', 'ema'], features_path)
+    return model_path, features_path
+
+
+def test_touched_but_identical_file_is_not_reloaded(artifacts):
+    model_path, features_path = artifacts
+    registry = ModelRegistry(model_path, features_path)
+    model, _ = registry.get()
+
+    bump_mtime(model_path)
+
+    assert registry.get()[0] is model
+    assert registry.version == 1
+    assert registry.reload_count == 0
+
+
+def test_changed_model_is_swapped_in(artifacts):
+    model_path, features_path = artifacts
+    registry = ModelRegistry(model_path, features_path)
+    digest = registry.model_digest
+
+    joblib.dump({'name': 'model-b'}, model_path)
+    bump_mtime(model_path)
+    model, features = registry.get()
+
+    assert model == {'name': 'model-b'}
+    assert features == ['rsi', 'ema']
+    assert registry.version == 2
+    assert registry.reload_count == 1
+    assert registry.model_digest != digest
+
+
+def test_truncated_file_keeps_the_previous_model(artifacts):
+    model_path, features_path = artifacts
+    registry = ModelRegistry(model_path, features_path)
+    model, _ = registry.get()
+
+    with open(model_path, 'r+b') as f:
+        f.truncate(5)
+    bump_mtime(model_path)
+
+    assert registry.get()[0] is model
+    assert registry.version == 1
+    assert registry.reload_failures == 1
+
+    # Once the writer is done, the next check picks the new model up.
+    joblib.dump({'name': 'model-b'}, model_path)
+    bump_mtime(model_path, seconds=20)
+    assert registry.get()[0] == {'name': 'model-b'}
+    assert registry.version == 2
+
+
+def test_missing_file_keeps_the_previous_model(artifacts):
+    model_path, features_path = artifacts
+    registry = ModelRegistry(model_path, features_path)
+    model, _ = registry.get()
+
+    os.remove(features_path)
+
+    assert registry.get()[0] is model
+    assert registry.reload_failures == 1
+
+
+def test_failed_file_is_not_retried_until_it_changes(artifacts, monkeypatch):
+    model_path, features_path = artifacts
+    registry = ModelRegistry(model_path, features_path)
+    loads = []
+    load = joblib.load
+    monkeypatch.setattr(joblib, 'load', lambda path: loads.append(path) or load(path))
+
+    with open(model_path, 'r+b') as f:
+        f.truncate(5)
+    bump_mtime(model_path)
+    for _ in range(3):
+        registry.get()
+    assert registry.reload_failures == 1
+    assert loads == [model_path]
+
+    # Touched but still truncated: hashed again, not loaded.
+    bump_mtime(model_path, seconds=20)
+    registry.get()
+    assert registry.reload_failures == 1
+    assert loads == [model_path]
+
+    joblib.dump({'name': 'model-b'}, model_path)
+    bump_mtime(model_path, seconds=30)
+    assert registry.get()[0] == {'name': 'model-b'}
+    assert registry.reload_failures == 1
@@ -0,0 +1,138 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+from notifier import DiscordNotifier
+
+
+class WebhookStandIn:
+    """Local webhook that answers with scripted status codes (200 once the script runs out)."""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.received = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stand_in.received.append(body['content'])
+                status = stand_in.statuses.pop(0) if stand_in.statuses else 200
+                payload = json.dumps({'retry_after': 0.01} if status == 429 else {}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/webhook'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    stand_in = WebhookStandIn()
+    yield stand_in
+    stand_in.close()
+
+
+def quiet_notifier(**kwargs):
+    # A long flush interval, so only stop() flushes and each test controls the timing.
+    kwargs.setdefault('flush_interval', 60)
+    kwargs.setdefault('retry_delay', 0.01)
+    kwargs.setdefault('timeout', 2)
+    return DiscordNotifier(**kwargs)
+
+
+def test_retries_after_rate_limit(webhook):
+    webhook.statuses = [429, 200]
+    notifier = quiet_notifier()
+    notifier.send(webhook.url, 'hello')
+    notifier.stop()
+
+    assert webhook.received == ['hello', 'hello']
+    assert notifier.stats()['rate_limited'] == 1
+    assert notifier.sent == 1 and notifier.failed == 0
+
+
+def test_retries_server_errors(webhook):
+    webhook.statuses = [500, 503, 200]
+    notifier = quiet_notifier()
+    notifier.send(webhook.url, 'hello')
+    notifier.stop()
+
+    assert len(webhook.received) == 3
+    assert notifier.server_errors == 2
+    assert notifier.sent == 1 and notifier.failed == 0
+
+
+def test_gives_up_after_max_retries(webhook):
+    webhook.statuses = [500] * 10
+    notifier = quiet_notifier(max_retries=2)
+    notifier.send(webhook.url, 'hello')
+    notifier.stop()
+
+    assert len(webhook.received) == 3
+    assert notifier.sent == 0 and notifier.failed == 1
+
+
+def test_client_errors_are_not_retried(webhook):
+    webhook.statuses = [400]
+    notifier = quiet_notifier()
+    notifier.send(webhook.url, 'hello')
+    notifier.stop()
+
+    assert len(webhook.received) == 1
+    assert notifier.failed == 1
+
+
+def test_queue_overflow_drops_the_oldest(webhook):
+    notifier = quiet_notifier(max_queue=3)
+    for i in range(5):
+        notifier.send(webhook.url, f'm{i}')
+    notifier.stop()
+
+    assert notifier.dropped == 2
+    assert webhook.received == ['m2\nm3\nm4']
+
+
+def test_only_adjacent_duplicates_are_coalesced(webhook):
+    notifier = quiet_notifier()
+    for content in ('a', 'a', 'b', 'a', 'c', 'c', 'c'):
+        notifier.send(webhook.url, content)
+    notifier.stop()
+
+    assert webhook.received == ['a (x2)\nb\na\nc (x3)']
+    assert notifier.sent == 7
+
+
+def test_batches_respect_the_discord_limit(webhook):
+    notifier = quiet_notifier()
+    for i in range(3):
+        notifier.send(webhook.url, f'{i}' * 1500)
+    notifier.stop()
+
+    assert [len(content) for content in webhook.received] == [1500, 1500, 1500]
+
+
+def test_stop_flushes_pending_messages(webhook):
+    notifier = quiet_notifier()
+    notifier.send(webhook.url, 'before shutdown')
+    assert webhook.received == []
+    notifier.stop()
+
+    assert webhook.received == ['before shutdown']
+    assert notifier.stats()['queued'] == 0
@@ -0,0 +1,77 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from online_smoothing import OnlineSmoother, check_parity
+
+
+def reference_smoothing(df, probs, span, method):
+    # Same contract as apply_smoothing: one prob_class_{i}_mean column per class.
+    smoothed = pd.DataFrame(probs, index=df.index)
+    smoothed = smoothed.rolling(span).mean() if method == 'rolling' else smoothed.ewm(span=span).mean()
+    for i in range(probs.shape[1]):
+        df[f'prob_class_{i}_mean'] = smoothed[i].to_numpy()
+    return df
+
+
+def random_probs(n=2000, seed=0):
+    return np.random.default_rng(seed).dirichlet([1, 1, 1], size=n)
+
+
+@pytest.mark.parametrize('method', ['rolling', 'ewm'])
+@pytest.mark.parametrize('span', [1, 4, 8, 16])
+def test_bar_by_bar_matches_full_smoothing(method, span):
+    assert check_parity(random_probs(), span, method, smoothing_fn=reference_smoothing) <= 1e-9
+
+
+def test_rolling_stays_exact_across_resyncs():
+    probs = random_probs(5000, seed=1)
+    smoother = OnlineSmoother(8, 'rolling', resync_every=64)
+    actual = smoother.update(list(range(len(probs))), probs)
+
+    expected = pd.DataFrame(probs).rolling(8).mean().to_numpy()
+    np.testing.assert_allclose(actual[7:], expected[7:], rtol=0, atol=1e-12)
+    assert np.isnan(actual[:7]).all()
+
+
+def test_ewm_without_adjust_matches_pandas():
+    probs = random_probs(500)
+    smoother = OnlineSmoother(10, 'ewm', adjust=False)
+    actual = np.vstack([smoother.update([i], probs[i:i + 1]) for i in range(len(probs))])
+
+    expected = pd.DataFrame(probs).ewm(span=10, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+
+def test_overlapping_windows_are_applied_once():
+    probs = random_probs(100)
+    keys = list(range(100))
+    once = OnlineSmoother(8, 'ewm')
+    once.update(keys, probs)
+
+    overlapping = OnlineSmoother(8, 'ewm')
+    for end in range(10, 101, 10):
+        start = max(0, end - 25)
+        new = overlapping.update(keys[start:end], probs[start:end])
+        assert len(new) == 10
+
+    np.testing.assert_array_equal(overlapping.value, once.value)
+    assert overlapping.updates == once.updates == 100
+    assert len(overlapping.update(keys[-5:], probs[-5:])) == 0
+
+
+def test_reset_starts_from_scratch():
+    probs = random_probs(50)
+    smoother = OnlineSmoother(4, 'rolling')
+    smoother.update(list(range(50)), probs)
+    smoother.reset()
+
+    out = smoother.update([0, 1, 2, 3], probs[:4])
+    assert np.isnan(out[:3]).all()
+    np.testing.assert_allclose(out[3], probs[:4].mean(axis=0))
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        OnlineSmoother(8, 'median')
@@ -0,0 +1,217 @@
+import time
+
+import pytest
+
+pytest.importorskip('bluefin_v2_client')
+
+from exchange_simulator import SimulatedBluefinExchange
+from order_manager_bluefin import BluefinOrderManager
+from order_reconciler import bracket_orders
+from state_store import AuthTokenCache
+
+
+def make_manager(exchange, **kwargs):
+    return BluefinOrderManager(private_key=None, trading_fee=0.0015, quantity=0.01, client=exchange, **kwargs)
+
+
+@pytest.fixture
+def managers():
+    """Creates order managers on the simulator and closes their event loops afterwards."""
+    created = []
+
+    def create(exchange, **kwargs):
+        manager = make_manager(exchange, **kwargs)
+        created.append(manager)
+        return manager
+
+    yield create
+    for manager in created:
+        manager.loop.close()
+
+
+def test_warm_restart_skips_the_onboarding_signature(tmp_path, managers):
+    exchange = SimulatedBluefinExchange()
+    cache = AuthTokenCache(str(tmp_path / 'auth.json'))
+
+    cold = managers(exchange, auth_cache=cache)
+    assert exchange.onboarding_signatures == 1
+    assert cache.get(None, cold.network) == cold.auth_token == exchange.apis.auth_token
+
+    # A restart gets a fresh client without a token installed.
+    exchange.apis.auth_token = None
+    warm = managers(exchange, auth_cache=cache)
+
+    assert exchange.onboarding_signatures == 1
+    assert warm.auth_token == cold.auth_token
+    assert warm.fetch_current_positions() == {}
+
+
+def test_rejected_cached_token_onboards_once_and_is_replaced(tmp_path, managers):
+    exchange = SimulatedBluefinExchange()
+    cache = AuthTokenCache(str(tmp_path / 'auth.json'))
+    managers(exchange, auth_cache=cache)
+    exchange.revoke_tokens()
+
+    manager = managers(exchange, auth_cache=cache)
+
+    assert exchange.onboarding_signatures == 2
+    assert cache.get(None, manager.network) == manager.auth_token == exchange.apis.auth_token
+
+
+def calls(exchange, method):
+    return exchange.calls_by_method.get(method, 0)
+
+
+def test_leverage_is_read_once_across_orders_and_fills(managers):
+    exchange = SimulatedBluefinExchange()
+    manager = managers(exchange)
+    assert calls(exchange, 'get_user_leverage') == 1
+
+    manager.open_position_at_market(1)
+    manager.place_bracket_orders(2950.0, 3050.0, 'long')
+    manager.close_position_at_market('long')
+
+    assert calls(exchange, 'get_user_leverage') == 1
+    assert manager.leverage_cache_stats()['hits'] >= 3
+
+
+def test_leverage_is_reread_after_adjust_or_rejection(managers):
+    exchange = SimulatedBluefinExchange(leverage=20)
+    manager = managers(exchange)
+
+    manager.adjust_leverage(10)
+    manager.place_take_profit_order(3050.0, 'long')
+    assert calls(exchange, 'get_user_leverage') == 2
+    assert exchange.orders_rejected == 0
+
+    # Changed behind our back: the first order is rejected, the retry reads the new leverage.
+    exchange.leverage['ETH-PERP'] = 5
+    assert manager.place_take_profit_order(3050.0, 'long').get('error')
+    assert manager.place_take_profit_order(3050.0, 'long')['leverage'] == str(5 * 10 ** 18)
+    assert calls(exchange, 'get_user_leverage') == 3
+
+
+def test_position_snapshot_is_reused_until_our_fill(managers):
+    exchange = SimulatedBluefinExchange()
+    manager = managers(exchange)
+
+    assert manager.fetch_current_positions() == {}
+    assert manager.fetch_current_positions() == {}
+    assert calls(exchange, 'get_user_position') == 1
+    assert manager.position_cache_stats()['hits'] == 1
+
+    manager.open_position_at_market(1)
+    position = manager.fetch_current_positions()
+    assert position['side'] == 'BUY'
+    assert position['quantity'] == pytest.approx(0.01)
+    assert calls(exchange, 'get_user_position') == 2
+    version = manager.position_version
+
+    # Reused within position_ttl, refetched with max_age=0.
+    manager.fetch_current_positions()
+    assert calls(exchange, 'get_user_position') == 2
+    manager.fetch_current_positions(max_age=0)
+    assert calls(exchange, 'get_user_position') == 3
+    assert manager.position_version == version + 1
+
+    manager.close_position_at_market('long')
+    assert manager.fetch_current_positions() == {}
+    assert calls(exchange, 'get_user_position') == 4
+
+
+def test_position_snapshot_expires_after_the_ttl(managers):
+    exchange = SimulatedBluefinExchange()
+    manager = managers(exchange)
+    manager.position_ttl = 0.05
+
+    manager.fetch_current_positions()
+    # A fill we did not place (e.g. a resting stop) is picked up once the snapshot expires.
+    exchange.positions['ETH-PERP'] = {'quantity': -0.01, 'entry': 3000.0}
+    assert manager.fetch_current_positions() == {}
+    time.sleep(0.06)
+    assert manager.fetch_current_positions()['side'] == 'SELL'
+    assert calls(exchange, 'get_user_position') == 2
+
+
+def open_orders(exchange):
+    return {order['hash']: order for order in exchange.orders.values()
+            if order['orderStatus'] in ('STANDBY', 'PENDING', 'OPEN', 'PARTIAL_FILLED')}
+
+
+def test_bracket_legs_are_placed_concurrently(managers):
+    exchange = SimulatedBluefinExchange(latency=0.1)
+    manager = managers(exchange)
+
+    start = time.monotonic()
+    bracket = manager.place_bracket_orders(2950.0, 3050.0, 'long')
+
+    # Two posts at 100 ms each; the cached leverage costs no call.
+    assert time.monotonic() - start < 0.18
+    assert bracket['failed'] == []
+    assert sorted(order['orderType'] for order in open_orders(exchange).values()) == ['LIMIT', 'STOP_LIMIT']
+
+
+def test_one_failed_bracket_leg_is_reported_and_the_other_rests(managers):
+    exchange = SimulatedBluefinExchange()
+    manager = managers(exchange)
+    exchange.rejected_order_types = {'LIMIT'}
+
+    bracket = manager.place_bracket_orders(2950.0, 3050.0, 'long')
+
+    assert bracket['failed'] == ['take_profit']
+    assert bracket['take_profit']['error']
+    assert [order['orderType'] for order in open_orders(exchange).values()] == ['STOP_LIMIT']
+
+
+def record_order_calls(exchange):
+    """Logs post and cancel calls on the simulator in the order they are made."""
+    log = []
+    post, cancel = exchange.post_signed_order, exchange.post_cancel_order
+
+    async def logged_post(signed_order):
+        log.append(('post', signed_order['orderType'], signed_order['price']))
+        return await post(signed_order)
+
+    async def logged_cancel(request):
+        log.append(('cancel', *request['hashes']))
+        return await cancel(request)
+
+    exchange.post_signed_order, exchange.post_cancel_order = logged_post, logged_cancel
+    return log
+
+
+def test_reconcile_places_the_replacement_before_cancelling_the_stale_leg(managers):
+    exchange = SimulatedBluefinExchange()
+    manager = managers(exchange)
+    manager.place_bracket_orders(2950.0, 3050.0, 'long')
+    stale_stop = next(h for h, o in open_orders(exchange).items() if o['orderType'] == 'STOP_LIMIT')
+    log = record_order_calls(exchange)
+
+    result = manager.reconcile_orders(bracket_orders('long', 2960.0, 3050.0, 0.01))
+
+    assert log == [('post', 'STOP_LIMIT', 2960.0), ('cancel', stale_stop)]
+    assert result['cancelled'] == [stale_stop] and result['kept'] == 1 and result['failed'] == []
+    assert sorted(o['price'] for o in open_orders(exchange).values()) == [2960.0, 3050.0]
+
+    # Nothing changed: no order traffic.
+    log.clear()
+    manager.reconcile_orders(bracket_orders('long', 2960.0, 3050.0, 0.01))
+    assert log == []
+
+
+def test_reconcile_keeps_the_stale_leg_when_its_replacement_fails(managers):
+    exchange = SimulatedBluefinExchange()
+    manager = managers(exchange)
+    manager.place_bracket_orders(2950.0, 3050.0, 'long')
+    stale = {o['orderType']: h for h, o in open_orders(exchange).items()}
+    exchange.rejected_order_types = {'STOP_LIMIT'}
+    log = record_order_calls(exchange)
+
+    result = manager.reconcile_orders(bracket_orders('long', 2960.0, 3060.0, 0.01))
+
+    assert result['failed'] == ['stop_loss']
+    assert result['kept_stale'] == [stale['STOP_LIMIT']]
+    # Only the take-profit, whose replacement placed, is cancelled.
+    assert log[-1] == ('cancel', stale['LIMIT'])
+    assert sorted((o['orderType'], o['price']) for o in open_orders(exchange).values()) == [
+        ('LIMIT', 3060.0), ('STOP_LIMIT', 2950.0)]
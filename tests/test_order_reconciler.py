@@ -0,0 +1,42 @@
+from order_reconciler import bracket_orders, diff_orders, order_kind, safe_to_cancel
+
+BASE18 = 10 ** 18
+
+
+def live(order_hash, side, order_type, price, quantity):
+    return {'hash': order_hash, 'side': side, 'orderType': order_type,
+            'price': str(int(price * BASE18)), 'quantity': str(int(quantity * BASE18))}
+
+
+def test_diff_keeps_matching_legs_and_replaces_moved_ones():
+    orders = [live('sl', 'SELL', 'STOP_LIMIT', 2950.0, 0.01), live('tp', 'SELL', 'LIMIT', 3050.0, 0.01)]
+    desired = bracket_orders('long', 2960.0, 3050.0, 0.01)
+
+    to_cancel, to_place = diff_orders(desired, orders)
+
+    assert to_cancel == ['sl']
+    assert [order.kind for order in to_place] == ['stop_loss']
+
+
+def test_order_kind():
+    assert order_kind(live('a', 'SELL', 'STOP_LIMIT', 1.0, 1.0)) == 'stop_loss'
+    assert order_kind(live('b', 'SELL', 'LIMIT', 1.0, 1.0)) == 'take_profit'
+    assert order_kind(live('c', 'SELL', 'MARKET', 1.0, 1.0)) is None
+
+
+def test_stale_leg_is_kept_when_its_replacement_failed():
+    stale = [live('sl', 'SELL', 'STOP_LIMIT', 2950.0, 0.01), live('tp', 'SELL', 'LIMIT', 3050.0, 0.01),
+             live('orphan', 'BUY', 'MARKET', 0.0, 0.01)]
+
+    assert safe_to_cancel(stale, {'stop_loss'}) == ['tp', 'orphan']
+    assert safe_to_cancel(stale, {'stop_loss', 'take_profit'}) == ['orphan']
+    assert safe_to_cancel(stale, set()) == ['sl', 'tp', 'orphan']
+
+
+def test_diff_scales_numeric_live_values():
+    # Some payloads carry the 10**18-scaled values as numbers rather than strings.
+    orders = [dict(live('sl', 'SELL', 'STOP_LIMIT', 2950.0, 0.01), price=2950 * BASE18, quantity=0.01 * BASE18),
+              dict(live('tp', 'SELL', 'LIMIT', 3050.0, 0.01), price=3050.5 * BASE18, quantity=10 ** 16)]
+    desired = bracket_orders('long', 2950.0, 3050.5, 0.01)
+
+    assert diff_orders(desired, orders) == ([], [])
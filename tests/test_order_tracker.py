@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+import pytest
+
+from order_tracker import OrderTracker, _final_statuses
+
+# Resolve the status enums up front so the SDK import does not count against poll timings.
+_final_statuses()
+
+
+class FakeClient:
+    """get_orders returns `open_orders`, or `final` orders when looked up by hash."""
+
+    def __init__(self, open_orders=(), final=None, lookup_error=None):
+        self.open_orders = list(open_orders)
+        self.final = dict(final or {})
+        self.lookup_error = lookup_error
+        self.lookups = []
+
+    async def get_orders(self, params):
+        if 'orderHashes' not in params:
+            return list(self.open_orders)
+        self.lookups.append(params)
+        if self.lookup_error is not None:
+            raise self.lookup_error
+        return [self.final[h] for h in params['orderHashes'] if h in self.final]
+
+
+def fast_tracker(client, **kwargs):
+    kwargs.setdefault('min_interval', 0.01)
+    kwargs.setdefault('max_interval', 0.02)
+    return OrderTracker(client, 'ETH-PERP', **kwargs)
+
+
+def test_assumed_fill_waits_for_missing_after_seconds():
+    async def scenario():
+        tracker = fast_tracker(FakeClient(), missing_after=2.0)
+        tracker.track('h1')
+        tracker._poll_task.cancel()
+
+        tracker.apply_open_orders([], now=100.0)
+        assert tracker.missing_orders() == ['h1']
+        tracker.apply_open_orders([], now=100.25)
+        assert tracker.assumable_fills(['h1'], now=100.25) == []
+        assert tracker.assumable_fills(['h1'], now=102.0) == ['h1']
+
+        # Seen again: the missing clock restarts.
+        tracker.apply_open_orders([{'hash': 'h1', 'orderStatus': 'OPEN'}], now=102.5)
+        assert tracker.missing_orders() == []
+        assert tracker.assumable_fills(['h1'], now=110.0) == []
+
+    asyncio.run(scenario())
+
+
+def test_failed_lookups_do_not_assume_a_fill_early():
+    async def scenario():
+        client = FakeClient(lookup_error=RuntimeError('unsupported'))
+        tracker = fast_tracker(client, missing_after=10.0)
+        assert await tracker.wait('h1', timeout=0.3) is None
+        assert tracker.polls >= 5
+        assert client.lookups
+        assert tracker.assumed_fills == 0
+
+    asyncio.run(scenario())
+
+
+def test_instant_fill_resolves_within_one_poll_interval():
+    filled = {'hash': 'h1', 'orderStatus': 'FILLED'}
+
+    async def scenario():
+        client = FakeClient(final={'h1': filled})
+        tracker = OrderTracker(client, 'ETH-PERP', min_interval=0.05, max_interval=2.0)
+        start = time.monotonic()
+        assert await tracker.wait('h1', timeout=5) == filled
+        assert time.monotonic() - start < 0.1
+        assert tracker.polls == 1
+        assert tracker.assumed_fills == 0
+
+    asyncio.run(scenario())
+
+
+def test_fill_is_confirmed_by_status_lookup():
+    filled = {'hash': 'h1', 'orderStatus': 'FILLED', 'avgFillPrice': '3000000000000000000000'}
+
+    async def scenario():
+        client = FakeClient(final={'h1': filled})
+        tracker = fast_tracker(client)
+        assert await tracker.wait('h1', timeout=2) == filled
+        assert client.lookups[0]['orderHashes'] == ['h1']
+
+    asyncio.run(scenario())
+
+
+def test_order_without_final_status_keeps_waiting():
+    async def scenario():
+        client = FakeClient()
+        tracker = fast_tracker(client)
+        assert await tracker.wait('h1', timeout=0.3) is None
+        assert client.lookups
+        assert tracker.assumed_fills == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_order_resolves_to_none():
+    async def scenario():
+        client = FakeClient(final={'h1': {'hash': 'h1', 'orderStatus': 'CANCELLED'}})
+        tracker = fast_tracker(client)
+        assert await tracker.wait('h1', timeout=2) is None
+        assert not tracker.pending()
+
+    asyncio.run(scenario())
+
+
+def test_failed_status_lookup_falls_back_to_assumed_fill():
+    async def scenario():
+        client = FakeClient(lookup_error=RuntimeError('unsupported'))
+        tracker = fast_tracker(client, missing_after=0.05)
+        assert await tracker.wait('h1', timeout=2) == {'orderStatus': 'FILLED', 'hash': 'h1'}
+        assert tracker.assumed_fills == 1
+
+    asyncio.run(scenario())
+
+
+def test_open_order_update_resolves_without_lookup():
+    async def scenario():
+        client = FakeClient(open_orders=[{'hash': 'h1', 'orderStatus': 'FILLED'}])
+        tracker = fast_tracker(client)
+        assert (await tracker.wait('h1', timeout=2))['orderStatus'] == 'FILLED'
+        assert client.lookups == []
+
+    asyncio.run(scenario())
+
+
+class FakeSocket:
+    """Stands in for bluefin_v2_client's Sockets: callbacks are awaited, like Sockets.listener does."""
+
+    def __init__(self, subscribed=True):
+        self.subscribed = subscribed
+        self.callbacks = {}
+
+    async def open(self):
+        pass
+
+    async def subscribe_user_update_by_token(self):
+        return self.subscribed
+
+    async def listen(self, event, callback):
+        self.callbacks[event] = callback
+
+    async def emit(self, event, *args):
+        await self.callbacks[event](*args)
+
+
+def subscribed_client(socket):
+    pytest.importorskip('bluefin_v2_client')
+    client = FakeClient(open_orders=[{'hash': 'h1', 'orderStatus': 'OPEN'}])
+    client.socket = socket
+    return client
+
+
+def test_rejected_subscription_keeps_fast_polling():
+    client = subscribed_client(FakeSocket(subscribed=False))
+
+    async def scenario():
+        tracker = OrderTracker(client, 'ETH-PERP', min_interval=0.05, max_interval=2.0)
+        assert await tracker.subscribe() is False
+        assert tracker.subscribed is False
+        assert client.socket.callbacks == {}
+
+        # Still polled every min_interval rather than max_interval.
+        assert await tracker.wait('h1', timeout=0.35) is None
+        assert tracker.polls >= 3
+
+    asyncio.run(scenario())
+
+
+def test_socket_update_resolves_and_disconnect_restores_polling():
+    socket = FakeSocket()
+    client = subscribed_client(socket)
+    from bluefin_v2_client import SOCKET_EVENTS
+    filled = {'hash': 'h1', 'orderStatus': 'FILLED'}
+
+    async def scenario():
+        tracker, peer = OrderTracker(client, 'ETH-PERP'), OrderTracker(client, 'BTC-PERP')
+        assert await tracker.subscribe(peers=[peer]) is True
+        assert tracker.subscribed and peer.subscribed
+
+        fut = tracker.track('h1')
+        await socket.emit(SOCKET_EVENTS.ORDER_UPDATE.value, {'order': filled})
+        assert await asyncio.wait_for(fut, 1) == filled
+
+        await socket.emit('disconnect')
+        assert not tracker.subscribed and not peer.subscribed
+
+    asyncio.run(scenario())
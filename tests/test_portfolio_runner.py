@@ -0,0 +1,56 @@
+import functools
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('bluefin_v2_client')
+
+import portfolio_runner
+import signals_tbl_eth_bluefin as signals
+from exchange_simulator import SimulatedBluefinExchange
+from order_manager_bluefin import BluefinOrderManager
+from price_feed import StaticPriceFeed
+from replay import RecordingNotifier
+
+
+@pytest.fixture
+def offline_portfolio(tmp_path, monkeypatch):
+    """Builds a one-symbol portfolio against the exchange simulator, with no network or Discord."""
+    exchange = SimulatedBluefinExchange(price=3000.0)
+    monkeypatch.setattr(portfolio_runner, 'BluefinOrderManager', functools.partial(BluefinOrderManager, client=exchange))
+    monkeypatch.setattr(portfolio_runner, 'binance_client', SimpleNamespace(BinanceClient=lambda **kwargs: None))
+    monkeypatch.setattr(portfolio_runner, 'data_processor',
+                        SimpleNamespace(CryptoDataProcessor=lambda **kwargs: SimpleNamespace(**kwargs)))
+    monkeypatch.setattr(signals, 'shared_price_feed', lambda symbol, **kwargs: StaticPriceFeed(symbol, price=3000.0))
+    monkeypatch.setattr(signals, 'shared_notifier', RecordingNotifier)
+    monkeypatch.setattr(signals, 'DataConfig', SimpleNamespace(discord_webhook=None, discord_logs_webhook=None))
+
+    path = tmp_path / 'portfolio.json'
+    path.write_text(json.dumps({'symbols': [{'ticker': 'ETHUSD', 'model_path': None, 'features_path': None,
+                                             'cumulative_columns': ['OBV', 'AD_line']}]}))
+    root_manager, strategies = portfolio_runner.build_portfolio(portfolio_runner.load_portfolio_config(str(path)),
+                                                                private_key=None)
+    yield exchange, strategies
+    root_manager.loop.close()
+
+
+def test_portfolio_strategy_acts_on_the_model_signal(offline_portfolio):
+    exchange, [strategy] = offline_portfolio
+    assert strategy.forced_signal is None
+
+    strategy.generate_position_value(pd.DataFrame({'ypred': [0, 1]}), signal_column='ypred')
+
+    assert strategy.current_signal == 1
+    position = exchange.positions['ETH-PERP']
+    assert position['quantity'] == pytest.approx(strategy.quantity)
+
+
+def test_portfolio_feature_engine_uses_the_configured_warmup(offline_portfolio):
+    _, [strategy] = offline_portfolio
+    engine = strategy.feature_engine
+
+    assert engine.feature_warmup == signals.FEATURE_WARMUP
+    assert engine.cumulative_columns == ('OBV', 'AD_line')
+    assert engine.parity_check_every == 288
@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('requests')
+
+import price_feed
+from price_feed import BinancePriceFeed, LastPriceFeed, StalePriceError, StaticPriceFeed, shared_price_feed
+
+
+class TickerStandIn:
+    """Local Binance ticker endpoint that answers with `price`, or with `status` when it is set."""
+
+    def __init__(self, price='3000.5'):
+        self.price = price
+        self.status = 200
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests.append(self.path)
+                payload = json.dumps({'symbol': 'ETHUSDT', 'price': stand_in.price}).encode()
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def ticker():
+    stand_in = TickerStandIn()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic clock for price_feed that only moves when the test advances it."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(price_feed, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+class ScriptedFeed(LastPriceFeed):
+    def __init__(self, prices, **kwargs):
+        super().__init__('ETHUSDT', **kwargs)
+        self.prices = list(prices)
+
+    def fetch(self):
+        price = self.prices.pop(0)
+        if isinstance(price, Exception):
+            raise price
+        return price
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_fresh_price_is_read_without_refreshing(clock):
+    feed = ScriptedFeed([], max_age=15.0)
+    feed.set_price(3000.0)
+    clock.now += 15.0
+
+    assert feed.get_price() == 3000.0
+    assert feed.stale_reads == 0
+
+
+def test_stale_price_is_refreshed_synchronously(clock):
+    feed = ScriptedFeed([3010.0], max_age=15.0)
+    feed.set_price(3000.0)
+    clock.now += 15.5
+
+    assert feed.get_price() == 3010.0
+    assert feed.stale_reads == 1
+    assert feed.age() == 0.0
+
+
+def test_stale_price_with_failed_refresh_raises(clock):
+    feed = ScriptedFeed([ConnectionError('down')], max_age=15.0)
+    feed.set_price(3000.0)
+    clock.now += 20.0
+
+    with pytest.raises(StalePriceError, match='20.0s old'):
+        feed.get_price()
+
+
+def test_static_feed_only_changes_via_set_price(clock):
+    feed = StaticPriceFeed('ETHUSDT', price=3000.0)
+    clock.now += 1e6
+    assert feed.get_price() == 3000.0
+
+    feed.set_price(2990.0)
+    assert feed.get_price() == 2990.0
+    assert StaticPriceFeed('ETHUSDT').updates == 0
+
+
+def test_binance_feed_refreshes_in_the_background(ticker):
+    feed = BinancePriceFeed('ETHUSDT', poll_interval=0.01, base_url=ticker.url, timeout=2).start()
+    try:
+        wait_for(lambda: feed.updates >= 1)
+        assert feed.get_price() == 3000.5
+
+        ticker.price = '3001.25'
+        wait_for(lambda: feed._last[0] == 3001.25)
+    finally:
+        feed.stop()
+    assert ticker.requests[0] == '/api/v3/ticker/price?symbol=ETHUSDT'
+
+
+def test_binance_feed_keeps_polling_through_errors(ticker):
+    ticker.status = 500
+    feed = BinancePriceFeed('ETHUSDT', max_age=0.2, poll_interval=0.01, base_url=ticker.url, timeout=2).start()
+    try:
+        wait_for(lambda: len(ticker.requests) >= 3)
+        assert feed.updates == 0
+        time.sleep(0.25)
+        with pytest.raises(StalePriceError):
+            feed.get_price()
+
+        ticker.status = 200
+        wait_for(lambda: feed.updates >= 1)
+        assert feed.get_price() == 3000.5
+    finally:
+        feed.stop()
+
+
+def test_shared_feed_is_per_symbol_and_settings(monkeypatch):
+    monkeypatch.setattr(price_feed, '_SHARED_FEEDS', {})
+    monkeypatch.setattr(BinancePriceFeed, 'start', lambda self: self)
+
+    feed = shared_price_feed('ETHUSDT', max_age=15.0)
+
+    assert shared_price_feed('ETHUSDT', max_age=15.0) is feed
+    assert shared_price_feed('ETHUSDT', max_age=5.0).max_age == 5.0
+    assert shared_price_feed('BTCUSDT', max_age=15.0) is not feed
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+import signals_tbl_eth_bluefin as signals
+from param_sweep import signals_for_thresholds, simulate
+from replay import ReplayEngine, SimulatedOrderManager
+
+
+@pytest.fixture(autouse=True)
+def no_discord(monkeypatch):
+    monkeypatch.setattr(signals, 'DataConfig', SimpleNamespace(discord_webhook=None, discord_logs_webhook=None))
+
+
+def synthetic_klines(n, start_price, seed=0):
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    open_time = pd.date_range('2024-01-01', periods=n, freq='5min')
+    return pd.DataFrame({
+        'open_time': open_time,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': 1.0,
+        'close_time': open_time + pd.Timedelta(minutes=5) - pd.Timedelta(milliseconds=1),
+    })
+
+
+def strategy_kwargs(stop_loss, take_profit, threshold=0.5):
+    return {'ticker': 'ETHUSD', 'quote_symbol_quantity': 1.0, 'trading_fee': 0.0015, 'prob_threshold': threshold,
+            'smoothing_method': 'rolling', 'span': 8, 'stop_loss': stop_loss, 'take_profit': take_profit,
+            'model_path': None, 'features_path': None}
+
+
+@pytest.mark.parametrize('stop_loss, take_profit', [(0.0075, 0.0075), (0.005, 0.01)])
+def test_replay_and_sweep_simulation_agree(stop_loss, take_profit):
+    # The strategy rounds SL/TP prices to 0.1; at this price level that is far below a bar's range.
+    klines = synthetic_klines(2000, start_price=300000.0)
+    rng = np.random.default_rng(1)
+    ypred = np.repeat(rng.choice([-1, 0, 1], 200, p=[0.3, 0.4, 0.3]), 10)
+
+    replayed = ReplayEngine(strategy_kwargs(stop_loss, take_profit)).run(klines, pd.DataFrame({'ypred': ypred}))
+    ohlc = tuple(klines[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close'))
+    swept = simulate(ypred, ohlc, [stop_loss], [take_profit], trading_fee=0.0015)
+
+    assert replayed['net_pnl'] == pytest.approx(swept['net_pnl'][0], rel=1e-5)
+    assert replayed['fees'] == pytest.approx(swept['fees'][0], rel=1e-5)
+    assert replayed['max_drawdown'] == pytest.approx(swept['max_drawdown'][0], rel=1e-5)
+    # Every trade is one entry and one exit fill, except a position still open at the end.
+    still_open = int(replayed['equity'].iloc[-1] != replayed['realized_pnl'] - replayed['fees'])
+    assert replayed['fills'] == 2 * swept['trades'][0] - still_open
+
+
+def test_sweep_thresholds_match_the_strategy_rule():
+    probs = np.random.default_rng(2).dirichlet([1, 1, 1], size=500)
+    thresholds = [0.4, 0.5, 0.6]
+
+    swept = signals_for_thresholds(probs, thresholds)
+
+    for threshold, row in zip(thresholds, swept):
+        strategy = ReplayEngine(strategy_kwargs(0.0075, 0.0075, threshold)).build_strategy()
+        np.testing.assert_array_equal(row, strategy.signal_from_probabilities(probs))
+
+
+def bar(open_, high, low, close):
+    return {'open': open_, 'high': high, 'low': low, 'close': close}
+
+
+def test_simulated_stop_fills_first_and_at_the_open_on_a_gap():
+    manager = SimulatedOrderManager(trading_fee=0.001, quantity=1.0)
+    manager.set_price(100.0)
+    manager.open_position_at_market(1)
+    manager.place_bracket_orders(99.0, 101.0, 'long')
+
+    # Both legs trigger; the stop wins, and the bar opened below it.
+    manager.on_bar(bar(98.5, 101.5, 98.0, 101.0))
+
+    assert manager.fetch_current_positions() == {}
+    assert manager.resting == []
+    assert [(f['reason'], f['price']) for f in manager.fills] == [('open', 100.0), ('stop_loss', 98.5)]
+    assert manager.realized_pnl == pytest.approx(-1.5)
+    assert manager.fees == pytest.approx((100.0 + 98.5) * 0.001)
+
+
+def test_simulated_take_profit_closes_a_short():
+    manager = SimulatedOrderManager(trading_fee=0.0, quantity=2.0, slippage=0.001)
+    manager.set_price(100.0)
+    manager.open_position_at_market(-1)
+    manager.place_bracket_orders(102.0, 98.0, 'short')
+
+    manager.on_bar(bar(99.5, 99.8, 98.5, 99.0))
+    manager.on_bar(bar(99.0, 99.2, 97.5, 98.0))
+
+    assert manager.fetch_current_positions() == {}
+    assert manager.fills[0]['price'] == pytest.approx(99.9)
+    assert manager.fills[1]['reason'] == 'take_profit'
+    assert manager.realized_pnl == pytest.approx((99.9 - 98.0) * 2.0)
@@ -0,0 +1,71 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('bluefin_v2_client')
+
+import signals_tbl_eth_bluefin as signals
+from exchange_simulator import SimulatedBluefinExchange
+from order_manager_bluefin import BluefinOrderManager
+from price_feed import StaticPriceFeed
+from replay import RecordingNotifier
+
+
+@pytest.fixture
+def strategy(monkeypatch):
+    """A SignalStrategy trading against the exchange simulator, with no network or Discord."""
+    monkeypatch.setattr(signals, 'DataConfig', SimpleNamespace(discord_webhook=None, discord_logs_webhook=None))
+    exchange = SimulatedBluefinExchange(price=3000.0)
+    manager = BluefinOrderManager(private_key=None, trading_fee=0.0015, quantity=0.01, client=exchange)
+    strategy = signals.SignalStrategy(
+        ticker='ETHUSD', client_data=None, quote_symbol_quantity=0.01, trading_fee=0.0015, prob_threshold=0.5,
+        smoothing_method='rolling', span=8, stop_loss=0.0075, take_profit=0.0075, model_path=None,
+        features_path=None, order_manager=manager, price_feed=StaticPriceFeed('ETHUSDT', price=3000.0),
+        notifier=RecordingNotifier())
+    yield strategy
+    manager.loop.close()
+
+
+def resting_types(exchange):
+    return sorted(order['orderType'] for order in exchange.orders.values() if order['orderStatus'] in
+                  ('STANDBY', 'PENDING', 'OPEN'))
+
+
+def cancel_stop_leg(exchange):
+    for order in exchange.orders.values():
+        if order['orderType'] == 'STOP_LIMIT':
+            order['orderStatus'] = 'CANCELLED'
+
+
+def test_monitor_tick_puts_back_a_missing_stop_leg(strategy):
+    exchange = strategy.order_manager.client
+    strategy.generate_position_value(pd.DataFrame({'ypred': [1]}), signal_column='ypred')
+    assert resting_types(exchange) == ['LIMIT', 'STOP_LIMIT']
+    cancel_stop_leg(exchange)
+
+    # A monitor tick between reconciles only trails the prices, which did not move.
+    strategy.generate_position_value(df=None, current_time=datetime(2024, 1, 1, 12, 0, 10))
+    assert resting_types(exchange) == ['LIMIT']
+
+    strategy.generate_position_value(df=None, current_time=datetime(2024, 1, 1, 12, 0, 30))
+
+    assert strategy.current_signal is None
+    assert resting_types(exchange) == ['LIMIT', 'STOP_LIMIT']
+    [stop] = [o for o in exchange.orders.values() if o['orderType'] == 'STOP_LIMIT' and o['orderStatus'] == 'STANDBY']
+    assert stop['price'] == pytest.approx(strategy.stop_loss_price)
+
+
+def test_monitor_tick_trails_the_stop(strategy):
+    exchange = strategy.order_manager.client
+    strategy.generate_position_value(pd.DataFrame({'ypred': [1]}), signal_column='ypred')
+    old_stop = strategy.stop_loss_price
+
+    exchange.set_price(3010.0)
+    strategy.price_feed.set_price(3010.0)
+    strategy.generate_position_value(df=None, current_time=datetime(2024, 1, 1, 12, 0, 10))
+
+    assert strategy.stop_loss_price == round(3010.0 * (1 - 0.0075), 1) > old_stop
+    [stop] = [o for o in exchange.orders.values() if o['orderType'] == 'STOP_LIMIT' and o['orderStatus'] == 'STANDBY']
+    assert stop['price'] == pytest.approx(strategy.stop_loss_price)
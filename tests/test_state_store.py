@@ -0,0 +1,73 @@
+import os
+import stat
+
+from state_store import AuthTokenCache, StrategyStateStore, same_position
+
+LONG = {'position': 'long', 'notional': 30.0, 'entry_price': 3000.0, 'positionAmt': 0.01}
+
+
+def test_auth_token_round_trip_and_ttl(tmp_path, monkeypatch):
+    cache = AuthTokenCache(str(tmp_path / 'auth.json'), ttl=60)
+    monkeypatch.setattr('state_store.time.time', lambda: 1000.0)
+    cache.put('key', 'prod', 'token-1')
+
+    assert cache.get('key', 'prod') == 'token-1'
+    assert cache.get('key', 'staging') is None
+    assert cache.get('other-key', 'prod') is None
+
+    monkeypatch.setattr('state_store.time.time', lambda: 1061.0)
+    assert cache.get('key', 'prod') is None
+
+
+def test_auth_token_invalidate_keeps_other_accounts(tmp_path):
+    cache = AuthTokenCache(str(tmp_path / 'auth.json'))
+    cache.put('key', 'prod', 'token-1')
+    cache.put('other-key', 'prod', 'token-2')
+
+    cache.invalidate('key', 'prod')
+
+    assert cache.get('key', 'prod') is None
+    assert cache.get('other-key', 'prod') == 'token-2'
+
+
+def test_auth_token_file_is_owner_only_and_has_no_private_key(tmp_path):
+    path = tmp_path / 'state' / 'auth.json'
+    AuthTokenCache(str(path)).put('seed phrase words', 'prod', 'token-1')
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert 'seed phrase' not in path.read_text()
+
+
+def test_state_store_skips_unchanged_saves_and_loads(tmp_path):
+    path = str(tmp_path / 'strategy.json')
+    store = StrategyStateStore(path)
+    state = {'stop_loss_price': 2950.0, 'neutral_signal_count': 1, 'position_info': LONG}
+
+    assert store.save(state)
+    assert not store.save(dict(state))
+    assert store.save(dict(state, neutral_signal_count=2))
+    assert store.saves == 2
+
+    restored = StrategyStateStore(path)
+    loaded, saved_at = restored.load()
+    assert loaded['neutral_signal_count'] == 2
+    assert saved_at is not None
+    # The loaded snapshot counts as saved, so the first tick after a restart does not rewrite it.
+    assert not restored.save(loaded)
+
+
+def test_state_store_ignores_missing_or_corrupt_files(tmp_path):
+    path = tmp_path / 'strategy.json'
+    assert StrategyStateStore(str(path)).load() == (None, None)
+    path.write_text('{"state": ')
+    assert StrategyStateStore(str(path)).load() == (None, None)
+
+
+def test_same_position():
+    assert same_position(LONG, dict(LONG, notional=31.0))
+    assert same_position(LONG, dict(LONG, positionAmt=-0.01))
+    assert not same_position(LONG, dict(LONG, position='short'))
+    assert not same_position(LONG, dict(LONG, positionAmt=0.02))
+    assert not same_position(LONG, dict(LONG, entry_price=3001.0))
+    assert not same_position(None, LONG)
+    assert not same_position(LONG, {'position': 'none', 'notional': 0, 'entry_price': 0, 'positionAmt': 0})
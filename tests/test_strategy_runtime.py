@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from strategy_runtime import AsyncStrategyRuntime, next_boundary
+
+
+class FakeStrategy:
+    """Records monitor ticks; a monitor tick blocks for `tick_seconds` (e.g. a fill wait)."""
+
+    def __init__(self, ticker, tick_seconds=0.0):
+        self.ticker = ticker
+        self.tick_seconds = tick_seconds
+        self.order_manager = SimpleNamespace(order_tracker=None)
+        self.ticks = []
+        self._lock = threading.Lock()
+
+    def generate_signal(self, act=True):
+        return None
+
+    def generate_position_value(self, df=None, signal_column=None, current_time=None, **kwargs):
+        with self._lock:
+            self.ticks.append(time.monotonic())
+        time.sleep(self.tick_seconds)
+
+
+def run_for(runtime, seconds):
+    async def main():
+        try:
+            await asyncio.wait_for(runtime.run(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(main())
+
+
+def test_next_boundary():
+    assert next_boundary(100.0, 10) == 110.0
+    assert next_boundary(101.0, 10) == 110.0
+    assert next_boundary(101.0, 10, offset=2) == 102.0
+    assert next_boundary(102.5, 10, offset=2) == 112.0
+
+
+def test_a_blocked_strategy_does_not_delay_other_monitors():
+    slow = FakeStrategy('ETHUSD', tick_seconds=0.6)
+    fast = FakeStrategy('BTCUSD')
+    runtime = AsyncStrategyRuntime([slow, fast], signal_period=3600, monitor_period=0.05)
+
+    run_for(runtime, 0.7)
+
+    # The slow strategy is stuck in its first tick for most of the run; the other keeps ticking.
+    assert len(slow.ticks) <= 2
+    assert len(fast.ticks) >= 8
+    gaps = [b - a for a, b in zip(fast.ticks, fast.ticks[1:])]
+    assert max(gaps) < 0.3
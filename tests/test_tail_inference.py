@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from tail_inference import NumpyTreeEnsemble, TailPredictor, tail_rows_for
+
+
+def training_frame(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    x = pd.DataFrame({
+        'rsi': rng.uniform(0, 100, n),
+        'ret': rng.normal(0, 1, n),
+        'regime': pd.Categorical(rng.choice(['bear', 'flat', 'bull'], n), categories=['bear', 'flat', 'bull']),
+    })
+    x.loc[rng.random(n) < 0.05, 'ret'] = np.nan
+    y = np.where(x['regime'] == 'bull', 2, np.where(x['rsi'] > 60, 1, 0))
+    return x, y
+
+
+@pytest.fixture(scope='module')
+def lgb_model():
+    lgb = pytest.importorskip('lightgbm')
+    x, y = training_frame()
+    return lgb.LGBMClassifier(n_estimators=20, num_leaves=8, min_child_samples=5, verbose=-1).fit(x, y)
+
+
+def test_tree_evaluator_matches_lightgbm(lgb_model):
+    x, _ = training_frame(200, seed=1)
+    evaluator = NumpyTreeEnsemble.from_model(lgb_model)
+    assert evaluator.check_parity(lgb_model, x) < 1e-9
+
+
+def test_tree_evaluator_codes_categories_like_training(lgb_model):
+    x, _ = training_frame(200, seed=1)
+    # The live window lists its categories in another order (and without one of them).
+    live = x.assign(regime=x['regime'].astype(str).astype('category'))
+    assert list(live['regime'].cat.categories) != ['bear', 'flat', 'bull']
+
+    evaluator = NumpyTreeEnsemble.from_model(lgb_model)
+    assert evaluator.check_parity(lgb_model, live) < 1e-9
+    np.testing.assert_allclose(evaluator.predict_proba(live), evaluator.predict_proba(x), rtol=0, atol=1e-12)
+
+
+def test_tail_predictor_falls_back_to_the_model_on_a_parity_mismatch(lgb_model):
+    x, _ = training_frame(50, seed=2)
+    uniform = np.full((len(x), 3), 1 / 3)
+    # Compiles from the real booster but answers differently, like a stale or mismatched dump.
+    model = SimpleNamespace(booster_=lgb_model.booster_, predict_proba=lambda rows: uniform[:len(rows)])
+    predictor = TailPredictor(8, use_tree_evaluator=True)
+
+    probs = predictor.predict(model, x, list(range(len(x))), lambda m, rows: (m.predict_proba(rows), None))
+
+    assert not predictor.stats()['tree_evaluator']
+    assert predictor.parity_diff > 1e-3
+    np.testing.assert_allclose(probs, uniform[:8])
+
+
+def fake_predict(model, rows):
+    # Deterministic per-row probabilities, so rows scored in different batches agree.
+    logits = np.column_stack([rows['a'], rows['b'], rows['a'] * rows['b']]).astype(float)
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True), None
+
+
+def last_signal(probs, span, method, threshold=0.4):
+    frame = pd.DataFrame(probs)
+    smoothed = (frame.rolling(span).mean() if method == 'rolling' else frame.ewm(span=span).mean()).to_numpy()[-1]
+    return int(np.argmax(smoothed)) - 1 if smoothed.max() >= threshold else 0, smoothed
+
+
+@pytest.mark.parametrize('method', ['rolling', 'ewm'])
+def test_tail_window_gives_the_full_history_signal(method):
+    span = 8
+    rng = np.random.default_rng(3)
+    x = pd.DataFrame({'a': rng.normal(0, 1, 400), 'b': rng.normal(0, 1, 400)})
+    keys = list(range(len(x)))
+    predictor = TailPredictor(tail_rows_for(span, method))
+    model = object()
+
+    for end in range(200, len(x) + 1):
+        tail_probs = predictor.predict(model, x.iloc[:end], keys[:end], fake_predict)
+        full_probs, _ = fake_predict(model, x.iloc[:end])
+
+        full_signal, full_smoothed = last_signal(full_probs, span, method)
+        tail_signal, tail_smoothed = last_signal(tail_probs, span, method)
+        np.testing.assert_allclose(tail_smoothed, full_smoothed, atol=1e-3)
+        # EWM drops weights below e**-7, so only a value within that of the threshold may flip.
+        if abs(full_smoothed.max() - 0.4) > 1e-3:
+            assert tail_signal == full_signal
+
+    # After the first cycle only the newly closed bar is scored.
+    assert predictor.rows_scored == tail_rows_for(span, method) + (len(x) - 200)